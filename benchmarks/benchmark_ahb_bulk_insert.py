@@ -0,0 +1,82 @@
+"""
+Compares the ORM (session.add_all) and the bulk insert path (executemany INSERTs) of
+create_db_and_populate_with_ahb_view.
+
+It reads every AHB XML from unittests/example_files and - if the private submodule is checked out - the full corpus
+from xml-migs-and-ahbs once, and then reports the (best of n) runtimes of inserting them into a fresh SQLite database
+with both paths. The materialization of the AHB view is the same for both paths and hence not part of the timing.
+Run it from the repository root:
+
+    python benchmarks/benchmark_ahb_bulk_insert.py --repeat 3
+"""
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from fundamend import AhbReader, Anwendungshandbuch
+from fundamend.sqlmodels import Anwendungshandbuch as SqlAnwendungshandbuch
+from fundamend.sqlmodels.ahb_bulk_insert import ahb_to_rows, bulk_insert_ahb_rows
+
+_REPO_ROOT = Path(__file__).parent.parent
+_CORPUS_ROOTS = [_REPO_ROOT / "unittests" / "example_files", _REPO_ROOT / "xml-migs-and-ahbs"]
+
+
+def _insert_using_orm(sqlite_path: Path, ahbs: list[Anwendungshandbuch]) -> None:
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(bind=engine) as session:
+        session.add_all([SqlAnwendungshandbuch.from_model(ahb) for ahb in ahbs])
+        session.commit()
+    engine.dispose()
+
+
+def _insert_using_bulk_insert(sqlite_path: Path, ahbs: list[Anwendungshandbuch]) -> None:
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as connection:
+        for ahb in ahbs:
+            bulk_insert_ahb_rows(connection, ahb_to_rows(ahb))
+        connection.commit()
+    engine.dispose()
+
+
+def _best_of(repeat: int, ahbs: list[Anwendungshandbuch], use_bulk_insert: bool) -> float:
+    """returns the fastest of `repeat` runs (inserting all ahbs into a new database) in seconds"""
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            sqlite_path = Path(temporary_directory) / "benchmark.sqlite"
+            start = time.perf_counter()
+            if use_bulk_insert:
+                _insert_using_bulk_insert(sqlite_path, ahbs)
+            else:
+                _insert_using_orm(sqlite_path, ahbs)
+            timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    """entry point of the benchmark"""
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="number of runs per path (best one counts)")
+    arguments = argument_parser.parse_args()
+    for corpus_root in _CORPUS_ROOTS:
+        paths = sorted(p for p in corpus_root.rglob("*.xml") if "_AHB" in p.name)
+        if not paths:
+            print(f"{corpus_root.name}: no AHB XML files found, skipping")
+            continue
+        ahbs = [AhbReader(path).read() for path in paths]
+        orm_seconds = _best_of(arguments.repeat, ahbs, use_bulk_insert=False)
+        bulk_seconds = _best_of(arguments.repeat, ahbs, use_bulk_insert=True)
+        print(
+            f"{corpus_root.name}: {len(paths)} AHBs, ORM {orm_seconds:.3f}s, bulk insert {bulk_seconds:.3f}s, "
+            f"speedup {orm_seconds / bulk_seconds:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
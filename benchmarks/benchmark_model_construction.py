@@ -0,0 +1,118 @@
+"""
+Compares the trusted (validation-free) model construction of the MigReader and AhbReader with
+- the regular (lax) pydantic validation of model_class(**values), which the readers used before, and
+- the strict pydantic validation (FUNDAMEND_STRICT_VALIDATION=1 or fundamend.reader.construction.strict_validation).
+
+It reads every AHB and MIG XML from unittests/example_files and - if the private submodule is checked out - the full
+corpus from xml-migs-and-ahbs in all three modes, checks that the resulting models are identical and reports the
+(best of n) runtimes and the speedup over the regular validation. The XML files are parsed once upfront, so only the
+binding to the models is measured. Run it from the repository root:
+
+    python benchmarks/benchmark_model_construction.py --repeat 3
+"""
+
+import argparse
+import re
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import ModuleType
+from typing import Literal
+
+from pydantic import BaseModel
+
+from fundamend import AhbReader, Anwendungshandbuch, MessageImplementationGuide, MigReader
+from fundamend.reader import ahbreader, migreader
+from fundamend.reader.construction import strict_validation
+
+_Mode = Literal["regular", "strict", "trusted"]
+
+_REPO_ROOT = Path(__file__).parent.parent
+_CORPUS_ROOTS = [_REPO_ROOT / "unittests" / "example_files", _REPO_ROOT / "xml-migs-and-ahbs"]
+
+
+def _parsed_readers(paths: list[Path]) -> list[AhbReader | MigReader]:
+    """returns readers that have parsed their XML file already (they do so in __init__, unless streaming)"""
+    return [AhbReader(path) if "_AHB" in path.name else MigReader(path) for path in paths]
+
+
+def _regular_constructors(reader_module: ModuleType) -> dict[str, type[BaseModel]]:
+    """maps the trusted constructors of a reader module (e.g. _new_data_element_group) to their model classes"""
+    model_classes = {
+        "_new_" + re.sub(r"(?<!^)(?=[A-Z])", "_", value.__name__).lower(): value
+        for value in vars(reader_module).values()
+        if isinstance(value, type) and issubclass(value, BaseModel)
+    }
+    constructor_names = {name for name in vars(reader_module) if name.startswith("_new_")}
+    assert constructor_names <= model_classes.keys(), f"no model class for {constructor_names - model_classes.keys()}"
+    return {name: model_classes[name] for name in constructor_names}
+
+
+@contextmanager
+def _regular_validation() -> Iterator[None]:
+    """within this context manager, the readers create the models with model_class(**values), like they used to"""
+    originals = []
+    for reader_module in (ahbreader, migreader):
+        for name, model_class in _regular_constructors(reader_module).items():
+            originals.append((reader_module, name, getattr(reader_module, name)))
+            setattr(reader_module, name, model_class)
+    try:
+        yield
+    finally:
+        for reader_module, name, original in originals:
+            setattr(reader_module, name, original)
+
+
+def _read_all(
+    readers: list[AhbReader | MigReader], mode: _Mode
+) -> list[Anwendungshandbuch | MessageImplementationGuide]:
+    if mode == "regular":
+        with strict_validation(enabled=False), _regular_validation():
+            return [reader.read() for reader in readers]
+    with strict_validation(enabled=mode == "strict"):
+        return [reader.read() for reader in readers]
+
+
+def _best_of(repeat: int, readers: list[AhbReader | MigReader], mode: _Mode) -> float:
+    """returns the fastest of `repeat` runs (binding all parsed files to the models) in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _read_all(readers, mode)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    """entry point of the benchmark"""
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="number of runs per mode (best one counts)")
+    arguments = argument_parser.parse_args()
+    for corpus_root in _CORPUS_ROOTS:
+        paths = sorted(p for p in corpus_root.rglob("*.xml") if "_AHB" in p.name or "_MIG" in p.name)
+        if not paths:
+            print(f"{corpus_root.name}: no XML files found, skipping")
+            continue
+        readers = _parsed_readers(paths)
+        trusted_models = _read_all(readers, "trusted")
+        trusted_json = [m.model_dump_json() for m in trusted_models]
+        for mode in ("regular", "strict"):
+            validated_models = _read_all(readers, mode)
+            assert trusted_models == validated_models, f"the trusted construction yields other models than {mode}"
+            assert trusted_json == [m.model_dump_json() for m in validated_models], (
+                f"the trusted construction yields other JSON than {mode}"
+            )
+        regular_seconds = _best_of(arguments.repeat, readers, "regular")
+        strict_seconds = _best_of(arguments.repeat, readers, "strict")
+        trusted_seconds = _best_of(arguments.repeat, readers, "trusted")
+        print(
+            f"{corpus_root.name}: {len(readers)} files, regular {regular_seconds:.3f}s, "
+            f"strict {strict_seconds:.3f}s, trusted {trusted_seconds:.3f}s, "
+            f"speedup {regular_seconds / trusted_seconds:.2f}x over regular "
+            f"({strict_seconds / trusted_seconds:.2f}x over strict)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+Times and memory-profiles the stages of the typical fundamend pipeline and emits machine-readable (JSON) results, so
+that performance changes can be validated and regressions tracked.
+
+The stages are: MigReader.read, AhbReader.read, sanitize_ahb, model_dump_json, model_validate_json, binary.loads,
+create_db_and_populate_with_ahb_view,
+create_ahb_view, create_mig_view, create_and_fill_ahb_expression_table (requires ahbicht) and queries on
+v_ahbtabellen and v_ahb_formatversion_diff.
+They run against the example files from unittests/example_files and - if the private submodule is checked out - the
+full corpus from xml-migs-and-ahbs. Each stage is timed `repeat` times (the preparation of its input is not part of
+the timing); the peak memory is measured with tracemalloc in an additional run and hence only covers allocations made
+by Python (not e.g. the SQLite page cache). Run it from the repository root:
+
+    python benchmarks/benchmark_suite.py --repeat 3 --output benchmark_results.json
+    python benchmarks/benchmark_suite.py --baseline benchmark_results.json --max-slowdown 1.2
+"""
+
+import argparse
+import json
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from datetime import UTC, date, datetime
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as get_package_version
+from itertools import pairwise
+from pathlib import Path
+
+import sqlalchemy
+from efoli import EdifactFormatVersion, get_edifact_format_version_valid_from
+from pydantic import BaseModel
+from sqlmodel import Session, create_engine
+
+from fundamend import AhbReader, Anwendungshandbuch, MessageImplementationGuide, MigReader, binary
+from fundamend.sanitize import sanitize_ahb
+from fundamend.sqlmodels import (
+    create_ahb_formatversion_diff_view,
+    create_ahb_view,
+    create_ahbtabellen_view,
+    create_db_and_populate_with_ahb_view,
+    create_db_and_populate_with_mig_view,
+    create_mig_view,
+)
+
+try:
+    # must be imported before the databases are created, so that the ahb_expressions table is created, too
+    from fundamend.sqlmodels import expression_view
+except ImportError:  # ahbicht is an optional dependency
+    expression_view = None  # type: ignore[assignment]
+
+_REPO_ROOT = Path(__file__).parent.parent
+_EXAMPLE_FILES = _REPO_ROOT / "unittests" / "example_files"
+_PRIVATE_SUBMODULE_ROOT = _REPO_ROOT / "xml-migs-and-ahbs"
+
+# <FORMAT>_<AHB|MIG>_[<Gas|Strom>_]; an AHB and a MIG in the same directory with the same key belong together
+_FORMAT_AND_TYPE_REGEX = re.compile(r"^([A-Z]+)_(AHB|MIG)_(?:(Gas|Strom)_)?")
+
+_XmlFile = tuple[Path, date, date | None]
+
+# a stage consists of a preparation (not timed) that returns the function that is timed
+_Stage = Callable[[], Callable[[], int]]
+
+
+class StageResult(BaseModel):
+    """
+    the measurements of one stage on one corpus
+    """
+
+    corpus: str
+    stage: str
+    items: int  #: e.g. the number of files read or queries run
+    best_seconds: float
+    mean_seconds: float
+    seconds: list[float]
+    peak_memory_bytes: int | None  #: None if memory profiling was disabled
+
+
+class BenchmarkReport(BaseModel):
+    """
+    the results of one run of the benchmark suite
+    """
+
+    created_at: datetime
+    python_version: str
+    platform: str
+    fundamend_version: str
+    repeat: int
+    results: list[StageResult] = []
+
+
+class _Corpus(BaseModel):
+    """
+    AHB and MIG files (each with a gueltig_von and gueltig_bis) and the pairs of AHB and MIG that belong together
+    """
+
+    name: str
+    ahb_files: list[_XmlFile]
+    mig_files: list[_XmlFile]
+    ahb_mig_pairs: list[tuple[Path, Path]]
+
+
+def _package_version(package_name: str) -> str:
+    try:
+        return get_package_version(package_name)
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def _example_files_corpus() -> _Corpus:
+    # the example files are all UTILTS; they are assigned to consecutive (synthetic) format versions, so that there is
+    # something to compare in the format version diff
+    validities: list[tuple[date, date | None]] = [
+        (date(2023, 10, 1), date(2024, 4, 1)),  # FV2310
+        (date(2024, 10, 1), date(2025, 6, 6)),  # FV2410
+        (date(2025, 6, 6), date(2025, 10, 1)),  # FV2504
+        (date(2025, 10, 1), None),  # FV2510
+    ]
+    ahb_paths = sorted(_EXAMPLE_FILES.glob("*_AHB_*.xml"))
+    mig_paths = sorted(_EXAMPLE_FILES.glob("*_MIG_*.xml"))
+    return _Corpus(
+        name="example_files",
+        ahb_files=[(path, *validity) for path, validity in zip(ahb_paths, validities, strict=True)],
+        mig_files=[(path, *validity) for path, validity in zip(mig_paths, validities, strict=True)],
+        # the older example MIGs and AHBs don't match each other well enough to be sanitized
+        ahb_mig_pairs=[
+            (
+                _EXAMPLE_FILES / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml",
+                _EXAMPLE_FILES / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml",
+            )
+        ],
+    )
+
+
+def _private_submodule_corpus() -> _Corpus | None:
+    format_version_directories = sorted(
+        directory
+        for directory in _PRIVATE_SUBMODULE_ROOT.glob("FV*")
+        if directory.is_dir() and directory.name in EdifactFormatVersion.__members__
+    )
+    if not format_version_directories:
+        return None
+    corpus = _Corpus(name=_PRIVATE_SUBMODULE_ROOT.name, ahb_files=[], mig_files=[], ahb_mig_pairs=[])
+    for index, directory in enumerate(format_version_directories):
+        gueltig_von = get_edifact_format_version_valid_from(EdifactFormatVersion(directory.name))
+        gueltig_bis: date | None = None
+        if index + 1 < len(format_version_directories):
+            next_format_version = EdifactFormatVersion(format_version_directories[index + 1].name)
+            gueltig_bis = get_edifact_format_version_valid_from(next_format_version)
+        migs: dict[tuple[Path, str], Path] = {}
+        ahbs: dict[tuple[Path, str], Path] = {}
+        for path in sorted(directory.rglob("*.xml")):
+            match = _FORMAT_AND_TYPE_REGEX.match(path.name)
+            if match is None:
+                continue
+            key = (path.parent, match.group(1) + (match.group(3) or ""))
+            if match.group(2) == "AHB":
+                corpus.ahb_files.append((path, gueltig_von, gueltig_bis))
+                ahbs[key] = path
+            else:
+                corpus.mig_files.append((path, gueltig_von, gueltig_bis))
+                migs[key] = path
+        corpus.ahb_mig_pairs += [(ahb_path, migs[key]) for key, ahb_path in ahbs.items() if key in migs]
+    return corpus
+
+
+def _measure(corpus: _Corpus, stage_name: str, stage: _Stage, repeat: int, profile_memory: bool) -> StageResult:
+    timings: list[float] = []
+    items = 0
+    for _ in range(repeat):
+        run = stage()
+        start = time.perf_counter()
+        items = run()
+        timings.append(time.perf_counter() - start)
+    peak_memory_bytes: int | None = None
+    if profile_memory:
+        run = stage()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak_memory_bytes = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return StageResult(
+        corpus=corpus.name,
+        stage=stage_name,
+        items=items,
+        best_seconds=min(timings),
+        mean_seconds=sum(timings) / len(timings),
+        seconds=timings,
+        peak_memory_bytes=peak_memory_bytes,
+    )
+
+
+def _copy_of(sqlite_path: Path, working_directory: Path) -> Path:
+    """returns a fresh copy of the given database, so that a stage can modify it without affecting the next run"""
+    with tempfile.NamedTemporaryFile(suffix=".sqlite", dir=working_directory, delete=False) as copy_file:
+        copy_path = Path(copy_file.name)
+    shutil.copyfile(sqlite_path, copy_path)
+    return copy_path
+
+
+def _run_sql_in_session(sqlite_path: Path, function: Callable[[Session], int]) -> int:
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    try:
+        with Session(bind=engine) as session:
+            return function(session)
+    finally:
+        engine.dispose()
+
+
+def _query_ahbtabellen(session: Session) -> int:
+    """runs one query per Anwendungsfall on v_ahbtabellen (like a frontend that shows an AHB table)"""
+    pruefis_and_format_versions = session.execute(
+        sqlalchemy.text("SELECT DISTINCT pruefidentifikator, edifact_format_version FROM ahb_hierarchy_materialized")
+    ).all()
+    for pruefidentifikator, format_version in pruefis_and_format_versions:
+        session.execute(
+            sqlalchemy.text(
+                "SELECT * FROM v_ahbtabellen WHERE pruefidentifikator = :pruefi AND format_version = :fv "
+                "ORDER BY sort_path"
+            ),
+            {"pruefi": pruefidentifikator, "fv": format_version},
+        ).all()
+    return len(pruefis_and_format_versions)
+
+
+def _query_ahb_formatversion_diff(session: Session) -> int:
+    """compares each Anwendungsfall with the same Anwendungsfall in the previous format version"""
+    format_versions_per_pruefi: dict[str, list[str]] = {}
+    for pruefidentifikator, format_version in session.execute(
+        sqlalchemy.text(
+            "SELECT DISTINCT pruefidentifikator, edifact_format_version FROM ahb_hierarchy_materialized "
+            "WHERE edifact_format_version IS NOT NULL ORDER BY edifact_format_version"
+        )
+    ):
+        format_versions_per_pruefi.setdefault(pruefidentifikator, []).append(format_version)
+    number_of_queries = 0
+    for pruefidentifikator, format_versions in format_versions_per_pruefi.items():
+        for old_format_version, new_format_version in pairwise(format_versions):
+            session.execute(
+                sqlalchemy.text(
+                    "SELECT * FROM v_ahb_formatversion_diff WHERE old_format_version = :old_fv "
+                    "AND new_format_version = :new_fv AND old_pruefidentifikator = :pruefi "
+                    "AND new_pruefidentifikator = :pruefi ORDER BY sort_path"
+                ),
+                {"old_fv": old_format_version, "new_fv": new_format_version, "pruefi": pruefidentifikator},
+            ).all()
+            number_of_queries += 1
+    return number_of_queries
+
+
+def _stages(corpus: _Corpus, working_directory: Path) -> dict[str, _Stage]:  # pylint:disable=too-many-locals
+    """returns all stages (in pipeline order); the (untimed) inputs they share are prepared lazily, but only once"""
+    ahb_paths = [path for path, _, _ in corpus.ahb_files]
+    mig_paths = [path for path, _, _ in corpus.mig_files]
+    ahbs: list[Anwendungshandbuch] = []
+    migs: list[MessageImplementationGuide] = []
+    ahb_and_mig_per_pair: list[tuple[Anwendungshandbuch, MessageImplementationGuide]] = []
+    databases: dict[str, Path] = {}
+
+    def read_models() -> None:
+        if not ahbs:
+            ahbs.extend(AhbReader(path).read() for path in ahb_paths)
+            migs.extend(MigReader(path).read() for path in mig_paths)
+            ahb_and_mig_per_pair.extend(
+                (AhbReader(ahb_path).read(), MigReader(mig_path).read()) for ahb_path, mig_path in corpus.ahb_mig_pairs
+            )
+
+    def ahb_database() -> Path:
+        if "ahb" not in databases:
+            databases["ahb"] = Path(
+                shutil.move(create_db_and_populate_with_ahb_view(corpus.ahb_files), working_directory / "ahb.sqlite")
+            )
+        return databases["ahb"]
+
+    def mig_database() -> Path:
+        if "mig" not in databases:
+            databases["mig"] = Path(
+                shutil.move(create_db_and_populate_with_mig_view(corpus.mig_files), working_directory / "mig.sqlite")
+            )
+        return databases["mig"]
+
+    def read_migs() -> Callable[[], int]:
+        return lambda: len([MigReader(path).read() for path in mig_paths])
+
+    def read_ahbs() -> Callable[[], int]:
+        return lambda: len([AhbReader(path).read() for path in ahb_paths])
+
+    def sanitize() -> Callable[[], int]:
+        read_models()
+        # sanitize_ahb modifies the models in place, so every run gets its own copies
+        pairs = [(ahb.model_copy(deep=True), mig.model_copy(deep=True)) for ahb, mig in ahb_and_mig_per_pair]
+
+        def run() -> int:
+            for ahb, mig in pairs:
+                sanitize_ahb(mig, ahb)
+            return len(pairs)
+
+        return run
+
+    def dump_json() -> Callable[[], int]:
+        read_models()
+        return lambda: len([model.model_dump_json() for model in [*ahbs, *migs]])
+
+    def validate_json() -> Callable[[], int]:
+        read_models()
+        ahb_jsons = [ahb.model_dump_json() for ahb in ahbs]
+        mig_jsons = [mig.model_dump_json() for mig in migs]
+        return lambda: len(
+            [Anwendungshandbuch.model_validate_json(ahb_json) for ahb_json in ahb_jsons]
+            + [MessageImplementationGuide.model_validate_json(mig_json) for mig_json in mig_jsons]
+        )
+
+    def load_binary() -> Callable[[], int]:
+        read_models()
+        ahb_binaries = [binary.dumps(ahb) for ahb in ahbs]
+        mig_binaries = [binary.dumps(mig) for mig in migs]
+        return lambda: len(
+            [binary.loads(data, Anwendungshandbuch) for data in ahb_binaries]
+            + [binary.loads(data, MessageImplementationGuide) for data in mig_binaries]
+        )
+
+    def build_ahb_database() -> Callable[[], int]:
+        def run() -> int:
+            create_db_and_populate_with_ahb_view(corpus.ahb_files).unlink()
+            return len(corpus.ahb_files)
+
+        return run
+
+    def build_ahb_database_with_python_materializer() -> Callable[[], int]:
+        def run() -> int:
+            create_db_and_populate_with_ahb_view(corpus.ahb_files, use_python_materializer=True).unlink()
+            return len(corpus.ahb_files)
+
+        return run
+
+    def build_mig_database() -> Callable[[], int]:
+        def run() -> int:
+            create_db_and_populate_with_mig_view(corpus.mig_files, drop_raw_tables=True).unlink()
+            return len(corpus.mig_files)
+
+        return run
+
+    def build_mig_database_with_python_materializer() -> Callable[[], int]:
+        def run() -> int:
+            create_db_and_populate_with_mig_view(
+                corpus.mig_files, drop_raw_tables=True, use_python_materializer=True
+            ).unlink()
+            return len(corpus.mig_files)
+
+        return run
+
+    def rematerialize_ahb_view() -> Callable[[], int]:
+        sqlite_path = _copy_of(ahb_database(), working_directory)
+
+        def run(session: Session) -> int:
+            create_ahb_view(session)
+            return len(ahb_paths)
+
+        return lambda: _run_sql_in_session(sqlite_path, run)
+
+    def rematerialize_mig_view() -> Callable[[], int]:
+        sqlite_path = _copy_of(mig_database(), working_directory)
+
+        def run(session: Session) -> int:
+            create_mig_view(session)
+            return len(mig_paths)
+
+        return lambda: _run_sql_in_session(sqlite_path, run)
+
+    def fill_expression_table() -> Callable[[], int]:
+        if expression_view is None:
+            raise ImportError("create_and_fill_ahb_expression_table requires fundamend[ahbicht]")
+        sqlite_path = _copy_of(ahb_database(), working_directory)
+
+        def run(session: Session) -> int:
+            expression_view.create_and_fill_ahb_expression_table(session)
+            return int(session.scalar(sqlalchemy.text("SELECT COUNT(*) FROM ahb_expressions")) or 0)
+
+        return lambda: _run_sql_in_session(sqlite_path, run)
+
+    def database_with_views() -> Path:
+        if "views" not in databases:
+            sqlite_path = _copy_of(ahb_database(), working_directory)
+
+            def create_views(session: Session) -> int:
+                if expression_view is not None:
+                    # without the ahb_expressions, v_ahbtabellen just lacks the texts of the Bedingungen
+                    expression_view.create_and_fill_ahb_expression_table(session)
+                create_ahbtabellen_view(session)
+                create_ahb_formatversion_diff_view(session)
+                session.commit()
+                return 0
+
+            _run_sql_in_session(sqlite_path, create_views)
+            databases["views"] = sqlite_path
+        return databases["views"]
+
+    def query_ahbtabellen() -> Callable[[], int]:
+        sqlite_path = database_with_views()
+        return lambda: _run_sql_in_session(sqlite_path, _query_ahbtabellen)
+
+    def query_ahb_formatversion_diff() -> Callable[[], int]:
+        sqlite_path = database_with_views()
+        return lambda: _run_sql_in_session(sqlite_path, _query_ahb_formatversion_diff)
+
+    return {
+        "MigReader.read": read_migs,
+        "AhbReader.read": read_ahbs,
+        "sanitize_ahb": sanitize,
+        "model_dump_json": dump_json,
+        "model_validate_json": validate_json,
+        "binary.loads": load_binary,
+        "create_db_and_populate_with_ahb_view": build_ahb_database,
+        "create_db_and_populate_with_ahb_view (python materializer)": build_ahb_database_with_python_materializer,
+        "create_db_and_populate_with_mig_view": build_mig_database,
+        "create_db_and_populate_with_mig_view (python materializer)": build_mig_database_with_python_materializer,
+        "create_ahb_view": rematerialize_ahb_view,
+        "create_mig_view": rematerialize_mig_view,
+        "create_and_fill_ahb_expression_table": fill_expression_table,
+        "query v_ahbtabellen": query_ahbtabellen,
+        "query v_ahb_formatversion_diff": query_ahb_formatversion_diff,
+    }
+
+
+def _compare_with_baseline(report: BenchmarkReport, baseline_path: Path, max_slowdown: float | None) -> bool:
+    """prints the ratio of each stage to the baseline; returns False if any stage is slower than max_slowdown allows"""
+    baseline = BenchmarkReport.model_validate_json(baseline_path.read_text(encoding="utf-8"))
+    baseline_results = {(result.corpus, result.stage): result for result in baseline.results}
+    within_limits = True
+    for result in report.results:
+        baseline_result = baseline_results.get((result.corpus, result.stage))
+        if baseline_result is None or baseline_result.best_seconds == 0:
+            continue
+        ratio = result.best_seconds / baseline_result.best_seconds
+        is_regression = max_slowdown is not None and ratio > max_slowdown
+        within_limits = within_limits and not is_regression
+        print(
+            f"{result.corpus} / {result.stage}: {ratio:.2f}x the baseline" + (" (REGRESSION)" if is_regression else ""),
+            file=sys.stderr,
+        )
+    return within_limits
+
+
+def main() -> None:
+    """entry point of the benchmark suite"""
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per stage")
+    argument_parser.add_argument("--output", type=Path, help="write the JSON results to this file (default: stdout)")
+    argument_parser.add_argument("--stage", action="append", help="only run the given stage(s)")
+    argument_parser.add_argument("--no-memory", action="store_true", help="skip the (slower) tracemalloc run")
+    argument_parser.add_argument("--baseline", type=Path, help="JSON results of an earlier run to compare with")
+    argument_parser.add_argument(
+        "--max-slowdown", type=float, help="exit with code 1 if a stage is slower than this factor times the baseline"
+    )
+    arguments = argument_parser.parse_args()
+    report = BenchmarkReport(
+        created_at=datetime.now(UTC),
+        python_version=platform.python_version(),
+        platform=platform.platform(),
+        fundamend_version=_package_version("fundamend"),
+        repeat=arguments.repeat,
+    )
+    corpora = [_example_files_corpus()]
+    if (private_submodule_corpus := _private_submodule_corpus()) is not None:
+        corpora.append(private_submodule_corpus)
+    with tempfile.TemporaryDirectory() as working_directory:
+        for corpus in corpora:
+            for stage_name, stage in _stages(corpus, Path(working_directory)).items():
+                if arguments.stage and stage_name not in arguments.stage:
+                    continue
+                try:
+                    result = _measure(corpus, stage_name, stage, arguments.repeat, not arguments.no_memory)
+                except ImportError as import_error:  # e.g. ahbicht is not installed
+                    print(f"{corpus.name} / {stage_name}: skipped ({import_error})", file=sys.stderr)
+                    continue
+                report.results.append(result)
+                print(
+                    f"{corpus.name} / {stage_name}: {result.items} items, best {result.best_seconds:.3f}s"
+                    + (
+                        f", peak memory {result.peak_memory_bytes / 1024**2:.1f} MiB"
+                        if result.peak_memory_bytes is not None
+                        else ""
+                    ),
+                    file=sys.stderr,
+                )
+    report_json = json.dumps(report.model_dump(mode="json"), indent=2)
+    if arguments.output:
+        arguments.output.write_text(report_json, encoding="utf-8")
+    else:
+        print(report_json)
+    if arguments.baseline and not _compare_with_baseline(report, arguments.baseline, arguments.max_slowdown):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
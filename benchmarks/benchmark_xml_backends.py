@@ -0,0 +1,63 @@
+"""
+Compares the stdlib and the lxml parser backend of the MigReader and AhbReader.
+
+It reads every AHB and MIG XML from unittests/example_files and - if the private submodule is checked out - the full
+corpus from xml-migs-and-ahbs with both backends, checks that the resulting models are identical and reports the
+(best of n) runtimes. Run it from the repository root:
+
+    python benchmarks/benchmark_xml_backends.py --repeat 3
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+from fundamend import AhbReader, MigReader
+from fundamend.reader.xml_backend import XmlParserBackend, is_lxml_available
+
+_REPO_ROOT = Path(__file__).parent.parent
+_CORPUS_ROOTS = [_REPO_ROOT / "unittests" / "example_files", _REPO_ROOT / "xml-migs-and-ahbs"]
+
+
+def _read_all(paths: list[Path], backend: XmlParserBackend) -> list[object]:
+    return [
+        (
+            AhbReader(path, parser_backend=backend) if "_AHB" in path.name else MigReader(path, parser_backend=backend)
+        ).read()
+        for path in paths
+    ]
+
+
+def _best_of(repeat: int, paths: list[Path], backend: XmlParserBackend) -> float:
+    """returns the fastest of `repeat` runs (reading all paths with the given backend) in seconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _read_all(paths, backend)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main() -> None:
+    """entry point of the benchmark"""
+    argument_parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    argument_parser.add_argument("--repeat", type=int, default=3, help="number of runs per backend (best one counts)")
+    arguments = argument_parser.parse_args()
+    if not is_lxml_available():
+        raise SystemExit("lxml is not installed; pip install fundamend[lxml]")
+    for corpus_root in _CORPUS_ROOTS:
+        paths = sorted(p for p in corpus_root.rglob("*.xml") if "_AHB" in p.name or "_MIG" in p.name)
+        if not paths:
+            print(f"{corpus_root.name}: no XML files found, skipping")
+            continue
+        assert _read_all(paths, "stdlib") == _read_all(paths, "lxml"), "the backends yield different models"
+        stdlib_seconds = _best_of(arguments.repeat, paths, "stdlib")
+        lxml_seconds = _best_of(arguments.repeat, paths, "lxml")
+        print(
+            f"{corpus_root.name}: {len(paths)} files, stdlib {stdlib_seconds:.3f}s, lxml {lxml_seconds:.3f}s, "
+            f"speedup {stdlib_seconds / lxml_seconds:.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+"""
+A compact binary serialisation of Anwendungshandbuch and MessageImplementationGuide, e.g. for the transfer between
+services or for warm loads. Loading it is considerably faster than validating the equivalent JSON, because the (frozen)
+models are constructed without validation.
+
+The layout is:
+
+- the magic bytes ``FMB``, the format version (one byte) and the byte length of the string table (uint32)
+- the string table: all strings, UTF-8 encoded and NUL separated (XML can't contain NUL characters)
+- everything else is an array of little endian uint32:
+  - the number of strings
+  - the type table: the number of types, then for each model or enum class the index of its name and the number and
+    indexes of its field names (enums have no fields)
+  - the enum table: the number of enum members, then for each the index of its type and of its value
+  - the root value
+
+Each value is a single uint32: the lowest four bits are a tag, the other bits the payload, e.g. the index of a string,
+the length of a tuple (whose items follow) or the type of a model (whose field values follow). So each of the many
+repeated names, statuses and code values is stored (and, when loading, allocated) only once. Equal models (e.g.
+segments that occur in many Anwendungsfälle) are stored only once, too, and referenced afterwards.
+Unlike pickle, loading only ever creates the fundamend models, enums, tuples, strings, ints, bools and dates.
+"""
+
+import struct
+import sys
+from array import array
+from collections.abc import Callable
+from datetime import date
+from enum import StrEnum
+from typing import IO, Any, TypeVar
+
+from efoli import EdifactFormat
+from pydantic import BaseModel
+
+from fundamend.models import anwendungshandbuch as ahb
+from fundamend.models import messageimplementationguide as mig
+from fundamend.reader.construction import unvalidated_constructor
+
+_MAGIC = b"FMB"
+_FORMAT_VERSION = 1
+_HEADER = struct.Struct("<3sBI")
+
+_NONE, _FALSE, _TRUE, _INT, _STR, _DATE, _TUPLE, _MODEL, _MODEL_REFERENCE, _ENUM = range(10)
+_TAG_BITS = 4
+_TAG_MASK = (1 << _TAG_BITS) - 1
+_MAX_PAYLOAD = (1 << (32 - _TAG_BITS)) - 1
+
+_ModelT = TypeVar("_ModelT", ahb.Anwendungshandbuch, mig.MessageImplementationGuide)
+
+_TYPES_BY_NAME: dict[str, type[BaseModel] | type[StrEnum]] = {
+    **{
+        f"ahb.{model_class.__name__}": model_class
+        for model_class in (
+            ahb.Anwendungshandbuch,
+            ahb.Anwendungsfall,
+            ahb.Bedingung,
+            ahb.UbBedingung,
+            ahb.Paket,
+            ahb.SegmentGroup,
+            ahb.Segment,
+            ahb.DataElementGroup,
+            ahb.DataElement,
+            ahb.Code,
+        )
+    },
+    **{
+        f"mig.{model_class.__name__}": model_class
+        for model_class in (
+            mig.MessageImplementationGuide,
+            mig.SegmentGroup,
+            mig.Segment,
+            mig.DataElementGroup,
+            mig.DataElement,
+            mig.Code,
+        )
+    },
+    "EdifactFormat": EdifactFormat,
+    "MigStatus": mig.MigStatus,
+}
+"""all classes that may occur in the binary format, by a name that doesn't depend on the module layout"""
+
+_NAMES_BY_TYPE = {type_: name for name, type_ in _TYPES_BY_NAME.items()}
+
+_SHAREABLE_TYPES: frozenset[type[BaseModel]] = frozenset(
+    {ahb.Code, ahb.Bedingung, ahb.UbBedingung, ahb.Paket, mig.Code}
+)
+"""
+When loading, the references to equal instances of these models share the same instance. The other models may be
+modified in place (e.g. by sanitize_ahb), so their references are cloned (which is still much cheaper than reading).
+"""
+
+
+class _Writer:
+    """collects the string, type and enum tables while writing the values"""
+
+    def __init__(self) -> None:
+        self.strings: dict[str, int] = {}
+        self.types: dict[type[BaseModel] | type[StrEnum], int] = {}
+        self.enum_members: dict[StrEnum, int] = {}
+        self.models: dict[BaseModel, int] = {}
+        self.body = array("I")
+
+    def append(self, tag: int, payload: int) -> None:
+        if payload > _MAX_PAYLOAD:
+            raise ValueError(f"{payload} is too large for the binary format")
+        self.body.append(payload << _TAG_BITS | tag)
+
+    def string_index(self, value: str) -> int:
+        index = self.strings.get(value)
+        if index is None:
+            if "\0" in value:
+                raise ValueError("Strings with NUL characters can't be serialised in the binary format")
+            index = self.strings[value] = len(self.strings)
+        return index
+
+    def type_index(self, type_: type[BaseModel] | type[StrEnum]) -> int:
+        index = self.types.get(type_)
+        if index is None:
+            if type_ not in _NAMES_BY_TYPE:
+                raise TypeError(f"{type_} can't be serialised in the binary format")
+            index = self.types[type_] = len(self.types)
+        return index
+
+    def write(self, value: Any) -> None:
+        if value is None:
+            self.append(_NONE, 0)
+        elif value is True:
+            self.append(_TRUE, 0)
+        elif value is False:
+            self.append(_FALSE, 0)
+        elif isinstance(value, StrEnum):  # before str, because StrEnums are strs
+            index = self.enum_members.get(value)
+            if index is None:
+                self.type_index(type(value))
+                index = self.enum_members[value] = len(self.enum_members)
+            self.append(_ENUM, index)
+        elif isinstance(value, str):
+            self.append(_STR, self.string_index(value))
+        elif isinstance(value, int):
+            self.append(_INT, value << 1 if value >= 0 else ((-value) << 1) - 1)  # zigzag encoding
+        elif isinstance(value, date):
+            self.append(_DATE, value.toordinal())
+        elif isinstance(value, tuple):
+            self.append(_TUPLE, len(value))
+            for item in value:
+                self.write(item)
+        elif isinstance(value, BaseModel):
+            index = self.models.get(value)
+            if index is not None:
+                # the models are frozen, so an equal model that has already been written can be referenced instead
+                self.append(_MODEL_REFERENCE, index)
+                return
+            self.append(_MODEL, self.type_index(type(value)))
+            for field_name in type(value).model_fields:
+                self.write(getattr(value, field_name))
+            self.models[value] = len(self.models)  # after its children, in the same order in which they're read
+        else:
+            raise TypeError(f"{type(value)} can't be serialised in the binary format")
+
+    def to_bytes(self) -> bytes:
+        # the names of the types and fields and the enum values have to be in the string table, too
+        type_table = [
+            (
+                self.string_index(_NAMES_BY_TYPE[type_]),
+                [self.string_index(field_name) for field_name in getattr(type_, "model_fields", {})],
+            )
+            for type_ in self.types
+        ]
+        enum_table = [(self.types[type(member)], self.string_index(member.value)) for member in self.enum_members]
+        numbers = array("I", [len(self.strings), len(type_table)])
+        for name_index, field_indexes in type_table:
+            numbers.append(name_index)
+            numbers.append(len(field_indexes))
+            numbers.extend(field_indexes)
+        numbers.append(len(enum_table))
+        for type_index, value_index in enum_table:
+            numbers.append(type_index)
+            numbers.append(value_index)
+        numbers.extend(self.body)
+        if sys.byteorder == "big":
+            numbers.byteswap()
+        string_table = "\0".join(self.strings).encode("utf-8")  # dicts keep the insertion (= index) order
+        return _HEADER.pack(_MAGIC, _FORMAT_VERSION, len(string_table)) + string_table + numbers.tobytes()
+
+
+def _constructor(model_class: type[BaseModel], field_names: tuple[str, ...]) -> Callable[[dict[str, Any]], BaseModel]:
+    """
+    returns a function that creates an instance of the model_class from (trusted) field values without validation
+    """
+    if field_names != tuple(model_class.model_fields) or model_class.__pydantic_post_init__:
+        # e.g. data from an older fundamend version (with fewer fields): model_construct fills in the defaults
+        return lambda values: model_class.model_construct(**values)
+    return unvalidated_constructor(model_class)
+
+
+def _load(data: bytes) -> Any:  # pylint:disable=too-many-locals
+    magic, format_version, string_table_length = _HEADER.unpack_from(data)
+    if magic != _MAGIC:
+        raise ValueError("The data are not in the fundamend binary format")
+    if format_version != _FORMAT_VERSION:
+        raise ValueError(f"Unsupported version {format_version} of the fundamend binary format")
+    string_table_end = _HEADER.size + string_table_length
+    numbers = array("I")
+    numbers.frombytes(data[string_table_end:])
+    if sys.byteorder == "big":
+        numbers.byteswap()
+    next_number = iter(numbers.tolist()).__next__
+
+    number_of_strings = next_number()
+    strings = data[_HEADER.size : string_table_end].decode("utf-8").split("\0") if number_of_strings else []
+    if len(strings) != number_of_strings:
+        raise ValueError("The string table of the fundamend binary format is corrupt")
+    types: list[type[BaseModel] | type[StrEnum]] = []
+    models: list[tuple[Callable[[dict[str, Any]], BaseModel], tuple[str, ...]] | None] = []
+    for _ in range(next_number()):
+        type_name = strings[next_number()]
+        if type_name not in _TYPES_BY_NAME:
+            raise ValueError(f"Unknown type '{type_name}' in the fundamend binary format")
+        field_names = tuple(strings[next_number()] for _ in range(next_number()))
+        type_ = _TYPES_BY_NAME[type_name]
+        types.append(type_)
+        if issubclass(type_, StrEnum):
+            models.append(None)
+            continue
+        if not set(field_names) <= set(type_.model_fields):
+            raise ValueError(f"The fields {field_names} don't match those of {type_name}")
+        models.append((_constructor(type_, field_names), field_names))
+    enum_members: list[StrEnum] = []
+    for _ in range(next_number()):
+        enum_type = types[next_number()]
+        if not issubclass(enum_type, StrEnum):
+            raise ValueError(f"{enum_type} is not an enum")
+        enum_members.append(enum_type(strings[next_number()]))
+    constructors = {type_: model[0] for type_, model in zip(types, models, strict=True) if model is not None}
+    read_models: list[BaseModel] = []
+
+    def clone(model: BaseModel) -> BaseModel:
+        """returns an equal copy of the model that shares no modifiable (sub-)model with the original"""
+        values = model.__dict__.copy()
+        for field_name, value in values.items():
+            if isinstance(value, BaseModel) and type(value) not in _SHAREABLE_TYPES:
+                values[field_name] = clone(value)
+            elif type(value) is tuple and value and isinstance(value[0], BaseModel):
+                values[field_name] = tuple([item if type(item) in _SHAREABLE_TYPES else clone(item) for item in value])
+        return constructors[type(model)](values)
+
+    def read() -> Any:  # noqa: PLR0911
+        number = next_number()
+        tag = number & _TAG_MASK
+        # ordered by frequency
+        if tag == _STR:
+            return strings[number >> _TAG_BITS]
+        if tag == _MODEL:
+            model_type = models[number >> _TAG_BITS]
+            if model_type is None:
+                raise ValueError("An enum can't be used as model")
+            construct, field_names = model_type
+            model = construct({field_name: read() for field_name in field_names})
+            read_models.append(model)
+            return model
+        if tag == _NONE:
+            return None
+        if tag == _TUPLE:
+            return tuple([read() for _ in range(number >> _TAG_BITS)])
+        if tag == _MODEL_REFERENCE:
+            referenced_model = read_models[number >> _TAG_BITS]
+            return referenced_model if type(referenced_model) in _SHAREABLE_TYPES else clone(referenced_model)
+        if tag == _ENUM:
+            return enum_members[number >> _TAG_BITS]
+        if tag == _TRUE:
+            return True
+        if tag == _FALSE:
+            return False
+        if tag == _INT:
+            zigzag = number >> _TAG_BITS
+            return zigzag >> 1 if not zigzag & 1 else -((zigzag + 1) >> 1)
+        if tag == _DATE:
+            return date.fromordinal(number >> _TAG_BITS)
+        raise ValueError(f"Unknown tag {tag} in the fundamend binary format")
+
+    result = read()
+    try:
+        next_number()
+    except StopIteration:
+        return result
+    raise ValueError("The data in the fundamend binary format have trailing bytes")
+
+
+def dumps(model: ahb.Anwendungshandbuch | mig.MessageImplementationGuide) -> bytes:
+    """returns the binary representation of the given Anwendungshandbuch or MessageImplementationGuide"""
+    writer = _Writer()
+    writer.write(model)
+    return writer.to_bytes()
+
+
+def loads(data: bytes, model_class: type[_ModelT]) -> _ModelT:
+    """
+    returns the Anwendungshandbuch or MessageImplementationGuide (model_class) from the output of dumps.
+    The models are constructed without validation, so the data must have been created by dumps.
+    """
+    try:
+        result = _load(data)
+    except (IndexError, StopIteration, struct.error, UnicodeDecodeError) as error:
+        raise ValueError("The data in the fundamend binary format are truncated or corrupt") from error
+    if not isinstance(result, model_class):
+        raise ValueError(f"The data contain a {type(result).__name__} but a {model_class.__name__} was expected")
+    return result
+
+
+def dump(model: ahb.Anwendungshandbuch | mig.MessageImplementationGuide, binary_file: IO[bytes]) -> None:
+    """writes the binary representation of the model to the (binary) file (see dumps)"""
+    binary_file.write(dumps(model))
+
+
+def load(binary_file: IO[bytes], model_class: type[_ModelT]) -> _ModelT:
+    """reads an Anwendungshandbuch or MessageImplementationGuide (model_class) from the (binary) file (see loads)"""
+    return loads(binary_file.read(), model_class)
+
+
+__all__ = ["dump", "dumps", "load", "loads"]
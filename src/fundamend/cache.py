@@ -0,0 +1,168 @@
+"""
+A content-addressed on-disk cache for parsed AHBs and MIGs.
+Parsing the BDEW XMLs (ElementTree + string normalisation) is the dominant cost when a process starts; if the same
+(unchanged) XML has been parsed before, the model is loaded from a compact binary form instead.
+The cache key is the SHA-256 of the XML content plus the fundamend version, so neither renaming nor touching an XML
+nor a fundamend upgrade ever yields stale models.
+
+The cached files are (zlib compressed) pickles; only use a cache directory that no one but you can write to.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import zlib
+from collections.abc import Callable
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as get_package_version
+from pathlib import Path
+from typing import Literal, TypeVar
+
+from fundamend.models.anwendungshandbuch import Anwendungshandbuch
+from fundamend.models.messageimplementationguide import MessageImplementationGuide
+from fundamend.reader import AhbReader, MigReader
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE_BYTES = 1024**3
+"""the cache directory is shrunk to (at most) 1 GiB by default"""
+
+_CACHE_FILE_SUFFIX = ".fundamend-cache"
+
+_ModelT = TypeVar("_ModelT", Anwendungshandbuch, MessageImplementationGuide)
+
+
+def _fundamend_version() -> str:
+    try:
+        return get_package_version("fundamend")
+    except PackageNotFoundError:
+        # e.g. if the src directory is used without installing the package; then we can't tell versions apart
+        return "unknown"
+
+
+def default_cache_dir() -> Path:
+    """
+    returns the directory in which the models are cached by default: $FUNDAMEND_CACHE_DIR if set, otherwise
+    $XDG_CACHE_HOME/fundamend (~/.cache/fundamend)
+    """
+    if os.environ.get("FUNDAMEND_CACHE_DIR"):
+        return Path(os.environ["FUNDAMEND_CACHE_DIR"])
+    return Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "fundamend"
+
+
+class ModelCache:
+    """
+    A size-bounded on-disk cache of parsed Anwendungshandbücher and MessageImplementationGuides.
+    If the cache grows larger than max_size_bytes, the least recently used entries are evicted.
+    """
+
+    def __init__(self, cache_dir: Path | None = None, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES):
+        """
+        initialize by providing the directory in which the cached models are stored (defaults to default_cache_dir())
+        and the maximum size of all cached models together.
+        """
+        self._cache_dir = cache_dir or default_cache_dir()
+        self._max_size_bytes = max_size_bytes
+
+    @property
+    def cache_dir(self) -> Path:
+        """the directory in which the cached models are stored"""
+        return self._cache_dir
+
+    def _cache_path(self, kind: Literal["ahb", "mig"], xml_bytes: bytes) -> Path:
+        key = hashlib.sha256(xml_bytes)
+        key.update(b"\0" + kind.encode() + b"\0" + _fundamend_version().encode())
+        return self._cache_dir / f"{kind}_{key.hexdigest()}{_CACHE_FILE_SUFFIX}"
+
+    def _load(
+        self,
+        kind: Literal["ahb", "mig"],
+        xml_path: Path,
+        model_class: type[_ModelT],
+        read: Callable[[Path], _ModelT],
+    ) -> _ModelT:
+        cache_path = self._cache_path(kind, xml_path.read_bytes())
+        try:
+            with open(cache_path, "rb") as cache_file:
+                cached = pickle.loads(zlib.decompress(cache_file.read()))
+        except FileNotFoundError:
+            cached = None
+        except Exception as error:  # pylint:disable=broad-exception-caught
+            # a broken cache entry must never break reading the model (unpickling may raise almost anything, e.g. a
+            # ValueError, TypeError or KeyError); we just parse the XML again
+            _logger.warning("Ignoring unreadable cache entry %s: %s", cache_path, error)
+            cached = None
+        if isinstance(cached, model_class):
+            with contextlib.suppress(OSError):  # e.g. a read-only (shared) cache directory; the entry is still valid
+                os.utime(cache_path)  # marks the entry as recently used
+            return cached
+        model = read(xml_path)
+        self._store(cache_path, model)
+        return model
+
+    def _store(self, cache_path: Path, model: Anwendungshandbuch | MessageImplementationGuide) -> None:
+        try:
+            self._cache_dir.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self._cache_dir, suffix=".tmp", delete=False) as temporary_file:
+                temporary_file.write(zlib.compress(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL), 1))
+            os.replace(temporary_file.name, cache_path)  # atomic; concurrent readers never see a partial entry
+        except OSError as os_error:
+            # a read-only cache directory must not break reading the model; we just lose the caching
+            _logger.warning("Could not write the cache entry %s: %s", cache_path, os_error)
+            return
+        self.evict()
+
+    def load_ahb(self, xml_path: Path) -> Anwendungshandbuch:
+        """returns the Anwendungshandbuch from the given XML file; from the cache, if it has been read before"""
+        return self._load("ahb", xml_path, Anwendungshandbuch, lambda path: AhbReader(path).read())
+
+    def load_mig(self, xml_path: Path) -> MessageImplementationGuide:
+        """returns the MessageImplementationGuide from the given XML file; from the cache, if it has been read before"""
+        return self._load("mig", xml_path, MessageImplementationGuide, lambda path: MigReader(path).read())
+
+    def evict(self) -> None:
+        """deletes the least recently used entries until the cache is not larger than max_size_bytes anymore"""
+        entries: list[tuple[float, int, Path]] = []
+        for cache_path in self._cache_dir.glob(f"*{_CACHE_FILE_SUFFIX}"):
+            try:
+                stat = cache_path.stat()
+            except FileNotFoundError:
+                continue  # evicted by another process in the meantime
+            entries.append((stat.st_mtime, stat.st_size, cache_path))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, cache_path in sorted(entries):
+            if total_size <= self._max_size_bytes:
+                break
+            cache_path.unlink(missing_ok=True)
+            total_size -= size
+
+    def clear(self) -> None:
+        """deletes all cached models"""
+        for cache_path in self._cache_dir.glob(f"*{_CACHE_FILE_SUFFIX}"):
+            cache_path.unlink(missing_ok=True)
+
+
+def load_ahb(
+    xml_path: Path, cache_dir: Path | None = None, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES
+) -> Anwendungshandbuch:
+    """
+    returns the Anwendungshandbuch from the given XML file just like AhbReader(xml_path).read(), but uses the on-disk
+    cache (see ModelCache) in cache_dir (defaults to default_cache_dir())
+    """
+    return ModelCache(cache_dir, max_size_bytes).load_ahb(xml_path)
+
+
+def load_mig(
+    xml_path: Path, cache_dir: Path | None = None, max_size_bytes: int = DEFAULT_MAX_SIZE_BYTES
+) -> MessageImplementationGuide:
+    """
+    returns the MessageImplementationGuide from the given XML file just like MigReader(xml_path).read(), but uses the
+    on-disk cache (see ModelCache) in cache_dir (defaults to default_cache_dir())
+    """
+    return ModelCache(cache_dir, max_size_bytes).load_mig(xml_path)
+
+
+__all__ = ["DEFAULT_MAX_SIZE_BYTES", "ModelCache", "default_cache_dir", "load_ahb", "load_mig"]
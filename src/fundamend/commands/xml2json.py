@@ -2,38 +2,82 @@
 Contains the command to convert XML files to JSON files.
 """
 
+import hashlib
+import json
+import os
 import re
+import tempfile
+import time
 from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
 from itertools import groupby
 from pathlib import Path
-from typing import Annotated, Literal
+from typing import Annotated, Any, Literal, NamedTuple
 
 import typer
 
 from fundamend import AhbReader, Anwendungshandbuch, MessageImplementationGuide, MigReader
+from fundamend.cache import _fundamend_version
 from fundamend.commands.app import app
-from fundamend.sanitize import sanitize_ahb
+from fundamend.models.anwendungshandbuch import Anwendungsfall
+from fundamend.sanitize import (
+    add_must_not_pattern_to_ahb_conditions,
+    remove_example_codes_recursive,
+    sanitize_ahb,
+    sanitize_anwendungsfall,
+)
 
 FORMAT_AND_TYPE_REGEX = re.compile(r"^([A-Z]+)_(AHB|MIG)_(?:(Gas|Strom)_)?")
 
+MANIFEST_FILE_NAME = ".xml2json_manifest.json"
+"""the name of the file in which the incremental dir mode stores what has been converted (in the converted directory)"""
 
-def _write_ahb_models_splitted(
-    model: Anwendungshandbuch,
-    ahb_dir: Path,
+
+def _write_if_changed(file_path: Path, content: str, only_write_changes: bool) -> None:
+    """writes the content to the file; if only_write_changes is set, the file is left untouched if it's up to date"""
+    if only_write_changes and file_path.is_file() and file_path.read_text(encoding="utf-8") == content:
+        return
+    with open(file_path, encoding="utf-8", mode="w") as outfile:
+        outfile.write(content)
+
+
+def _write_ahb_splitted_streaming(
+    ahb_xml_file_path: Path,
+    sanitize_against: MessageImplementationGuide | None,
     *,
     compressed: bool = False,
+    only_write_changes: bool = False,
 ) -> None:
-    """Writes the given Anwendungshandbuch model to multiple JSON files, one for each Anwendungsfall."""
+    """
+    Writes the AHB from the given XML file to multiple JSON files, one for each Anwendungsfall, in a directory named
+    after the XML file. The AHB is read in streaming mode: each Anwendungsfall is parsed, sanitized (against the
+    sanitize_against MIG, if given), written and released before the next one is read, so that only one Anwendungsfall
+    is kept in memory at a time. The meta.json is written from the header and the Bedingungen, UB-Bedingungen and
+    Pakete. If only_write_changes is set, files whose content did not change are not rewritten.
+    """
+    ahb_dir = ahb_xml_file_path.with_suffix("")
     ahb_dir.mkdir(parents=True, exist_ok=True)
-    for anwendungsfall in model.anwendungsfaelle:
-        json_file_path = ahb_dir / f"{anwendungsfall.pruefidentifikator}.json"
-        with open(json_file_path, encoding="utf-8", mode="w") as outfile:
-            outfile.write(anwendungsfall.model_dump_json(indent=None if compressed else 2))
+
+    def write_anwendungsfall(anwendungsfall: Anwendungsfall) -> None:
+        if sanitize_against is not None:
+            sanitize_anwendungsfall(sanitize_against, anwendungsfall)
+        _write_if_changed(
+            ahb_dir / f"{anwendungsfall.pruefidentifikator}.json",
+            anwendungsfall.model_dump_json(indent=None if compressed else 2),
+            only_write_changes,
+        )
+
+    model_without_anwendungsfaelle = AhbReader(ahb_xml_file_path, streaming=True).read_streamed(write_anwendungsfall)
+    if sanitize_against is not None:
+        add_must_not_pattern_to_ahb_conditions(model_without_anwendungsfaelle)
 
     # Write meta file
-    ahb_meta_file_path = ahb_dir / "meta.json"
-    with open(ahb_meta_file_path, encoding="utf-8", mode="w") as outfile:
-        outfile.write(model.model_dump_json(exclude={"anwendungsfaelle"}, indent=None if compressed else 2))
+    _write_if_changed(
+        ahb_dir / "meta.json",
+        model_without_anwendungsfaelle.model_dump_json(exclude={"anwendungsfaelle"}, indent=None if compressed else 2),
+        only_write_changes,
+    )
+    typer.echo(f"Successfully converted {ahb_xml_file_path} to multiple JSON files in {ahb_dir}")
 
 
 def _write_model_to_json_file(
@@ -41,20 +85,22 @@ def _write_model_to_json_file(
     xml_file_path: Path,
     *,
     compressed: bool = False,
-    split_ahb: bool = False,
+    only_write_changes: bool = False,
 ) -> None:
     """Writes the given model to a JSON file at the specified path."""
-    if split_ahb:
-        if not isinstance(model, Anwendungshandbuch):
-            raise ValueError("split_ahb can only be used with Anwendungshandbuch models")
-        ahb_dir = xml_file_path.with_suffix("")
-        _write_ahb_models_splitted(model, ahb_dir, compressed=compressed)
-        typer.echo(f"Successfully converted {xml_file_path} to multiple JSON files in {ahb_dir}")
-    else:
-        json_file_path = xml_file_path.with_suffix(".json")
-        with open(json_file_path, encoding="utf-8", mode="w") as outfile:
-            outfile.write(model.model_dump_json(indent=None if compressed else 2))
-        typer.echo(f"Successfully converted {xml_file_path} to JSON {json_file_path}")
+    json_file_path = xml_file_path.with_suffix(".json")
+    _write_if_changed(json_file_path, model.model_dump_json(indent=None if compressed else 2), only_write_changes)
+    typer.echo(f"Successfully converted {xml_file_path} to JSON {json_file_path}")
+
+
+def _read_mig(mig_xml_file_path: Path, sanitize: bool = False) -> MessageImplementationGuide:
+    """reads the MIG; if sanitize is set, its example codes are removed (the MIG part of sanitize_ahb)"""
+    if not mig_xml_file_path.is_file():  # pragma: no cover
+        raise ValueError(f"The given path {mig_xml_file_path.absolute()} is not a file")
+    mig_model = MigReader(mig_xml_file_path).read()
+    if sanitize:
+        remove_example_codes_recursive(mig_model)
+    return mig_model
 
 
 def _convert_to_json_files(
@@ -76,13 +122,109 @@ def _convert_to_json_files(
     return mig_model, ahb_model
 
 
+class _PairResult(NamedTuple):
+    """the outcome of converting one MIG/AHB pair (in dir mode)"""
+
+    mig_path: Path
+    ahb_path: Path
+    seconds: float
+    error: str | None
+    """None if the conversion succeeded"""
+    up_to_date: bool = False
+    """True if the conversion was skipped, because the outputs were up to date (incremental mode)"""
+
+
+def _convert_pair(  # pylint:disable=too-many-arguments
+    mig_path: Path, ahb_path: Path, sanitize: bool, compressed: bool, split_ahb: bool, only_write_changes: bool = False
+) -> _PairResult:
+    """
+    converts one MIG/AHB pair to JSON files; failures are returned instead of raised, so that the other pairs are still
+    converted (this is a module level function, so that it can be run in a worker process)
+    """
+    start = time.perf_counter()
+    try:
+        if split_ahb:
+            mig = _read_mig(mig_path, sanitize=sanitize)
+            _write_model_to_json_file(
+                mig, mig_path.with_suffix(".json"), compressed=compressed, only_write_changes=only_write_changes
+            )
+            _write_ahb_splitted_streaming(
+                ahb_path,
+                mig if sanitize else None,
+                compressed=compressed,
+                only_write_changes=only_write_changes,
+            )
+        else:
+            mig, ahb = _convert_to_json_files(mig_path, ahb_path, sanitize=sanitize)
+            _write_model_to_json_file(
+                mig, mig_path.with_suffix(".json"), compressed=compressed, only_write_changes=only_write_changes
+            )
+            _write_model_to_json_file(
+                ahb, ahb_path.with_suffix(".json"), compressed=compressed, only_write_changes=only_write_changes
+            )
+    except Exception as error:  # pylint:disable=broad-exception-caught
+        return _PairResult(mig_path, ahb_path, time.perf_counter() - start, f"{type(error).__name__}: {error}")
+    return _PairResult(mig_path, ahb_path, time.perf_counter() - start, None)
+
+
+def _manifest_entry(
+    mig_path: Path, ahb_path: Path, sanitize: bool, compressed: bool, split_ahb: bool
+) -> dict[str, Any]:
+    """describes everything the JSON outputs of a MIG/AHB pair depend on"""
+    return {
+        "mig_sha256": hashlib.sha256(mig_path.read_bytes()).hexdigest(),
+        "ahb_sha256": hashlib.sha256(ahb_path.read_bytes()).hexdigest(),
+        "sanitize": sanitize,
+        "compressed": compressed,
+        "split_ahb": split_ahb,
+    }
+
+
+def _outputs_exist(mig_path: Path, ahb_path: Path, split_ahb: bool) -> bool:
+    if split_ahb:
+        return mig_path.with_suffix(".json").is_file() and (ahb_path.with_suffix("") / "meta.json").is_file()
+    return mig_path.with_suffix(".json").is_file() and ahb_path.with_suffix(".json").is_file()
+
+
+def _read_manifest(manifest_path: Path) -> dict[str, Any]:
+    """returns the pairs from the manifest; an unreadable manifest or one of another fundamend version is ignored"""
+    try:
+        manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(manifest, dict) or manifest.get("fundamend_version") != _fundamend_version():
+        return {}
+    pairs = manifest.get("pairs")
+    return pairs if isinstance(pairs, dict) else {}
+
+
+def _write_manifest(manifest_path: Path, pairs: dict[str, Any]) -> None:
+    manifest = {"fundamend_version": _fundamend_version(), "pairs": dict(sorted(pairs.items()))}
+    with tempfile.NamedTemporaryFile(
+        mode="w", encoding="utf-8", dir=manifest_path.parent, suffix=".tmp", delete=False
+    ) as temporary_file:
+        json.dump(manifest, temporary_file, indent=2)
+    os.replace(temporary_file.name, manifest_path)  # an interrupted run never leaves a broken manifest behind
+
+
 def xml2json_dir_mode(
-    xml_path: Path, sanitize: bool = False, compressed: bool = False, split_ahb: bool = False
+    xml_path: Path,
+    sanitize: bool = False,
+    compressed: bool = False,
+    split_ahb: bool = False,
+    jobs: int = 1,
+    incremental: bool = False,
 ) -> None:
     """
     Converts all XML files in the given directory to JSON files.
     The function expects to find pairs of MIG and AHB XML files in the directory.
     The XML file names must match the pattern `<FORMAT>_<AHB|MIG>_[<Gas|Strom>_]*.xml`.
+    If jobs is not 1, the pairs are converted in a pool of (at most) jobs processes (0 means: one per CPU).
+    If incremental is set, a manifest (MANIFEST_FILE_NAME) of the input hashes, options and fundamend version is kept in
+    the directory. Pairs whose outputs are up to date are skipped, and JSON files whose content did not change (e.g. the
+    files of unchanged Prüfidentifikatoren in split_ahb mode) are not rewritten.
+    The time it took to convert each pair is reported at the end. If any pair could not be converted, the other pairs
+    are converted anyway and a RuntimeError listing the failed pairs is raised at the end.
     """
 
     def groupby_key(path_and_match: tuple[Path, re.Match[str] | None]) -> str:
@@ -100,6 +242,7 @@ def xml2json_dir_mode(
                 raise ValueError("XML file name does not match expected format: " + str(_xml_path))
             yield _xml_path, match
 
+    pairs: list[tuple[Path, Path]] = []
     for _, _xmls_and_matches in groupby(sorted(xmls_and_matches(), key=sort_key), key=groupby_key):
         _xmls_and_matches_list = list(_xmls_and_matches)
         assert len(_xmls_and_matches_list) == 2, (
@@ -109,11 +252,58 @@ def xml2json_dir_mode(
         assert _xmls_and_matches_list[0][1].group(2) == "AHB" and _xmls_and_matches_list[1][1].group(2) == "MIG", (
             f"Expected AHB on first and a MIG on second position, but found: {_xmls_and_matches_list}"
         )
-        ahb_path = _xmls_and_matches_list[0][0]
-        mig_path = _xmls_and_matches_list[1][0]
-        mig, ahb = _convert_to_json_files(mig_path, ahb_path, sanitize=sanitize)
-        _write_model_to_json_file(mig, mig_path.with_suffix(".json"), compressed=compressed)
-        _write_model_to_json_file(ahb, ahb_path.with_suffix(".json"), compressed=compressed, split_ahb=split_ahb)
+        pairs.append((_xmls_and_matches_list[1][0], _xmls_and_matches_list[0][0]))
+
+    manifest_path = xml_path / MANIFEST_FILE_NAME
+    manifest_pairs: dict[str, Any] = _read_manifest(manifest_path) if incremental else {}
+    manifest_entries: dict[str, dict[str, Any]] = {}
+    results: list[_PairResult] = []
+    pairs_to_convert: list[tuple[Path, Path]] = []
+    for mig_path, ahb_path in pairs:
+        if incremental:
+            manifest_key = f"{mig_path.relative_to(xml_path).as_posix()} + {ahb_path.relative_to(xml_path).as_posix()}"
+            manifest_entries[manifest_key] = _manifest_entry(mig_path, ahb_path, sanitize, compressed, split_ahb)
+            if manifest_pairs.get(manifest_key) == manifest_entries[manifest_key] and _outputs_exist(
+                mig_path, ahb_path, split_ahb
+            ):
+                results.append(_PairResult(mig_path, ahb_path, 0.0, None, up_to_date=True))
+                continue
+        pairs_to_convert.append((mig_path, ahb_path))
+
+    if jobs == 1 or len(pairs_to_convert) < 2:
+        results += [
+            _convert_pair(mig_path, ahb_path, sanitize, compressed, split_ahb, incremental)
+            for mig_path, ahb_path in pairs_to_convert
+        ]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs or os.cpu_count() or 1, len(pairs_to_convert))) as executor:
+            futures = [
+                executor.submit(_convert_pair, mig_path, ahb_path, sanitize, compressed, split_ahb, incremental)
+                for mig_path, ahb_path in pairs_to_convert
+            ]
+            results += [future.result() for future in futures]
+    if incremental:
+        failed = {(result.mig_path, result.ahb_path) for result in results if result.error is not None}
+        _write_manifest(
+            manifest_path,
+            {
+                key: entry
+                for (mig_path, ahb_path), (key, entry) in zip(pairs, manifest_entries.items(), strict=True)
+                if (mig_path, ahb_path) not in failed
+            },
+        )
+    for result in results:
+        if result.up_to_date:
+            status = "UP TO DATE"
+        else:
+            status = "OK" if result.error is None else f"FAILED ({result.error})"
+        typer.echo(f"{result.seconds:8.2f}s {result.mig_path.name} + {result.ahb_path.name}: {status}")
+    failures = [result for result in results if result.error is not None]
+    if any(failures):
+        raise RuntimeError(
+            f"{len(failures)} of {len(results)} MIG/AHB pairs could not be converted: "
+            + ", ".join(f"{result.mig_path} + {result.ahb_path}" for result in failures)
+        )
 
 
 def xml2json_file_mode(
@@ -148,9 +338,13 @@ def xml2json_file_mode(
     if match_type == "MIG":
         mig, ahb = _convert_to_json_files(xml_path, other_matches[0], sanitize=sanitize)
         _write_model_to_json_file(mig, xml_path.with_suffix(".json"), compressed=compressed)
+    elif split_ahb:
+        # the MIG is only needed to sanitize the AHB
+        sanitize_against = _read_mig(other_matches[0], sanitize=True) if sanitize else None
+        _write_ahb_splitted_streaming(xml_path, sanitize_against, compressed=compressed)
     else:
         mig, ahb = _convert_to_json_files(other_matches[0], xml_path, sanitize=sanitize)
-        _write_model_to_json_file(ahb, xml_path.with_suffix(".json"), compressed=compressed, split_ahb=split_ahb)
+        _write_model_to_json_file(ahb, xml_path.with_suffix(".json"), compressed=compressed)
 
 
 @app.command()
@@ -205,6 +399,28 @@ def xml2json(
             "`Anwendungshandbuch` except for `anwendungsfaelle`.",
         ),
     ] = False,
+    jobs: Annotated[
+        int,
+        typer.Option(
+            ...,
+            "--jobs",
+            "-j",
+            min=0,
+            help="Only used if `--xml-path` is a directory: The number of processes that convert the MIG/AHB pairs "
+            "in parallel. 0 means one process per CPU. Defaults to 1 (no parallelism).",
+        ),
+    ] = 1,
+    incremental: Annotated[
+        bool,
+        typer.Option(
+            ...,
+            "--incremental",
+            "-i",
+            help="Only used if `--xml-path` is a directory: Skip MIG/AHB pairs whose JSON files are up to date and "
+            "only rewrite JSON files whose content changed (e.g. single Prüfidentifikatoren with `--split-ahb`). "
+            f"The hashes of the XML files, the options and the fundamend version are stored in `{MANIFEST_FILE_NAME}`.",
+        ),
+    ] = False,
 ) -> None:
     """
     Converts the xml file(s) from `xml_in_path` to a json file next to the `*.xml`.
@@ -213,6 +429,8 @@ def xml2json(
     All xml files must follow the naming convention `/^(?P<FORMAT>[A-Z]+)_(AHB|MIG)_((Gas|Strom)_)?.*\\.xml$/`
     """
     if xml_path.is_dir():
-        xml2json_dir_mode(xml_path, sanitize=sanitize, compressed=compressed, split_ahb=split_ahb)
+        xml2json_dir_mode(
+            xml_path, sanitize=sanitize, compressed=compressed, split_ahb=split_ahb, jobs=jobs, incremental=incremental
+        )
     else:
         xml2json_file_mode(xml_path, sanitize=sanitize, compressed=compressed, split_ahb=split_ahb)
@@ -0,0 +1,118 @@
+"""
+Reports how long the stages of reading XMLs and building databases take.
+Register a callback with report_stages; every instrumented stage that runs while the context manager is active is
+reported to the callback as a StageEvent:
+
+    events: list[StageEvent] = []
+    with report_stages(events.append):
+        create_db_and_populate_with_ahb_view(ahb_files)
+    slowest_sql = sorted((e for e in events if e.stage == "sql_statement"), key=lambda e: e.seconds)[-5:]
+
+The stages are:
+
+- xml_parse: parsing an XML file into an element tree (detail: the file name)
+- model_build: binding the element tree to the pydantic model (detail: the file name)
+- orm_conversion: converting a pydantic model to SQLModel instances or plain rows (detail: the AHB/MIG version)
+- insert: inserting into a table (detail: what is inserted; rows: the number of inserted rows)
+- sql_statement: a single statement from one of the .sql files (detail: file name and the start of the statement;
+  rows: the number of affected rows, if SQLite reports it)
+- materialize_ahb_view/materialize_mig_view: creating an entire materialized table (rows: the number of materialized
+  rows)
+- expression_evaluation: evaluating the AHB expressions with ahbicht (rows: the number of evaluated expressions)
+- vacuum: compacting the database file after the raw tables have been dropped
+
+Stages may be nested (e.g. sql_statement inside materialize_ahb_view). If tracemalloc is tracing, the peak memory
+(of Python allocations) during each stage is reported, too.
+Stages that run in worker processes (max_workers != 1) are not reported individually.
+"""
+
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pydantic import BaseModel
+
+
+class StageEvent(BaseModel):
+    """
+    the measurements of a single stage
+    """
+
+    stage: str  #: e.g. 'sql_statement'
+    detail: str | None = None  #: e.g. 'materialize_ahb_view.sql: CREATE TEMP TABLE _seg_qual AS SELECT ...'
+    seconds: float
+    rows: int | None = None
+    peak_memory_bytes: int | None = None  #: None unless tracemalloc is tracing
+
+
+StageCallback = Callable[[StageEvent], None]
+
+_callbacks: ContextVar[tuple[StageCallback, ...]] = ContextVar("fundamend_stage_callbacks", default=())
+
+
+class _ActiveStage:
+    """
+    a stage that is currently measured; the instrumented code may set the number of processed rows
+    """
+
+    def __init__(self) -> None:
+        self.rows: int | None = None
+        self.peak_memory_bytes: int = 0
+
+
+_active_stages: ContextVar[tuple[_ActiveStage, ...]] = ContextVar("fundamend_active_stages", default=())
+
+
+@contextmanager
+def report_stages(callback: StageCallback) -> Iterator[None]:
+    """
+    reports all stages that run (in the current thread/task) while the context manager is active to the callback
+    """
+    token = _callbacks.set((*_callbacks.get(), callback))
+    try:
+        yield
+    finally:
+        _callbacks.reset(token)
+
+
+@contextmanager
+def _measure_stage(stage: str, detail: str | None = None) -> Iterator[_ActiveStage]:
+    """
+    measures the enclosed code as the given stage and reports it to the registered callbacks (if any)
+    """
+    callbacks = _callbacks.get()
+    active_stage = _ActiveStage()
+    if not callbacks:
+        yield active_stage  # no one is listening; don't waste any time
+        return
+    parent_stages = _active_stages.get()
+    is_tracing = tracemalloc.is_tracing()
+    if is_tracing:
+        # tracemalloc has only one peak; the enclosing stages keep the peak until now before it is reset
+        _, peak_until_now = tracemalloc.get_traced_memory()
+        for parent_stage in parent_stages:
+            parent_stage.peak_memory_bytes = max(parent_stage.peak_memory_bytes, peak_until_now)
+        tracemalloc.reset_peak()
+    token = _active_stages.set((*parent_stages, active_stage))
+    start = time.perf_counter()
+    try:
+        yield active_stage
+    finally:
+        seconds = time.perf_counter() - start
+        _active_stages.reset(token)
+        peak_memory_bytes: int | None = None
+        if is_tracing and tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            peak_memory_bytes = max(active_stage.peak_memory_bytes, peak)
+            for parent_stage in parent_stages:
+                parent_stage.peak_memory_bytes = max(parent_stage.peak_memory_bytes, peak_memory_bytes)
+        event = StageEvent(
+            stage=stage, detail=detail, seconds=seconds, rows=active_stage.rows, peak_memory_bytes=peak_memory_bytes
+        )
+        for callback in callbacks:
+            callback(event)
+
+
+__all__ = ["StageCallback", "StageEvent", "report_stages"]
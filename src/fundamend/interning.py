@@ -0,0 +1,112 @@
+"""
+Structural sharing (hash-consing) of equal sub-trees, e.g. for long-running services that keep an entire corpus of AHBs
+and MIGs in memory. Many Anwendungsfälle repeat the very same segments and segment groups (UNH, BGM, DTM, ...); after
+interning, all equal (sub-)models are one and the same instance, and all equal strings are one and the same str.
+
+Note that sanitize_ahb modifies the models (both the AHB and the MIG) in place. So they must be sanitized before they're
+interned, never after: read, sanitize and then intern (interner.intern(mig), interner.intern(ahb)). Should an interned
+model be modified in place anyway, the interner at least no longer hands it out in place of unmodified models.
+"""
+
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+
+
+class ModelInterner:
+    """
+    Maps structurally equal (frozen) models to a single shared instance.
+    Use one interner for all models that should share their sub-trees (e.g. all AHBs and MIGs of a corpus).
+    The interner keeps all models it has seen alive; drop it (or call clear) once no more models are added.
+    """
+
+    def __init__(self) -> None:
+        # the keys contain the id()s of the (interned) children; the values keep these children alive
+        self._models: dict[tuple[Any, ...], BaseModel] = {}
+        self._interned_model_ids: set[int] = set()
+        self._strings: dict[str, str] = {}
+        self._field_names: dict[type[BaseModel], tuple[str, ...]] = {}
+
+    def __len__(self) -> int:
+        """returns the number of distinct models"""
+        return len(self._models)
+
+    def clear(self) -> None:
+        """forgets all models and strings (the models that have already been interned are not affected)"""
+        self._models.clear()
+        self._interned_model_ids.clear()
+        self._strings.clear()
+
+    def intern(self, model: _ModelT) -> _ModelT:
+        """
+        returns a model that is equal to the given one, but shares all sub-models (and strings) with the models that
+        have been interned before. The sub-models of the given model may be replaced in place (by equal ones).
+        """
+        return self._intern_model(model)  # type: ignore[return-value]
+
+    def _intern_item(self, item: Any) -> tuple[Any, Any]:
+        """returns the interned item and its part of the key of its parent model"""
+        if isinstance(item, BaseModel):
+            interned_model = self._intern_model(item)
+            # the model is interned already, so its identity stands for its structure: the key is cheap to hash
+            return interned_model, id(interned_model)
+        if type(item) is str:  # (enums are singletons anyway)
+            interned_string = self._strings.setdefault(item, item)
+            return interned_string, interned_string
+        return item, item
+
+    def _intern_model(self, model: BaseModel) -> BaseModel:
+        if id(model) in self._interned_model_ids:
+            return model
+        model_type = type(model)
+        field_names = self._field_names.get(model_type)
+        if field_names is None:
+            field_names = self._field_names[model_type] = tuple(model_type.model_fields)
+        key: list[Any] = [model_type, frozenset(model.__pydantic_fields_set__)]
+        changed_values: dict[str, Any] = {}
+        for field_name in field_names:
+            value = getattr(model, field_name)
+            if type(value) is tuple:
+                interned_items_and_key_parts = [self._intern_item(item) for item in value]
+                key.append(tuple([key_part for _, key_part in interned_items_and_key_parts]))
+                if any(
+                    interned is not item
+                    for (interned, _), item in zip(interned_items_and_key_parts, value, strict=True)
+                ):
+                    changed_values[field_name] = tuple([interned for interned, _ in interned_items_and_key_parts])
+                continue
+            interned_value, key_part = self._intern_item(value)
+            key.append(key_part)
+            if interned_value is not value:
+                changed_values[field_name] = interned_value
+        model_key = tuple(key)
+        interned_model = self._models.get(model_key)
+        if interned_model is not None:
+            if self._is_unmodified(interned_model, model_key):
+                return interned_model
+            # it has been modified in place since it was interned (e.g. by sanitize_ahb), so it's no longer equal to
+            # the model it stands for
+            self._interned_model_ids.discard(id(interned_model))
+        for field_name, interned_value in changed_values.items():
+            # an equal value, so the model and its hash stay the same
+            object.__setattr__(model, field_name, interned_value)
+        self._models[model_key] = model
+        self._interned_model_ids.add(id(model))
+        return model
+
+    def _is_unmodified(self, interned_model: BaseModel, model_key: tuple[Any, ...]) -> bool:
+        """returns true if the field values of the interned model still match the key it has been interned with"""
+        for field_name, key_part in zip(self._field_names[type(interned_model)], model_key[2:], strict=True):
+            value = getattr(interned_model, field_name)
+            if type(value) is tuple:
+                current_key_part: Any = tuple([id(item) if isinstance(item, BaseModel) else item for item in value])
+            else:
+                current_key_part = id(value) if isinstance(value, BaseModel) else value
+            if current_key_part != key_part:
+                return False
+        return True
+
+
+__all__ = ["ModelInterner"]
@@ -4,6 +4,8 @@
 # the structures are similar, still we decided against inheritance, so there's naturally a little bit of duplication
 
 from datetime import date
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 from efoli import EdifactFormat
 
@@ -11,6 +13,9 @@ from fundamend.models.base import FundamendBaseModel
 from fundamend.models.kommunikationsrichtung import Kommunikationsrichtung
 from fundamend.utils import parse_kommunikation_von
 
+if TYPE_CHECKING:
+    from fundamend.models.path_index import PathIndex
+
 
 class Code(FundamendBaseModel):
     """
@@ -163,6 +168,17 @@ class Anwendungsfall(FundamendBaseModel):
             return None
         return parse_kommunikation_von(self.kommunikation_von)
 
+    @cached_property
+    def path_index(self) -> "PathIndex[Segment, Code]":
+        """
+        an index of all segment groups, segments, data element (group)s and codes of this Anwendungsfall by their
+        id_path (as in ahb_hierarchy_materialized), segment number and (segment id, data element id, code value).
+        It's built on first access and cached afterwards.
+        """
+        from fundamend.models.path_index import PathIndex  # noqa: PLC0415 # path_index imports this module
+
+        return PathIndex(self.elements)
+
 
 class Bedingung(FundamendBaseModel):
     """Ein ConditionKeyConditionText Mapping"""
@@ -2,12 +2,80 @@
 Base class for all models in the fundamend package.
 """
 
+import hashlib
+from collections.abc import Mapping
+from datetime import date
+from functools import cache, cached_property
+from typing import Any, Self
+
 from pydantic import BaseModel, ConfigDict
 
 
+def _token(value: Any) -> str:  # noqa: PLR0911
+    """an unambiguous representation of a field value for the digest; sub-models are represented by their digest"""
+    if isinstance(value, FundamendBaseModel):
+        return "m" + value.digest
+    if isinstance(value, str):  # incl. the (Str)Enums
+        return f"s{len(value)}:{value}"
+    if value is None:
+        return "n"
+    if isinstance(value, bool):  # before int, because bools are ints
+        return "b1" if value else "b0"
+    if isinstance(value, int):
+        return f"i{value}"
+    if isinstance(value, date):
+        return "d" + value.isoformat()
+    if isinstance(value, tuple):
+        return f"t{len(value)}(" + ",".join(_token(item) for item in value) + ")"
+    raise TypeError(f"{type(value)} is not supported in the digest")
+
+
+@cache
+def _cached_property_names(model_class: type[BaseModel]) -> tuple[str, ...]:
+    return tuple(
+        name
+        for klass in model_class.__mro__
+        for name, attribute in vars(klass).items()
+        if isinstance(attribute, cached_property)
+    )
+
+
+def discard_cached_properties(model: BaseModel) -> None:
+    """
+    discards the cached properties (e.g. the digest) of a model that has been modified in place (which should only
+    happen in sanitize); they're computed anew on the next access
+    """
+    for name in _cached_property_names(type(model)):
+        model.__dict__.pop(name, None)
+
+
 class FundamendBaseModel(BaseModel):
     """
     Base class for all models in the fundamend package. Defines all models as frozen.
     """
 
     model_config = ConfigDict(frozen=True)
+
+    @cached_property
+    def digest(self) -> str:
+        """
+        a content fingerprint (128 bit BLAKE2b, hex) of the model including all its sub-models (a Merkle hash):
+        equal models have the same digest, unequal models (practically) never do. It's stable across processes and
+        machines (as long as the model classes stay the same).
+        The digest is computed once per instance from the cached digests of the direct children, so comparing entire
+        sub-trees by their digest is O(1) (after the first access).
+        """
+        hasher = hashlib.blake2b(type(self).__name__.encode("utf-8"), digest_size=16)
+        for field_name in type(self).model_fields:
+            hasher.update(f"\0{field_name}={_token(getattr(self, field_name))}".encode())
+        return hasher.hexdigest()
+
+    def __hash__(self) -> int:
+        # unlike the default hash of frozen pydantic models, this doesn't re-hash the entire sub-tree on every call
+        return hash(self.digest)
+
+    def model_copy(self, *, update: Mapping[str, Any] | None = None, deep: bool = False) -> Self:
+        copy = super().model_copy(update=update, deep=deep)
+        if update:
+            discard_cached_properties(copy)  # the cached properties of the original don't apply to the modified copy
+        return copy
@@ -0,0 +1,69 @@
+"""
+The rules for the id_paths (e.g. 'SG4>SG8+Z01>SEQ+Z01>RFF>') of the nodes of an Anwendungsfall or MIG.
+They're shared by the PathIndex (which walks the pydantic models) and the Python side materializers of
+ahb_hierarchy_materialized and mig_hierarchy_materialized (which walk the raw rows), so the helpers work on plain
+values. materialize_ahb_view.sql and materialize_mig_view.sql implement the same rules in SQL.
+"""
+
+from collections import Counter
+from collections.abc import Iterable, Sequence
+
+
+def id_path_part(node_id: str, qualifier: str | None, needs_qualifier: bool) -> str:
+    """
+    the part of the id_path that belongs to a single node: its id and - if it has siblings with the same id - its
+    qualifier (if any), e.g. 'SG8+Z01>'
+    """
+    if needs_qualifier and qualifier is not None:
+        return f"{node_id}+{qualifier}>"
+    return f"{node_id}>"
+
+
+def ids_with_siblings(node_ids: Iterable[str]) -> set[str]:
+    """returns those ids that occur more than once among the siblings"""
+    return {node_id for node_id, count in Counter(node_ids).items() if count > 1}
+
+
+def data_element_qualifier(code_values: Sequence[str | None]) -> str | None:
+    """the qualifier of a data element is its first code value (code_values may stop after the first one)"""
+    return code_values[0] if code_values else None
+
+
+def segment_qualifier(
+    bare_data_elements: Iterable[Sequence[str | None]], grouped_data_elements: Iterable[Sequence[str | None]]
+) -> str | None:
+    """
+    the qualifier of a segment is the first code value of its first bare data element with codes or (if that is None
+    or there is none) of its first data element (inside the data element groups) with codes.
+    Each data element is given by its code values (which may stop after the first one).
+    """
+    for code_values in bare_data_elements:
+        if code_values:
+            if code_values[0] is not None:
+                return code_values[0]
+            break
+    for code_values in grouped_data_elements:
+        if code_values:
+            return code_values[0]
+    return None
+
+
+def segment_group_qualifier(
+    segment_qualifiers: Iterable[str | None], child_segment_group_qualifiers: Iterable[str | None]
+) -> str | None:
+    """
+    the qualifier of a segment group is the qualifier of its first segment or (if it has no segments) the smallest
+    qualifier of its child segment groups. Both arguments are consumed lazily.
+    """
+    for qualifier in segment_qualifiers:
+        return qualifier
+    return min((qualifier for qualifier in child_segment_group_qualifiers if qualifier is not None), default=None)
+
+
+__all__ = [
+    "data_element_qualifier",
+    "id_path_part",
+    "ids_with_siblings",
+    "segment_group_qualifier",
+    "segment_qualifier",
+]
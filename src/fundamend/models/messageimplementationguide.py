@@ -2,11 +2,16 @@
 
 from datetime import date
 from enum import StrEnum
+from functools import cached_property
+from typing import TYPE_CHECKING
 
 from efoli import EdifactFormat
 
 from .base import FundamendBaseModel
 
+if TYPE_CHECKING:
+    from .path_index import PathIndex
+
 # I didn't invent the data model ;)
 # pylint:disable=too-many-instance-attributes
 
@@ -184,3 +189,14 @@ class MessageImplementationGuide(FundamendBaseModel):
     format: EdifactFormat  #: e.g. 'UTILTS'
 
     elements: tuple[Segment | SegmentGroup, ...]
+
+    @cached_property
+    def path_index(self) -> "PathIndex[Segment, Code]":
+        """
+        an index of all segment groups, segments, data element (group)s and codes of this MIG by their id_path (as in
+        mig_hierarchy_materialized), segment number and (segment id, data element id, code value).
+        It's built on first access and cached afterwards.
+        """
+        from .path_index import PathIndex  # noqa: PLC0415 # path_index imports this module
+
+        return PathIndex(self.elements)
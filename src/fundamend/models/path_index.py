@@ -0,0 +1,186 @@
+"""
+An in-memory index of the nodes (segment groups, segments, data element (group)s and codes) of an Anwendungsfall or a
+MIG, so that e.g. validators can look up nodes in O(1) instead of walking the hierarchy (and without a database).
+The id_paths are the same as in the column id_path of ahb_hierarchy_materialized and mig_hierarchy_materialized (see
+id_path.py).
+"""
+
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Mapping
+from typing import Generic, TypeVar, cast
+
+from fundamend.models import anwendungshandbuch as ahb
+from fundamend.models import messageimplementationguide as mig
+from fundamend.models.base import FundamendBaseModel
+from fundamend.models.id_path import (
+    data_element_qualifier,
+    id_path_part,
+    ids_with_siblings,
+    segment_group_qualifier,
+    segment_qualifier,
+)
+
+_SegmentT = TypeVar("_SegmentT", ahb.Segment, mig.Segment)
+_CodeT = TypeVar("_CodeT", ahb.Code, mig.Code)
+
+_SegmentGroup = ahb.SegmentGroup | mig.SegmentGroup
+_Segment = ahb.Segment | mig.Segment
+_DataElement = ahb.DataElement | mig.DataElement
+
+CodeKey = tuple[str, str, str]
+"""
+(segment id, data element id, code value), e.g. ('BGM', 'D_1001', 'Z36')
+"""
+
+
+def _code_values(data_element: _DataElement) -> list[str | None]:
+    """the value of the first code of the data element (if any); that's all the qualifiers need"""
+    return [code.value for code in data_element.codes[:1]]
+
+
+def _segment_qualifier(segment: _Segment) -> str | None:
+    return segment_qualifier(
+        (
+            _code_values(data_element)
+            for data_element in segment.data_elements
+            if isinstance(data_element, (ahb.DataElement, mig.DataElement))
+        ),
+        (
+            _code_values(data_element)
+            for data_element_group in segment.data_elements
+            if isinstance(data_element_group, (ahb.DataElementGroup, mig.DataElementGroup))
+            for data_element in data_element_group.data_elements
+        ),
+    )
+
+
+def _segment_group_qualifier(segment_group: _SegmentGroup) -> str | None:
+    return segment_group_qualifier(
+        (
+            _segment_qualifier(element)
+            for element in segment_group.elements
+            if isinstance(element, (ahb.Segment, mig.Segment))
+        ),
+        (
+            _segment_group_qualifier(element)
+            for element in segment_group.elements
+            if isinstance(element, (ahb.SegmentGroup, mig.SegmentGroup))
+        ),
+    )
+
+
+class _Walker:
+    """walks the hierarchy depth-first (in the order of the elements) and collects the nodes with their id_paths"""
+
+    def __init__(self) -> None:
+        self.id_paths_and_nodes: list[tuple[str, FundamendBaseModel]] = []
+        self.segments_by_number: dict[str, _Segment] = {}
+        self.codes_by_key: dict[CodeKey, list[ahb.Code | mig.Code]] = defaultdict(list)
+
+    def add_elements(self, parent_id_path: str, elements: Iterable[FundamendBaseModel]) -> None:
+        """adds the segment groups and segments (and everything below them)"""
+        elements = list(elements)
+        ambiguous_segment_group_ids = ids_with_siblings(
+            element.id for element in elements if isinstance(element, (ahb.SegmentGroup, mig.SegmentGroup))
+        )
+        ambiguous_segment_ids = ids_with_siblings(
+            element.id for element in elements if isinstance(element, (ahb.Segment, mig.Segment))
+        )
+        for element in elements:
+            if isinstance(element, (ahb.SegmentGroup, mig.SegmentGroup)):
+                needs_qualifier = element.id in ambiguous_segment_group_ids
+                id_path = parent_id_path + id_path_part(
+                    element.id, _segment_group_qualifier(element) if needs_qualifier else None, needs_qualifier
+                )
+                self.id_paths_and_nodes.append((id_path, element))
+                self.add_elements(id_path, element.elements)
+            elif isinstance(element, (ahb.Segment, mig.Segment)):
+                needs_qualifier = element.id in ambiguous_segment_ids
+                id_path = parent_id_path + id_path_part(
+                    element.id, _segment_qualifier(element) if needs_qualifier else None, needs_qualifier
+                )
+                self.id_paths_and_nodes.append((id_path, element))
+                self.segments_by_number.setdefault(element.number, element)
+                self._add_segment_children(id_path, element)
+
+    def _add_segment_children(self, segment_id_path: str, segment: _Segment) -> None:
+        ambiguous_data_element_ids = ids_with_siblings(
+            data_element.id
+            for data_element in segment.data_elements
+            if isinstance(data_element, (ahb.DataElement, mig.DataElement))
+        )
+        for element in segment.data_elements:
+            if isinstance(element, (ahb.DataElementGroup, mig.DataElementGroup)):
+                group_id_path = f"{segment_id_path}{element.id}>"
+                self.id_paths_and_nodes.append((group_id_path, element))
+                ambiguous_grouped_data_element_ids = ids_with_siblings(
+                    data_element.id for data_element in element.data_elements
+                )
+                for data_element in element.data_elements:
+                    self._add_data_element(
+                        group_id_path, segment, data_element, data_element.id in ambiguous_grouped_data_element_ids
+                    )
+            else:
+                self._add_data_element(segment_id_path, segment, element, element.id in ambiguous_data_element_ids)
+
+    def _add_data_element(
+        self, parent_id_path: str, segment: _Segment, data_element: _DataElement, needs_qualifier: bool
+    ) -> None:
+        id_path = parent_id_path + id_path_part(
+            data_element.id, data_element_qualifier(_code_values(data_element)), needs_qualifier
+        )
+        self.id_paths_and_nodes.append((id_path, data_element))
+        for code in data_element.codes:
+            if code.value is None:
+                continue  # such codes have no id_path (NULL) in the materialized views either
+            self.id_paths_and_nodes.append((f"{id_path}{code.value}>", code))
+            self.codes_by_key[(segment.id, data_element.id, code.value)].append(code)
+
+
+class PathIndex(Generic[_SegmentT, _CodeT]):
+    """
+    maps the id_paths (e.g. 'SG4>SG8+Z01>SEQ+Z01>RFF>'), segment numbers and (segment id, data element id, code value)
+    keys to the nodes below an Anwendungsfall or MIG.
+    Use Anwendungsfall.path_index or MessageImplementationGuide.path_index which are built lazily (once per instance).
+    """
+
+    def __init__(self, elements: Iterable[FundamendBaseModel]):
+        walker = _Walker()
+        walker.add_elements("", elements)
+        # like index_ahb_hierarchy_materialized.sql: id_paths that are still ambiguous get a counter '#n' (in the order
+        # of the nodes)
+        ambiguous_id_paths = ids_with_siblings(id_path for id_path, _ in walker.id_paths_and_nodes)
+        counters: Counter[str] = Counter()
+        self._nodes_by_id_path: dict[str, FundamendBaseModel] = {}
+        for id_path, node in walker.id_paths_and_nodes:
+            if id_path in ambiguous_id_paths:
+                counters[id_path] += 1
+                self._nodes_by_id_path[f"{id_path}#{counters[id_path]}"] = node
+            else:
+                self._nodes_by_id_path[id_path] = node
+        # the walker doesn't know whether it walked an AHB or a MIG; the cached properties of the models do
+        self._segments_by_number: dict[str, _SegmentT] = cast(dict[str, _SegmentT], walker.segments_by_number)
+        self._codes_by_key: dict[CodeKey, tuple[_CodeT, ...]] = {
+            key: cast(tuple[_CodeT, ...], tuple(codes)) for key, codes in walker.codes_by_key.items()
+        }
+
+    @property
+    def by_id_path(self) -> Mapping[str, FundamendBaseModel]:
+        """all segment groups, segments, data element (group)s and codes (with a value) by their id_path"""
+        return self._nodes_by_id_path
+
+    @property
+    def by_segment_number(self) -> Mapping[str, _SegmentT]:
+        """the segments by their number (e.g. '00002'); if a number occurs more than once, the first segment wins"""
+        return self._segments_by_number
+
+    @property
+    def by_code_key(self) -> Mapping[CodeKey, tuple[_CodeT, ...]]:
+        """
+        all codes (with a value) by (segment id, data element id, code value), e.g. ('BGM', 'D_1001', 'Z36'), in the
+        order of their occurrence (the same segment may occur in multiple segment groups)
+        """
+        return self._codes_by_key
+
+
+__all__ = ["CodeKey", "PathIndex"]
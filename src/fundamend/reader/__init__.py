@@ -1,6 +1,8 @@
 """classes for reading xml documents"""
 
+from .ahbindex import AhbIndex
 from .ahbreader import AhbReader
+from .aio import read_ahb_async, read_mig_async
 from .migreader import MigReader
 
-__all__ = ["AhbReader", "MigReader"]
+__all__ = ["AhbIndex", "AhbReader", "MigReader", "read_ahb_async", "read_mig_async"]
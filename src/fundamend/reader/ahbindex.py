@@ -0,0 +1,173 @@
+"""
+the AhbIndex class in this module maps Prüfidentifikatoren to the byte ranges of their <AWF> elements in an AHB XML.
+It allows to read a single Anwendungsfall without parsing the entire (possibly huge) document.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Any
+from xml.parsers import expat
+
+from fundamend.reader.xml_backend import XmlParserBackend, parse_xml_bytes
+from fundamend.utils import remove_hashtag_prefix
+
+_logger = logging.getLogger(__name__)
+
+_INDEX_FORMAT_VERSION = 1
+"""increase this if the layout of the index file changes; older index files are then rebuilt automatically"""
+
+
+def _default_index_path(xml_path: Path) -> Path:
+    """the sidecar index is stored right next to the XML file, e.g. 'UTILMD_AHB.xml.awfindex.json'"""
+    return xml_path.with_name(xml_path.name + ".awfindex.json")
+
+
+def _scan_anwendungsfall_byte_ranges(xml_bytes: bytes) -> tuple[str | None, dict[str, tuple[int, int]]]:
+    """
+    scans the raw XML once and returns its declared encoding and the [start, end) byte range of every <AWF> element
+    directly below the root element, keyed by Prüfidentifikator. If a Prüfidentifikator occurs more than once, the
+    first occurrence wins (just like in AhbReader.get_anwendungsfall).
+    """
+    parser = expat.ParserCreate()
+    encoding: str | None = None
+    byte_ranges: dict[str, tuple[int, int]] = {}
+    depth = 0
+    current_pruefi: str | None = None
+    current_start: int | None = None
+    awf_has_ended = False
+
+    def close_pending_awf() -> None:
+        # expat only tells us where the end tag _starts_. The first event after the end tag starts exactly where the
+        # end tag ends. This is robust against '</AWF >' and against self-closing '<AWF ... />' tags alike.
+        nonlocal awf_has_ended, current_pruefi, current_start
+        if awf_has_ended:
+            assert current_pruefi is not None and current_start is not None
+            byte_ranges.setdefault(current_pruefi, (current_start, parser.CurrentByteIndex))
+            awf_has_ended = False
+            current_pruefi = None
+            current_start = None
+
+    def on_xml_declaration(_version: str, declared_encoding: str | None, _standalone: int) -> None:
+        nonlocal encoding
+        encoding = declared_encoding
+
+    def on_start(tag: str, attributes: dict[str, str]) -> None:
+        nonlocal depth, current_pruefi, current_start
+        close_pending_awf()
+        depth += 1
+        if depth == 2 and tag == "AWF":
+            current_pruefi = remove_hashtag_prefix(attributes.get("Pruefidentifikator", "")).strip()
+            current_start = parser.CurrentByteIndex
+
+    def on_end(tag: str) -> None:
+        nonlocal depth, awf_has_ended
+        close_pending_awf()
+        if depth == 2 and tag == "AWF":
+            awf_has_ended = True
+        depth -= 1
+
+    def on_other(*_: Any) -> None:
+        close_pending_awf()
+
+    parser.XmlDeclHandler = on_xml_declaration
+    parser.StartElementHandler = on_start
+    parser.EndElementHandler = on_end
+    parser.CharacterDataHandler = on_other
+    parser.CommentHandler = on_other
+    parser.ProcessingInstructionHandler = on_other
+    parser.Parse(xml_bytes, True)
+    return encoding, byte_ranges
+
+
+class AhbIndex:
+    """
+    A persistent sidecar index that maps each Prüfidentifikator of an AHB XML to the byte range of its <AWF> element.
+    The index is built once per AHB (one scan without building a tree) and stored as JSON next to the XML file.
+    It is keyed by the SHA-256 of the XML file; if the XML changes, the index is rebuilt on next use.
+    """
+
+    def __init__(self, xml_path: Path, index_path: Path | None = None, parser_backend: XmlParserBackend = "stdlib"):
+        """
+        initialize by providing the path to the XML file; the index is loaded from index_path (defaults to a sidecar
+        file next to the XML) or built (and persisted) if it does not exist yet or is outdated.
+        The parser_backend is used to parse the <AWF> fragments (see xml_backend.py).
+        """
+        self._xml_path = xml_path
+        self._index_path = index_path or _default_index_path(xml_path)
+        self._parser_backend: XmlParserBackend = parser_backend
+        self._encoding: str | None = None
+        self._byte_ranges: dict[str, tuple[int, int]] = {}
+        if not self._try_load():
+            self.rebuild()
+
+    def _try_load(self) -> bool:
+        """loads the persisted index; returns False if there is no index or if it does not match the XML file"""
+        try:
+            with open(self._index_path, encoding="utf-8") as index_file:
+                persisted = json.load(index_file)
+        except (OSError, ValueError):
+            return False
+        if not isinstance(persisted, dict) or persisted.get("format_version") != _INDEX_FORMAT_VERSION:
+            return False
+        stat = self._xml_path.stat()
+        if persisted.get("size") != stat.st_size:
+            return False
+        if persisted.get("mtime_ns") != stat.st_mtime_ns:
+            # the file might just have been touched or copied; only the content hash decides
+            if persisted.get("sha256") != hashlib.sha256(self._xml_path.read_bytes()).hexdigest():
+                return False
+        self._encoding = persisted["encoding"]
+        self._byte_ranges = {pruefi: (start, end) for pruefi, (start, end) in persisted["anwendungsfaelle"].items()}
+        return True
+
+    def rebuild(self) -> None:
+        """scans the XML file and (over)writes the index file"""
+        xml_bytes = self._xml_path.read_bytes()
+        stat = self._xml_path.stat()
+        self._encoding, self._byte_ranges = _scan_anwendungsfall_byte_ranges(xml_bytes)
+        persisted = {
+            "format_version": _INDEX_FORMAT_VERSION,
+            "sha256": hashlib.sha256(xml_bytes).hexdigest(),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "encoding": self._encoding,
+            "anwendungsfaelle": self._byte_ranges,
+        }
+        try:
+            with tempfile.NamedTemporaryFile(
+                mode="w", encoding="utf-8", dir=self._index_path.parent, suffix=".tmp", delete=False
+            ) as temporary_file:
+                json.dump(persisted, temporary_file)
+            os.replace(temporary_file.name, self._index_path)  # atomic; readers never see a partial index
+        except OSError as os_error:
+            # a read-only directory must not break reading the AHB; we just lose the persistence
+            _logger.warning("Could not persist the AHB index to %s: %s", self._index_path, os_error)
+
+    @property
+    def pruefidentifikatoren(self) -> list[str]:
+        """returns all Prüfidentifikatoren in the order in which they appear in the XML file"""
+        return list(self._byte_ranges.keys())
+
+    def get_byte_range(self, pruefidentifikator: str) -> tuple[int, int] | None:
+        """returns the [start, end) byte range of the <AWF> with the given Prüfidentifikator or None"""
+        return self._byte_ranges.get(pruefidentifikator)
+
+    def get_anwendungsfall_element(self, pruefidentifikator: str) -> ET.Element | None:
+        """seeks to the <AWF> with the given Prüfidentifikator and parses only that fragment (or returns None)"""
+        byte_range = self.get_byte_range(pruefidentifikator)
+        if byte_range is None:
+            return None
+        start, end = byte_range
+        with open(self._xml_path, "rb") as xml_file:
+            xml_file.seek(start)
+            fragment = xml_file.read(end - start)
+        declaration = f'<?xml version="1.0" encoding="{self._encoding or "UTF-8"}"?>'.encode("ascii")
+        return parse_xml_bytes(declaration + fragment, self._parser_backend)
+
+
+__all__ = ["AhbIndex"]
@@ -4,11 +4,13 @@ the AhbReader class in this module parses AHB XMLs and binds them to the data mo
 
 import re
 import xml.etree.ElementTree as ET
+from collections.abc import Callable, Iterator
 from datetime import date, datetime
 from pathlib import Path
 
 from efoli import EdifactFormat
 
+from fundamend.instrumentation import _measure_stage
 from fundamend.models.anwendungshandbuch import (
     Anwendungsfall,
     Anwendungshandbuch,
@@ -21,6 +23,8 @@ from fundamend.models.anwendungshandbuch import (
     SegmentGroup,
     UbBedingung,
 )
+from fundamend.reader.ahbindex import AhbIndex
+from fundamend.reader.construction import trusted_constructor
 from fundamend.reader.element_distinction import (
     _is_anwendungsfall,
     _is_code,
@@ -31,6 +35,7 @@ from fundamend.reader.element_distinction import (
     _is_segment_group,
     _is_uebertragungsdatei,
 )
+from fundamend.reader.xml_backend import XmlParserBackend, iterparse_xml, parse_xml
 from fundamend.utils import (
     lstrip,
     remove_hashtag_prefix,
@@ -42,36 +47,49 @@ from fundamend.utils import (
 # pylint:disable=duplicate-code
 # yes, it's very similar to the MigReader
 
+# the values are normalised below, so there's no need to validate them (again) in pydantic; see construction.py
+_new_code = trusted_constructor(Code)
+_new_bedingung = trusted_constructor(Bedingung)
+_new_ub_bedingung = trusted_constructor(UbBedingung)
+_new_paket = trusted_constructor(Paket)
+_new_data_element = trusted_constructor(DataElement)
+_new_data_element_group = trusted_constructor(DataElementGroup)
+_new_segment = trusted_constructor(Segment)
+_new_segment_group = trusted_constructor(SegmentGroup)
+_new_anwendungsfall = trusted_constructor(Anwendungsfall)
+_new_anwendungshandbuch = trusted_constructor(Anwendungshandbuch)
+
 
 def _to_code(element: ET.Element) -> Code:
     assert _is_code(element)
     value = element.text
     if value is not None:
         value = value.strip()
-    return Code(
-        name=element.attrib["Name"],
-        description=element.attrib["Description"] or None,
+    attrib = element.attrib  # accessing .attrib is not free (esp. with lxml), so we do it only once per element
+    return _new_code(
+        name=attrib["Name"],
+        description=attrib["Description"] or None,
         value=value,
-        ahb_status=element.attrib["AHB_Status"],
+        ahb_status=attrib["AHB_Status"],
     )
 
 
 def _to_bedingung(element: ET.Element) -> Bedingung:
-    return Bedingung(
+    return _new_bedingung(
         nummer=strip("[", element.attrib["Nummer"], "]"),
         text=remove_hashtag_prefix((element.text or "").strip()),
     )
 
 
 def _to_ub_bedingung(element: ET.Element) -> UbBedingung:
-    return UbBedingung(
+    return _new_ub_bedingung(
         nummer=strip("[", element.attrib["Nummer"], "]"),
         text=remove_hashtag_prefix((element.text or "").strip()),
     )
 
 
 def _to_paket(element: ET.Element) -> Paket:
-    return Paket(
+    return _new_paket(
         nummer=strip("[", element.attrib["Nummer"], "]"),
         text=(element.text or "").strip(),
     )
@@ -99,11 +117,11 @@ def _to_data_element(element: ET.Element) -> DataElement:
             codes.append(_to_code(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-
-    return DataElement(
+    attrib = element.attrib
+    return _new_data_element(
         id=element.tag,
-        name=element.attrib["Name"].strip(),
-        ahb_status=element.attrib.get("AHB_Status", "").strip() or None,
+        name=attrib["Name"].strip(),
+        ahb_status=attrib.get("AHB_Status", "").strip() or None,
         codes=tuple(codes),
     )
 
@@ -116,7 +134,7 @@ def _to_data_element_group(element: ET.Element) -> DataElementGroup:
             data_elements.append(_to_data_element(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return DataElementGroup(
+    return _new_data_element_group(
         id=element.tag,
         name=element.attrib["Name"].strip(),
         data_elements=tuple(data_elements),
@@ -133,11 +151,12 @@ def _to_segment(element: ET.Element, is_uebertragungsdatei_level: bool = False)
             data_elements.append(_to_data_element(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return Segment(
+    attrib = element.attrib
+    return _new_segment(
         id=lstrip("S_", element.tag),
-        name=element.attrib["Name"].strip(),
-        number=element.attrib["Number"].strip(),
-        ahb_status=element.attrib.get("AHB_Status", "").strip() or None,
+        name=attrib["Name"].strip(),
+        number=attrib["Number"].strip(),
+        ahb_status=attrib.get("AHB_Status", "").strip() or None,
         data_elements=tuple(data_elements),
         is_on_uebertragungsdatei_level=is_uebertragungsdatei_level,
     )
@@ -153,10 +172,11 @@ def _to_segment_group(element: ET.Element) -> SegmentGroup:
             segments_and_groups.append(_to_segment(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return SegmentGroup(
+    attrib = element.attrib
+    return _new_segment_group(
         id=lstrip("G_", element.tag),
-        name=element.attrib["Name"].strip(),
-        ahb_status=element.attrib.get("AHB_Status", "").strip() or None,
+        name=attrib["Name"].strip(),
+        ahb_status=attrib.get("AHB_Status", "").strip() or None,
         elements=tuple(list(segments_and_groups)),
     )
 
@@ -166,18 +186,86 @@ class AhbReader:
     Accesses information from an XML based Anwendungshandbuch
     """
 
-    def __init__(self, xml_path: Path):
+    def __init__(
+        self,
+        xml_path: Path,
+        streaming: bool = False,
+        use_index: bool = False,
+        parser_backend: XmlParserBackend = "stdlib",
+        metadata_only: bool = False,
+        index_path: Path | None = None,
+    ):
         """
-        initialize by providing the path to the XML file
+        initialize by providing the path to the XML file.
+        By default, the entire XML is parsed into an element tree right away.
+        If streaming is True, the file is read lazily using ET.iterparse instead: every top level element (e.g. an
+        <AWF>) is discarded as soon as it has been consumed, so that the peak memory scales with a single
+        Anwendungsfall rather than with the entire AHB. Each method call then reads the file (again).
+        If use_index is True, get_anwendungsfall uses a persistent sidecar AhbIndex to only parse the matching <AWF>.
+        This implies the lazy behaviour of the streaming mode, because parsing the entire file upfront would be
+        pointless then. The index is stored at index_path, which defaults to '<xml_path>.awfindex.json' (for read-only
+        corpora, pass a path in a writable directory instead).
+        The parser_backend decides whether xml.etree.ElementTree or lxml is used (see xml_backend.py).
+        Both backends yield equal results.
+        If metadata_only is True, the XML is not parsed upfront either, so that get_publishing_date, get_author and
+        get_version only read the opening <AHB> tag of the file. The other methods still work (like in streaming mode).
         """
         self._xml_path = xml_path
-        self._element_tree = ET.parse(self._xml_path)
+        self._parser_backend: XmlParserBackend = parser_backend
+        self._element_tree: ET.ElementTree[ET.Element] | None = None
+        self._root_attrib: dict[str, str] | None = None
+        self._index: AhbIndex | None = None
+        if use_index:
+            self._index = AhbIndex(self._xml_path, index_path=index_path, parser_backend=self._parser_backend)
+        elif not streaming and not metadata_only:
+            with _measure_stage("xml_parse", self._xml_path.name):
+                self._element_tree = parse_xml(self._xml_path, self._parser_backend)
+
+    def _get_root_attrib(self) -> dict[str, str]:
+        """returns the attributes of the <AHB> root element"""
+        if self._element_tree is not None:
+            return self._element_tree.getroot().attrib
+        if self._root_attrib is None:
+            with open(self._xml_path, "rb") as xml_file:
+                for _, element in iterparse_xml(xml_file, ("start",), self._parser_backend):
+                    self._root_attrib = dict(element.attrib)
+                    break  # the root element is the first one to start; no need to read further
+        assert self._root_attrib is not None
+        return self._root_attrib
+
+    def _iter_top_level_elements(self) -> Iterator[ET.Element]:
+        """
+        yields the direct children of the root element (<AWF>, <Bedingungen>, <UB_Bedingungen>, <Pakete>) in document
+        order. In streaming mode, each child is removed from the (partial) tree as soon as the consumer is done with it.
+        """
+        if self._element_tree is not None:
+            yield from self._element_tree.getroot()
+            return
+        with open(self._xml_path, "rb") as xml_file:
+            root: ET.Element | None = None
+            depth = 0
+            for event, element in iterparse_xml(xml_file, ("start", "end"), self._parser_backend):
+                if event == "start":
+                    if root is None:
+                        root = element
+                        self._root_attrib = dict(element.attrib)
+                    depth += 1
+                    continue
+                depth -= 1
+                if depth == 1:
+                    assert root is not None
+                    yield element
+                    root.remove(element)  # the child is complete and consumed; release it
+
+    def _find_top_level_element(self, tag: str) -> ET.Element | None:
+        """returns the first direct child of the root element with the given tag (or None)"""
+        return next((element for element in self._iter_top_level_elements() if element.tag == tag), None)
 
     def get_publishing_date(self) -> date:
         """
         returns the publishing date of the message implementation guide
         """
-        raw_value = self._element_tree.getroot().attrib["Veroeffentlichungsdatum"]  # e.g. '02.04.2024'
+        raw_value = self._get_root_attrib()["Veroeffentlichungsdatum"]  # e.g. '02.04.2024'
         result = datetime.strptime(raw_value, "%d.%m.%Y").date()
         return result
 
@@ -185,34 +273,37 @@ class AhbReader:
         """
         returns the author of the AHB
         """
-        return self._element_tree.getroot().attrib["Author"]
+        return self._get_root_attrib()["Author"]
 
     def get_version(self) -> str:
         """
         returns the version of the AHB
         """
-        return self._element_tree.getroot().attrib["Versionsnummer"]
+        return self._get_root_attrib()["Versionsnummer"]
 
     def get_bedingungen(self) -> list[Bedingung]:
         """returns the plain bedingungen"""
-        return [_to_bedingung(x) for x in self._element_tree.getroot().find("Bedingungen")]  # type: ignore[union-attr]
+        return [_to_bedingung(x) for x in self._find_top_level_element("Bedingungen")]  # type: ignore[union-attr]
 
     def get_ub_bedingungen(self) -> list[UbBedingung]:
         """returns the UB Bedingungen"""
         return [
             _to_ub_bedingung(x)
-            for x in self._element_tree.getroot().find("UB_Bedingungen")  # type: ignore[union-attr]
+            for x in self._find_top_level_element("UB_Bedingungen")  # type: ignore[union-attr]
         ]
 
     def get_pakete(self) -> list[Paket]:
         """returns the package definitions"""
-        return [_to_paket(x) for x in self._element_tree.getroot().find("Pakete")]  # type: ignore[union-attr]
+        return [_to_paket(x) for x in self._find_top_level_element("Pakete")]  # type: ignore[union-attr]
 
     def get_anwendungsfall(self, pruefidentifikator: str) -> Anwendungsfall | None:
         """find the anwendungsfall matching the pruefidentifikator or return None"""
         if not _is_valid_pruefidentifikator(pruefidentifikator):
             raise ValueError(f"invalid pruefidentifikator: {pruefidentifikator}")
-        for element in self._element_tree.getroot():
+        if self._index is not None:
+            awf_element = self._index.get_anwendungsfall_element(pruefidentifikator)
+            return self._read_anwendungsfall(awf_element) if awf_element is not None else None
+        for element in self._iter_top_level_elements():
             if element.tag != "AWF":
                 continue
             raw_pruefi = remove_hashtag_prefix(element.attrib["Pruefidentifikator"]).strip()
@@ -221,14 +312,19 @@ class AhbReader:
             return self._read_anwendungsfall(element)
         return None
 
-    def get_anwendungsfaelle(self) -> list[Anwendungsfall]:
-        """finds all anwendungsfaelle in the XML file"""
-        result: list[Anwendungsfall] = []
-        for element in self._element_tree.getroot():
+    def iter_anwendungsfaelle(self) -> Iterator[Anwendungsfall]:
+        """
+        yields all anwendungsfaelle in the XML file one after another.
+        In streaming mode, only the <AWF> that is currently being converted is kept in memory.
+        """
+        for element in self._iter_top_level_elements():
             if element.tag != "AWF":
                 continue
-            result.append(self._read_anwendungsfall(element))
-        return result
+            yield self._read_anwendungsfall(element)
+
+    def get_anwendungsfaelle(self) -> list[Anwendungsfall]:
+        """finds all anwendungsfaelle in the XML file"""
+        return list(self.iter_anwendungsfaelle())
 
     def _iter_segments_and_segment_groups(
         self, element: ET.Element, is_uebertragungsdatei_level: bool = False
@@ -257,7 +353,7 @@ class AhbReader:
             format_element = original_element[0][0]
         if not format_element.tag.startswith("M_"):
             format_element = next(child for child in original_element[0] if child.tag.startswith("M_"))
-        return Anwendungsfall(
+        return _new_anwendungsfall(
             pruefidentifikator=remove_hashtag_prefix(original_element.attrib["Pruefidentifikator"]).strip(),
             beschreibung=remove_unnecessary_hyphens(
                 remove_linebreaks_and_hyphens(remove_hashtag_prefix(original_element.attrib["Beschreibung"]))
@@ -271,14 +367,42 @@ class AhbReader:
         """
         read the entire file and convert it to a MessageImplementationGuid instance
         """
+        with _measure_stage("model_build", self._xml_path.name):
+            return self._read_model()
 
-        result = Anwendungshandbuch(
+    def read_streamed(self, on_anwendungsfall: Callable[[Anwendungsfall], None]) -> Anwendungshandbuch:
+        """
+        reads the entire file in a single pass like read(), but instead of collecting the anwendungsfaelle, each
+        Anwendungsfall is passed to on_anwendungsfall as soon as it has been read. The returned Anwendungshandbuch
+        contains the header, bedingungen, ub_bedingungen and pakete but no anwendungsfaelle.
+        Combined with streaming=True, only one Anwendungsfall is kept in memory at a time.
+        """
+        with _measure_stage("model_build", self._xml_path.name):
+            return self._read_model(on_anwendungsfall)
+
+    def _read_model(self, on_anwendungsfall: Callable[[Anwendungsfall], None] | None = None) -> Anwendungshandbuch:
+        # a single pass over all top level elements, so that the file is read only once, even in streaming mode
+        anwendungsfaelle: list[Anwendungsfall] = []
+        if on_anwendungsfall is None:
+            on_anwendungsfall = anwendungsfaelle.append
+        bedingungen: list[Bedingung] = []
+        ub_bedingungen: list[UbBedingung] = []
+        pakete: list[Paket] = []
+        for element in self._iter_top_level_elements():
+            if _is_anwendungsfall(element):
+                on_anwendungsfall(self._read_anwendungsfall(element))
+            elif element.tag == "Bedingungen":
+                bedingungen = [_to_bedingung(x) for x in element]
+            elif element.tag == "UB_Bedingungen":
+                ub_bedingungen = [_to_ub_bedingung(x) for x in element]
+            elif element.tag == "Pakete":
+                pakete = [_to_paket(x) for x in element]
+        return _new_anwendungshandbuch(
             veroeffentlichungsdatum=self.get_publishing_date(),
             autor=self.get_author(),
             versionsnummer=self.get_version(),
-            bedingungen=tuple(self.get_bedingungen()),
-            ub_bedingungen=tuple(self.get_ub_bedingungen()),
-            pakete=tuple(self.get_pakete()),
-            anwendungsfaelle=tuple(self.get_anwendungsfaelle()),
+            anwendungsfaelle=tuple(anwendungsfaelle),
+            bedingungen=tuple(bedingungen),
+            ub_bedingungen=tuple(ub_bedingungen),
+            pakete=tuple(pakete),
         )
-        return result
@@ -0,0 +1,50 @@
+"""
+async counterparts of AhbReader(...).read() and MigReader(...).read() for use inside an event loop (e.g. in a web
+service). Parsing XML is CPU bound, so the blocking read runs in an executor and the event loop stays responsive.
+"""
+
+import asyncio
+import functools
+from concurrent.futures import Executor
+from pathlib import Path
+
+from fundamend.models.anwendungshandbuch import Anwendungshandbuch
+from fundamend.models.messageimplementationguide import MessageImplementationGuide
+from fundamend.reader.ahbreader import AhbReader
+from fundamend.reader.migreader import MigReader
+from fundamend.reader.xml_backend import XmlParserBackend
+
+
+# module level functions (instead of lambdas), so that they can be pickled if the executor is a ProcessPoolExecutor
+def _read_ahb(xml_path: Path, parser_backend: XmlParserBackend) -> Anwendungshandbuch:
+    return AhbReader(xml_path, parser_backend=parser_backend).read()
+
+
+def _read_mig(xml_path: Path, parser_backend: XmlParserBackend) -> MessageImplementationGuide:
+    return MigReader(xml_path, parser_backend=parser_backend).read()
+
+
+async def read_ahb_async(
+    xml_path: Path, parser_backend: XmlParserBackend = "stdlib", executor: Executor | None = None
+) -> Anwendungshandbuch:
+    """
+    returns the same as AhbReader(xml_path, parser_backend=parser_backend).read() without blocking the event loop.
+    The XML is read in the given executor; by default, that's the default (thread pool) executor of the running loop.
+    Pass a ProcessPoolExecutor to read several AHBs truly in parallel.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(_read_ahb, xml_path, parser_backend))
+
+
+async def read_mig_async(
+    xml_path: Path, parser_backend: XmlParserBackend = "stdlib", executor: Executor | None = None
+) -> MessageImplementationGuide:
+    """
+    returns the same as MigReader(xml_path, parser_backend=parser_backend).read() without blocking the event loop
+    (see read_ahb_async)
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(_read_mig, xml_path, parser_backend))
+
+
+__all__ = ["read_ahb_async", "read_mig_async"]
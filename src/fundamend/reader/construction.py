@@ -0,0 +1,90 @@
+"""
+The readers create hundreds of thousands of (frozen) models per file from values they've already normalised
+themselves (stripped strings, enums, tuples of models). Re-validating these values in pydantic costs more than the
+XML parsing, so the readers create the models with a trusted constructor that skips the validation.
+
+To re-enable the (strict) pydantic validation, e.g. while debugging a reader, either set the environment variable
+FUNDAMEND_STRICT_VALIDATION=1 or use the context manager:
+
+    with strict_validation():
+        ahb = AhbReader(ahb_path).read()  # raises a pydantic ValidationError if the reader produced invalid values
+"""
+
+import os
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, TypeVar
+
+from pydantic import BaseModel
+
+_ModelT = TypeVar("_ModelT", bound=BaseModel)
+
+_strict_validation: ContextVar[bool] = ContextVar(
+    "fundamend_strict_validation", default=os.environ.get("FUNDAMEND_STRICT_VALIDATION", "") not in {"", "0"}
+)
+
+
+def is_strict_validation_enabled() -> bool:
+    """returns true if the readers validate the models they create (see strict_validation)"""
+    return _strict_validation.get()
+
+
+@contextmanager
+def strict_validation(enabled: bool = True) -> Iterator[None]:
+    """
+    within this context manager, the readers validate every model they create in pydantic strict mode
+    (or, with enabled=False, don't validate them, regardless of $FUNDAMEND_STRICT_VALIDATION)
+    """
+    token = _strict_validation.set(enabled)
+    try:
+        yield
+    finally:
+        _strict_validation.reset(token)
+
+
+def unvalidated_constructor(model_class: type[_ModelT]) -> Callable[[dict[str, Any]], _ModelT]:
+    """
+    returns a function that creates an instance of the model_class from a dict of all field values (in the order of
+    the fields) without validating them; the instance takes over the dict as its __dict__.
+    This is what model_construct does, minus the overhead of checking defaults, aliases and private attributes for
+    every instance (in fact, model_construct is even slower than the validation).
+    """
+    if model_class.__pydantic_post_init__ or any(field.alias for field in model_class.model_fields.values()):
+        raise ValueError(f"{model_class.__name__} cannot be constructed without validation")
+    field_names = tuple(model_class.model_fields)
+
+    def construct(values: dict[str, Any]) -> _ModelT:
+        instance = new(model_class)
+        object_setattr(instance, "__dict__", values)
+        object_setattr(instance, "__pydantic_fields_set__", set(field_names))
+        object_setattr(instance, "__pydantic_extra__", None)
+        object_setattr(instance, "__pydantic_private__", None)
+        return instance
+
+    new = model_class.__new__
+    object_setattr = object.__setattr__
+    return construct
+
+
+def trusted_constructor(model_class: type[_ModelT]) -> Callable[..., _ModelT]:
+    """
+    returns a function that creates an instance of the model_class from keyword arguments without validating them.
+    All fields have to be passed in the order of their definition (no defaults are filled in) and the values have to
+    be of the annotated types already (e.g. tuples, not lists). Then the instances are equal to those created by
+    model_class(**values). In strict validation mode, both are checked.
+    """
+    construct_unvalidated = unvalidated_constructor(model_class)
+    field_names = tuple(model_class.model_fields)
+
+    def construct(**values: Any) -> _ModelT:
+        if _strict_validation.get():
+            if tuple(values) != field_names:  # the order matters, e.g. for model_dump
+                raise TypeError(f"{model_class.__name__} requires the fields {field_names}, got {tuple(values)}")
+            return model_class.model_validate(values, strict=True)
+        return construct_unvalidated(values)
+
+    return construct
+
+
+__all__ = ["is_strict_validation_enabled", "strict_validation", "trusted_constructor", "unvalidated_constructor"]
@@ -8,6 +8,7 @@ from pathlib import Path
 
 from efoli import EdifactFormat
 
+from fundamend.instrumentation import _measure_stage
 from fundamend.models.messageimplementationguide import (
     Code,
     DataElement,
@@ -17,6 +18,7 @@ from fundamend.models.messageimplementationguide import (
     Segment,
     SegmentGroup,
 )
+from fundamend.reader.construction import trusted_constructor
 from fundamend.reader.element_distinction import (
     _is_code,
     _is_data_element,
@@ -25,14 +27,24 @@ from fundamend.reader.element_distinction import (
     _is_segment_group,
     _is_uebertragungsdatei,
 )
+from fundamend.reader.xml_backend import XmlParserBackend, iterparse_xml, parse_xml
 from fundamend.utils import lstrip
 
+# the values are normalised below, so there's no need to validate them (again) in pydantic; see construction.py
+_new_code = trusted_constructor(Code)
+_new_data_element = trusted_constructor(DataElement)
+_new_data_element_group = trusted_constructor(DataElementGroup)
+_new_segment = trusted_constructor(Segment)
+_new_segment_group = trusted_constructor(SegmentGroup)
+_new_message_implementation_guide = trusted_constructor(MessageImplementationGuide)
+
 
 def _to_code(element: ET.Element) -> Code:
     assert _is_code(element)
-    return Code(
-        name=element.attrib["Name"].strip(),
-        description=element.attrib["Description"].strip() or None,
+    attrib = element.attrib  # accessing .attrib is not free (esp. with lxml), so we do it only once per element
+    return _new_code(
+        name=attrib["Name"].strip(),
+        description=attrib["Description"].strip() or None,
         value=element.text and element.text.strip(),
     )
 
@@ -45,14 +57,15 @@ def _to_data_element(element: ET.Element) -> DataElement:
             codes.append(_to_code(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return DataElement(
+    attrib = element.attrib
+    return _new_data_element(
         id=element.tag,
-        name=element.attrib["Name"].strip(),
-        description=element.attrib["Description"].strip() or None,
-        status_std=MigStatus(element.attrib["Status_Std"].strip()),
-        status_specification=MigStatus(element.attrib["Status_Specification"].strip()),
-        format_std=element.attrib["Format_Std"].strip(),
-        format_specification=element.attrib["Format_Specification"].strip(),
+        name=attrib["Name"].strip(),
+        description=attrib["Description"].strip() or None,
+        status_std=MigStatus(attrib["Status_Std"].strip()),
+        status_specification=MigStatus(attrib["Status_Specification"].strip()),
+        format_std=attrib["Format_Std"].strip(),
+        format_specification=attrib["Format_Specification"].strip(),
         codes=tuple(codes),
     )
 
@@ -65,12 +78,13 @@ def _to_data_element_group(element: ET.Element) -> DataElementGroup:
             data_elements.append(_to_data_element(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return DataElementGroup(
+    attrib = element.attrib
+    return _new_data_element_group(
         id=element.tag,
-        name=element.attrib["Name"].strip(),
-        description=element.attrib["Description"].strip() or None,
-        status_std=MigStatus(element.attrib["Status_Std"].strip()),
-        status_specification=MigStatus(element.attrib["Status_Specification"].strip()),
+        name=attrib["Name"].strip(),
+        description=attrib["Description"].strip() or None,
+        status_std=MigStatus(attrib["Status_Std"].strip()),
+        status_specification=MigStatus(attrib["Status_Specification"].strip()),
         data_elements=tuple(data_elements),
     )
 
@@ -85,18 +99,19 @@ def _to_segment(element: ET.Element, is_on_uebertragungsdatei_level: bool = Fals
             data_elements.append(_to_data_element(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return Segment(
+    attrib = element.attrib
+    return _new_segment(
         id=lstrip("S_", element.tag),
-        name=element.attrib["Name"].strip(),
-        description=element.attrib["Description"].strip() or None,
-        counter=element.attrib["Counter"].strip(),
-        level=int(element.attrib["Level"].strip()),
-        max_rep_std=int(element.attrib["MaxRep_Std"].strip()),
-        max_rep_specification=int(element.attrib["MaxRep_Specification"].strip()),
-        status_std=MigStatus(element.attrib["Status_Std"].strip()),
-        status_specification=MigStatus(element.attrib["Status_Specification"].strip()),
-        example=element.attrib["Example"].strip() or None,
-        number=element.attrib["Number"].strip(),
+        name=attrib["Name"].strip(),
+        description=attrib["Description"].strip() or None,
+        counter=attrib["Counter"].strip(),
+        level=int(attrib["Level"].strip()),
+        number=attrib["Number"].strip(),
+        max_rep_std=int(attrib["MaxRep_Std"].strip()),
+        max_rep_specification=int(attrib["MaxRep_Specification"].strip()),
+        status_std=MigStatus(attrib["Status_Std"].strip()),
+        status_specification=MigStatus(attrib["Status_Specification"].strip()),
+        example=attrib["Example"].strip() or None,
         data_elements=tuple(data_elements),
         is_on_uebertragungsdatei_level=is_on_uebertragungsdatei_level,
     )
@@ -112,15 +127,16 @@ def _to_segment_group(element: ET.Element) -> SegmentGroup:
             segments_and_groups.append(_to_segment(child))
         else:
             raise ValueError(f"unexpected element: {child.tag}")
-    return SegmentGroup(
+    attrib = element.attrib
+    return _new_segment_group(
         id=lstrip("G_", element.tag),
-        name=element.attrib["Name"].strip(),
-        status_std=MigStatus(element.attrib["Status_Std"].strip()),
-        status_specification=MigStatus(element.attrib["Status_Specification"].strip()),
-        counter=element.attrib["Counter"].strip(),
-        level=int(element.attrib["Level"].strip()),
-        max_rep_std=int(element.attrib["MaxRep_Std"].strip()),
-        max_rep_specification=int(element.attrib["MaxRep_Specification"].strip()),
+        name=attrib["Name"].strip(),
+        counter=attrib["Counter"].strip(),
+        level=int(attrib["Level"].strip()),
+        max_rep_std=int(attrib["MaxRep_Std"].strip()),
+        max_rep_specification=int(attrib["MaxRep_Specification"].strip()),
+        status_std=MigStatus(attrib["Status_Std"].strip()),
+        status_specification=MigStatus(attrib["Status_Specification"].strip()),
         elements=tuple(segments_and_groups),
     )
 
@@ -137,19 +153,63 @@ class MigReader:
     Accesses information from an XML based message implementation guide
     """
 
-    def __init__(self, xml_path: Path):
+    def __init__(
+        self,
+        xml_path: Path,
+        parser_backend: XmlParserBackend = "stdlib",
+        metadata_only: bool = False,
+    ):
         """
-        initialize by providing the path to the XML file
+        initialize by providing the path to the XML file.
+        The parser_backend decides whether xml.etree.ElementTree or lxml is used (see xml_backend.py).
+        Both backends yield equal results.
+        If metadata_only is True, the XML is not parsed upfront: get_publishing_date, get_author, get_version and
+        get_format then only read the opening tags (up to the first <M_...>) of the file. read() still works, but parses
+        the entire file then.
         """
         self._xml_path = xml_path
-        self._element_tree = ET.parse(self._xml_path)
+        self._parser_backend: XmlParserBackend = parser_backend
+        self._element_tree: ET.ElementTree[ET.Element] | None = None
+        self._root_attrib: dict[str, str] | None = None
+        self._message_tag: str | None = None
+        if not metadata_only:
+            self._get_element_tree()
+
+    def _get_element_tree(self) -> "ET.ElementTree[ET.Element]":
+        """returns the element tree of the entire file (which is parsed on the first call)"""
+        if self._element_tree is None:
+            with _measure_stage("xml_parse", self._xml_path.name):
+                self._element_tree = parse_xml(self._xml_path, self._parser_backend)
+        return self._element_tree
+
+    def _read_header(self) -> tuple[dict[str, str], str]:
+        """
+        returns the attributes of the root element (either <M_FORMAT> or <Uebertragungsdatei>) and the tag of the first
+        element starting with 'M_'
+        """
+        if self._element_tree is not None:
+            root = self._element_tree.getroot()
+            message_element = root if not _is_uebertragungsdatei(root) else _get_first_tag_starting_with_m(root)
+            return root.attrib, message_element.tag
+        if self._root_attrib is None or self._message_tag is None:
+            with open(self._xml_path, "rb") as xml_file:
+                for _, element in iterparse_xml(xml_file, ("start",), self._parser_backend):
+                    if self._root_attrib is None:
+                        self._root_attrib = dict(element.attrib)
+                    if element.tag.startswith("M_"):
+                        self._message_tag = element.tag
+                        break  # everything we need is in the opening tags; no need to read further
+            if self._message_tag is None:
+                raise ValueError("No element starting with M_ found")
+        assert self._root_attrib is not None
+        return self._root_attrib, self._message_tag
 
     def get_publishing_date(self) -> date:
         """
         returns the publishing date of the message implementation guide
         """
-        root = self._element_tree.getroot()  # might be either <M_FORMAT> or <Uebertragungsdatei>
-        raw_value = root.attrib["Veroeffentlichungsdatum"]  # e.g. '24.10.2023'
+        root_attrib, _ = self._read_header()  # of either <M_FORMAT> or <Uebertragungsdatei>
+        raw_value = root_attrib["Veroeffentlichungsdatum"]  # e.g. '24.10.2023'
         result = datetime.strptime(raw_value, "%d.%m.%Y").date()
         return result
 
@@ -157,22 +217,20 @@ class MigReader:
         """
         returns the author of the message implementation guide
         """
-        root = self._element_tree.getroot()  # might be either <M_FORMAT> or <Uebertragungsdatei>
-        return root.attrib["Author"].strip()
+        root_attrib, _ = self._read_header()  # of either <M_FORMAT> or <Uebertragungsdatei>
+        return root_attrib["Author"].strip()
 
     def get_version(self) -> str:
         """
         returns the version of the message implementation guide
         """
-        root = self._element_tree.getroot()  # might be either <M_FORMAT> or <Uebertragungsdatei>
-        return root.attrib["Versionsnummer"].strip()
+        root_attrib, _ = self._read_header()  # of either <M_FORMAT> or <Uebertragungsdatei>
+        return root_attrib["Versionsnummer"].strip()
 
     def get_format(self) -> EdifactFormat:
         """returns the format of the message implementation guide, e.g. 'UTILTS'"""
-        root = self._element_tree.getroot()
-        if _is_uebertragungsdatei(root):
-            root = _get_first_tag_starting_with_m(root)
-        return EdifactFormat(lstrip("M_", root.tag))  # converts 'M_UTILTS' to 'UTILTS'
+        _, message_tag = self._read_header()
+        return EdifactFormat(lstrip("M_", message_tag))  # converts 'M_UTILTS' to 'UTILTS'
 
     def _iter_segments_and_segment_groups(self, element: ET.Element) -> list[SegmentGroup | Segment]:
         """recursive function that builds a list of all segments and segment groups"""
@@ -187,8 +245,12 @@ class MigReader:
         """
         read the entire file and convert it to a MessageImplementationGuide instance
         """
+        with _measure_stage("model_build", self._xml_path.name):
+            return self._read_model()
+
+    def _read_model(self) -> MessageImplementationGuide:
         segments_and_groups: list[Segment | SegmentGroup] = []
-        root = self._element_tree.getroot()
+        root = self._get_element_tree().getroot()
         if _is_uebertragungsdatei(root):
             for elem in root:
                 if _is_segment(elem):
@@ -201,11 +263,10 @@ class MigReader:
         else:
             for element in root:
                 segments_and_groups.extend(self._iter_segments_and_segment_groups(element))
-        result = MessageImplementationGuide(
+        return _new_message_implementation_guide(
             veroeffentlichungsdatum=self.get_publishing_date(),
             autor=self.get_author(),
             versionsnummer=self.get_version(),
             format=self.get_format(),
             elements=tuple(segments_and_groups),
         )
-        return result
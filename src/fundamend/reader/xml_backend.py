@@ -0,0 +1,77 @@
+"""
+pluggable XML parser backends for the MigReader and AhbReader.
+Besides the standard library xml.etree.ElementTree, lxml can be used (pip install fundamend[lxml]).
+Both backends yield elements with the same (ElementTree) API, so the resulting models are identical.
+lxml parses roughly twice as fast, but accessing tags and attributes of its elements is slower; for the BDEW XMLs both
+effects about cancel out (see benchmarks/benchmark_xml_backends.py). That's why the readers default to 'stdlib'.
+"""
+
+import xml.etree.ElementTree as ET
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Literal
+
+try:
+    from lxml import etree as lxml_etree  # type: ignore[import-untyped, import-not-found, unused-ignore]
+except ImportError:
+    # lxml is only an optional dependency
+    lxml_etree = None
+
+XmlParserBackend = Literal["auto", "lxml", "stdlib"]
+"""
+'auto' uses lxml if it is installed and the standard library xml.etree.ElementTree otherwise.
+'lxml' enforces lxml (and raises an ImportError if it's not installed), 'stdlib' enforces xml.etree.ElementTree.
+"""
+
+
+def is_lxml_available() -> bool:
+    """returns true iff lxml is installed"""
+    return lxml_etree is not None
+
+
+def _resolve_backend(backend: XmlParserBackend) -> Literal["lxml", "stdlib"]:
+    if backend == "auto":
+        return "lxml" if is_lxml_available() else "stdlib"
+    if backend == "lxml":
+        if not is_lxml_available():
+            raise ImportError(
+                "The lxml parser backend was requested, but lxml is not installed; pip install fundamend[lxml]"
+            )
+        return "lxml"
+    if backend == "stdlib":
+        return "stdlib"
+    raise ValueError(f"Unknown XML parser backend: {backend}")
+
+
+def _lxml_parser() -> "lxml_etree.XMLParser":
+    # the stdlib TreeBuilder ignores comments and processing instructions; lxml must do the same or else it would yield
+    # elements whose tag is not a string
+    return lxml_etree.XMLParser(remove_comments=True, remove_pis=True)
+
+
+def parse_xml(xml_path: Path, backend: XmlParserBackend = "auto") -> "ET.ElementTree[ET.Element]":
+    """parses the entire XML file at xml_path using the given backend"""
+    if _resolve_backend(backend) == "lxml":
+        return lxml_etree.parse(str(xml_path), parser=_lxml_parser())  # type: ignore[no-any-return]
+    return ET.parse(xml_path)
+
+
+def parse_xml_bytes(xml_bytes: bytes, backend: XmlParserBackend = "auto") -> ET.Element:
+    """parses an entire XML document (e.g. a fragment with an XML declaration) from memory using the given backend"""
+    if _resolve_backend(backend) == "lxml":
+        return lxml_etree.fromstring(xml_bytes, parser=_lxml_parser())  # type: ignore[no-any-return]
+    return ET.fromstring(xml_bytes)
+
+
+def iterparse_xml(
+    xml_file: IO[bytes], events: tuple[Literal["start", "end"], ...], backend: XmlParserBackend = "auto"
+) -> Iterator[tuple[str, ET.Element]]:
+    """incrementally parses the given binary file using the given backend (see ET.iterparse)"""
+    if _resolve_backend(backend) == "lxml":
+        return lxml_etree.iterparse(  # type: ignore[no-any-return]
+            xml_file, events=events, remove_comments=True, remove_pis=True
+        )
+    return ET.iterparse(xml_file, events=events)
+
+
+__all__ = ["XmlParserBackend", "is_lxml_available", "iterparse_xml", "parse_xml", "parse_xml_bytes"]
@@ -17,6 +17,7 @@ from pydantic import BaseModel
 
 from fundamend.models import anwendungshandbuch as ahb
 from fundamend.models import messageimplementationguide as mig
+from fundamend.models.base import discard_cached_properties
 
 
 def _disabled_hash(_: Any) -> int:  # pragma: no cover
@@ -25,6 +26,7 @@ def _disabled_hash(_: Any) -> int:  # pragma: no cover
 
 def _set(model: BaseModel, field_name: str, field_value: Any) -> None:
     object.__setattr__(model, field_name, field_value)
+    discard_cached_properties(model)
     model.__hash__ = MethodType(_disabled_hash, model)  # type: ignore[method-assign]
     # This hash function override is just for our safety to prevent obscure errors when trying to use
     # the model as a hashable object.
@@ -456,6 +458,7 @@ def remove_example_codes_recursive(
 
     :param element: The element to remove example codes from recursively.
     """
+    discard_cached_properties(element)  # the element itself or one of its descendants may be modified
     match element:
         case mig.MessageImplementationGuide() | mig.SegmentGroup() | ahb.Anwendungsfall() | ahb.SegmentGroup():
             for sub_element in element.elements:
@@ -489,5 +492,18 @@ def sanitize_ahb(mig_root: mig.MessageImplementationGuide, ahb_root: ahb.Anwendu
     add_must_not_pattern_to_ahb_conditions(ahb_root)
     remove_example_codes_recursive(mig_root)
     for anwendungsfall in ahb_root.anwendungsfaelle:
-        add_unused_segment_or_groups_to_ahb(mig_root, anwendungsfall)
-        remove_example_codes_recursive(anwendungsfall)
+        sanitize_anwendungsfall(mig_root, anwendungsfall)
+
+
+def sanitize_anwendungsfall(mig_root: mig.MessageImplementationGuide, anwendungsfall: ahb.Anwendungsfall) -> None:
+    """
+    Sanitizes a single Anwendungsfall like ``sanitize_ahb`` does for all Anwendungsfälle of an AHB.
+    This allows sanitizing the Anwendungsfälle one after another while the AHB is being read (in streaming mode).
+    The caller is responsible for calling ``remove_example_codes_recursive`` on the MIG (once) and
+    ``add_must_not_pattern_to_ahb_conditions`` on the AHB.
+
+    :param mig_root: The MIG root element to add unused elements from.
+    :param anwendungsfall: The Anwendungsfall to add unused elements to.
+    """
+    add_unused_segment_or_groups_to_ahb(mig_root, anwendungsfall)
+    remove_example_codes_recursive(anwendungsfall)
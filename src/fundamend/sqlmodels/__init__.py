@@ -17,8 +17,9 @@ you need to install fundamend[sqlmodels] to use this sub-package
 
 from .ahb_formatversion_diff_view import AhbFormatversionDiffLine, DiffStatus, create_ahb_formatversion_diff_view
 from .ahb_pruefi_diff_view import AhbPruefiDiffLine, create_ahb_pruefi_diff_view
+from .ahb_repository import AhbRepository, AsyncAhbRepository
 from .ahbtabellen_view import AhbTabellenLine, create_ahbtabellen_view
-from .ahbview import AhbHierarchyMaterialized, create_ahb_view, create_db_and_populate_with_ahb_view
+from .ahbview import AhbHierarchyMaterialized, add_or_replace_ahb, create_ahb_view, create_db_and_populate_with_ahb_view
 from .anwendungshandbuch import (
     Anwendungsfall,
     Anwendungshandbuch,
@@ -45,9 +46,11 @@ __all__ = [
     "AhbFormatversionDiffLine",
     "AhbHierarchyMaterialized",
     "AhbPruefiDiffLine",
+    "AhbRepository",
     "AhbTabellenLine",
     "Anwendungsfall",
     "Anwendungshandbuch",
+    "AsyncAhbRepository",
     "Bedingung",
     "Code",
     "DataElement",
@@ -64,6 +67,7 @@ __all__ = [
     "MigSegmentGroupLink",
     "Segment",
     "SegmentGroup",
+    "add_or_replace_ahb",
     "create_ahb_formatversion_diff_view",
     "create_ahb_pruefi_diff_view",
     "create_ahb_view",
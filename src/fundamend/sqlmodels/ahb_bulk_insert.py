@@ -0,0 +1,261 @@
+"""
+A bulk insert path for the raw AHB tables that bypasses the SQLAlchemy ORM.
+Instead of building an object graph (from_model) and flushing it with session.add_all, the Pydantic Anwendungshandbuch
+is walked once and the rows are emitted as plain dicts per table which are then written with one executemany-style
+insert() per table. The resulting table contents are the same as with the ORM (except for the random primary keys).
+"""
+
+import uuid
+from collections import defaultdict
+from datetime import date
+from typing import Any
+
+from efoli import get_edifact_format_version
+
+try:
+    from sqlalchemy import insert
+    from sqlalchemy.engine import Connection
+    from sqlmodel import SQLModel
+except ImportError as import_error:
+    import_error.msg += "; Did you install fundamend[sqlmodels] or did you try to import from fundamend.models instead?"
+    # sqlmodel is only an optional dependency when fundamend is used to fill a database
+    raise
+
+from fundamend.models.anwendungshandbuch import Anwendungsfall as PydanticAnwendungsfall
+from fundamend.models.anwendungshandbuch import Anwendungshandbuch as PydanticAnwendungshandbuch
+from fundamend.models.anwendungshandbuch import Bedingung as PydanticBedingung
+from fundamend.models.anwendungshandbuch import DataElement as PydanticDataElement
+from fundamend.models.anwendungshandbuch import DataElementGroup as PydanticDataElementGroup
+from fundamend.models.anwendungshandbuch import Paket as PydanticPaket
+from fundamend.models.anwendungshandbuch import Segment as PydanticSegment
+from fundamend.models.anwendungshandbuch import SegmentGroup as PydanticSegmentGroup
+from fundamend.models.anwendungshandbuch import UbBedingung as PydanticUbBedingung
+from fundamend.sqlmodels.anwendungshandbuch import (
+    Anwendungsfall,
+    Anwendungshandbuch,
+    Bedingung,
+    Code,
+    DataElement,
+    DataElementGroup,
+    Paket,
+    Segment,
+    SegmentGroup,
+    SegmentGroupLink,
+    UbBedingung,
+)
+
+# pylint:disable=too-many-arguments
+
+AhbRows = dict[type[SQLModel], list[dict[str, Any]]]
+"""
+rows per SQLModel table class; each row is a dict of column name to value
+"""
+
+_INSERT_ORDER: list[type[SQLModel]] = [
+    Anwendungshandbuch,
+    Anwendungsfall,
+    SegmentGroup,
+    SegmentGroupLink,
+    Segment,
+    DataElementGroup,
+    DataElement,
+    Code,
+    Bedingung,
+    UbBedingung,
+    Paket,
+]
+"""parents before children, so that the foreign keys are valid at any time"""
+
+
+def _add_data_element(
+    rows: AhbRows,
+    model: PydanticDataElement,
+    position: int,
+    segment_primary_key: uuid.UUID | None,
+    data_element_group_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[DataElement].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "position": position,
+            "digest": model.digest,
+            "ahb_status": model.ahb_status,
+            "data_element_group_primary_key": data_element_group_primary_key,
+            "segment_primary_key": segment_primary_key,
+        }
+    )
+    rows[Code].extend(
+        {
+            "primary_key": uuid.uuid4(),
+            "name": code.name,
+            "description": code.description,
+            "value": code.value,
+            "ahb_status": code.ahb_status,
+            "position": code_position,
+            "digest": code.digest,
+            "data_element_primary_key": primary_key,
+        }
+        for code_position, code in enumerate(model.codes)
+    )
+
+
+def _add_segment(
+    rows: AhbRows,
+    model: PydanticSegment,
+    position: int,
+    segmentgroup_primary_key: uuid.UUID | None,
+    anwendungsfall_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[Segment].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "number": model.number,
+            "ahb_status": model.ahb_status,
+            "is_on_uebertragungsdatei_level": model.is_on_uebertragungsdatei_level,
+            "position": position,
+            "digest": model.digest,
+            "segmentgroup_primary_key": segmentgroup_primary_key,
+            "anwendungsfall_primary_key": anwendungsfall_primary_key,
+        }
+    )
+    for element_position, element in enumerate(model.data_elements):
+        if isinstance(element, PydanticDataElement):
+            _add_data_element(rows, element, element_position, primary_key, None)
+            continue
+        if isinstance(element, PydanticDataElementGroup):
+            group_primary_key = uuid.uuid4()
+            rows[DataElementGroup].append(
+                {
+                    "primary_key": group_primary_key,
+                    "id": element.id,
+                    "name": element.name,
+                    "position": element_position,
+                    "digest": element.digest,
+                    "segment_primary_key": primary_key,
+                }
+            )
+            for data_element_position, data_element in enumerate(element.data_elements):
+                _add_data_element(rows, data_element, data_element_position, None, group_primary_key)
+
+
+def _add_segment_group(
+    rows: AhbRows,
+    model: PydanticSegmentGroup,
+    position: int,
+    parent_primary_key: uuid.UUID | None,
+    anwendungsfall_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[SegmentGroup].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "ahb_status": model.ahb_status,
+            "position": position,
+            "digest": model.digest,
+            "anwendungsfall_primary_key": anwendungsfall_primary_key,
+        }
+    )
+    if parent_primary_key is not None:
+        rows[SegmentGroupLink].append({"parent_id": parent_primary_key, "child_id": primary_key})
+    for element_position, element in enumerate(model.elements):
+        if isinstance(element, PydanticSegment):
+            _add_segment(rows, element, element_position, primary_key, None)
+            continue
+        if isinstance(element, PydanticSegmentGroup):
+            _add_segment_group(rows, element, element_position, primary_key, None)
+
+
+def _add_anwendungsfall(
+    rows: AhbRows, model: PydanticAnwendungsfall, position: int, anwendungshandbuch_primary_key: uuid.UUID
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[Anwendungsfall].append(
+        {
+            "primary_key": primary_key,
+            "pruefidentifikator": model.pruefidentifikator,
+            "beschreibung": model.beschreibung,
+            "kommunikation_von": model.kommunikation_von,
+            "kommunikationsrichtungen": (
+                [kr.model_dump(mode="json") for kr in model.kommunikationsrichtungen]
+                if model.kommunikationsrichtungen is not None
+                else None
+            ),
+            "format": model.format,
+            "position": position,
+            "digest": model.digest,
+            "anwendungshandbuch_primary_key": anwendungshandbuch_primary_key,
+        }
+    )
+    for element_position, element in enumerate(model.elements):
+        if isinstance(element, PydanticSegment):
+            _add_segment(rows, element, element_position, None, primary_key)
+            continue
+        if isinstance(element, PydanticSegmentGroup):
+            _add_segment_group(rows, element, element_position, None, primary_key)
+
+
+def ahb_to_rows(
+    model: PydanticAnwendungshandbuch, gueltig_von: date | None = None, gueltig_bis: date | None = None
+) -> AhbRows:
+    """
+    walks the given Anwendungshandbuch once and returns the rows of all raw AHB tables.
+    The rows are the same as those of Anwendungshandbuch.from_model(model) (with gueltig_von/bis and the
+    edifact_format_version set like in create_db_and_populate_with_ahb_view), but no ORM objects are created.
+    """
+    rows: AhbRows = defaultdict(list)
+    primary_key = uuid.uuid4()
+    rows[Anwendungshandbuch].append(
+        {
+            "primary_key": primary_key,
+            "veroeffentlichungsdatum": model.veroeffentlichungsdatum,
+            "autor": model.autor,
+            "versionsnummer": model.versionsnummer,
+            "gueltig_von": gueltig_von,
+            "gueltig_bis": gueltig_bis,
+            "edifact_format_version": get_edifact_format_version(gueltig_von) if gueltig_von is not None else None,
+        }
+    )
+    entries_per_table: list[
+        tuple[type[SQLModel], tuple[PydanticBedingung | PydanticUbBedingung | PydanticPaket, ...]]
+    ] = [
+        (Bedingung, model.bedingungen),
+        (UbBedingung, model.ub_bedingungen),
+        (Paket, model.pakete),
+    ]
+    for row_class, entries in entries_per_table:
+        rows[row_class].extend(
+            {
+                "primary_key": uuid.uuid4(),
+                "nummer": entry.nummer,
+                "text": entry.text,
+                "position": position,
+                "anwendungshandbuch_primary_key": primary_key,
+            }
+            for position, entry in enumerate(entries)
+        )
+    for position, anwendungsfall in enumerate(model.anwendungsfaelle):
+        if anwendungsfall.is_outdated:
+            continue
+        _add_anwendungsfall(rows, anwendungsfall, position, primary_key)
+    return rows
+
+
+def bulk_insert_ahb_rows(connection: Connection, rows: AhbRows) -> None:
+    """
+    inserts the given rows (see ahb_to_rows) with one executemany-style INSERT per table.
+    The caller is responsible for committing.
+    """
+    for row_class in _INSERT_ORDER:
+        if rows.get(row_class):
+            connection.execute(insert(row_class.__table__), rows[row_class])  # type: ignore[attr-defined]
+
+
+__all__ = ["AhbRows", "ahb_to_rows", "bulk_insert_ahb_rows"]
@@ -0,0 +1,356 @@
+"""
+A Python side alternative to materialize_ahb_view.sql.
+The SQL script reconstructs the hierarchy from the raw tables with recursive CTEs and computes the id_path qualifiers
+with correlated sub queries that check, for every segment (group) and data element, whether a sibling has the same id.
+All of this is known already when the rows of the raw tables are created (see ahb_bulk_insert.py), so here the rows of
+ahb_hierarchy_materialized are computed in a single depth-first traversal per Anwendungsfall instead.
+The result is the same row for row (except for the random id).
+"""
+
+import json
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+try:
+    from sqlalchemy.engine import Connection
+except ImportError as import_error:
+    import_error.msg += "; Did you install fundamend[sqlmodels] or did you try to import from fundamend.models instead?"
+    # sqlmodel is only an optional dependency when fundamend is used to fill a database
+    raise
+
+from fundamend.models.id_path import id_path_part
+from fundamend.sqlmodels.ahb_bulk_insert import AhbRows
+from fundamend.sqlmodels.anwendungshandbuch import (
+    Anwendungsfall,
+    Anwendungshandbuch,
+    Code,
+    DataElement,
+    DataElementGroup,
+    Segment,
+    SegmentGroup,
+    SegmentGroupLink,
+)
+from fundamend.sqlmodels.internals import (
+    _coalesce,
+    _HierarchyTree,
+    _ids_with_siblings,
+    _join,
+    _Row,
+    _to_sqlite,
+    _trim,
+)
+
+_COLUMNS: tuple[str, ...] = (
+    "id",
+    "anwendungsfall_pk",
+    "current_id",
+    "root_id",
+    "parent_id",
+    "depth",
+    "position",
+    "path",
+    "parent_path",
+    "root_order",
+    "type",
+    "source_id",
+    "sort_path",
+    "id_path",
+    "pruefidentifikator",
+    "format",
+    "versionsnummer",
+    "gueltig_von",
+    "gueltig_bis",
+    "beschreibung",
+    "kommunikationsrichtungen",
+    "edifact_format_version",
+    "anwendungshandbuch_primary_key",
+    "is_on_uebertragungsdatei_level",
+    "segmentgroup_id",
+    "segmentgroup_name",
+    "segmentgroup_ahb_status",
+    "segmentgroup_position",
+    "segmentgroup_anwendungsfall_primary_key",
+    "segment_id",
+    "segment_name",
+    "segment_number",
+    "segment_ahb_status",
+    "segment_position",
+    "dataelementgroup_id",
+    "dataelementgroup_name",
+    "dataelementgroup_position",
+    "dataelement_id",
+    "dataelement_name",
+    "dataelement_position",
+    "dataelement_ahb_status",
+    "code_id",
+    "code_name",
+    "code_description",
+    "code_value",
+    "code_ahb_status",
+    "code_position",
+    "digest",
+    "line_name",
+    "line_ahb_status",
+)
+"""the columns of ahb_hierarchy_materialized (see create_ahb_hierarchy_materialized.sql)"""
+
+_INSERT_STATEMENT = (
+    f"INSERT INTO ahb_hierarchy_materialized ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})"
+)
+
+
+class _Flattener:
+    """
+    walks the hierarchy of a single AHB depth-first and collects the rows of ahb_hierarchy_materialized.
+    The values in the rows are already converted to what SQLite stores (e.g. hex strings for UUIDs).
+    """
+
+    def __init__(self, rows: AhbRows):
+        (self.anwendungshandbuch,) = rows[Anwendungshandbuch]
+        self.anwendungsfaelle = rows[Anwendungsfall]
+        self.tree = _HierarchyTree(
+            root_key="anwendungsfall_primary_key",
+            segment_groups=rows[SegmentGroup],
+            segment_group_links=rows[SegmentGroupLink],
+            segments=rows[Segment],
+            data_element_groups=rows[DataElementGroup],
+            data_elements=rows[DataElement],
+            codes=rows[Code],
+        )
+        self.rows: list[_Row] = []
+
+    def _add_child(self, parent: _Row, node: _Row, node_type: str, id_path_part: str | None, **columns: Any) -> _Row:
+        """adds a row for node below the parent row; all columns that are not given are inherited from the parent"""
+        row = {
+            **parent,
+            "current_id": node["primary_key"].hex,
+            "parent_id": parent["current_id"],
+            "depth": parent["depth"] + 1,
+            "position": node["position"],
+            "digest": node["digest"],
+            "path": _join(parent["path"], " > ", node["name"]),
+            "parent_path": parent["path"],
+            "type": node_type,
+            "sort_path": _join(parent["sort_path"], f"{node['position']:05d}-"),
+            "id_path": _join(parent["id_path"], id_path_part),
+            **columns,
+        }
+        self.rows.append(row)
+        return row
+
+    def _add_segment_group_children(self, parent: _Row, primary_key: uuid.UUID) -> None:
+        child_segment_groups = self.tree.child_segment_groups.get(primary_key, [])
+        segments = self.tree.segments.get(primary_key, [])
+        ambiguous_segment_group_ids = _ids_with_siblings(child_segment_groups)
+        ambiguous_segment_ids = _ids_with_siblings(segments)
+        children = [
+            *(("segment_group", node) for node in child_segment_groups),
+            *(("segment", node) for node in segments),
+        ]
+        for node_type, node in sorted(children, key=lambda child: child[1]["position"]):
+            if node_type == "segment_group":
+                row = self._add_child(
+                    parent,
+                    node,
+                    "segment_group",
+                    id_path_part(
+                        node["id"],
+                        self.tree.segment_group_qualifier(node) if node["id"] in ambiguous_segment_group_ids else None,
+                        node["id"] in ambiguous_segment_group_ids,
+                    ),
+                    segmentgroup_id=node["id"],
+                    segmentgroup_name=node["name"],
+                    segmentgroup_ahb_status=node["ahb_status"],
+                    segmentgroup_position=node["position"],
+                    segmentgroup_anwendungsfall_primary_key=_to_sqlite(node["anwendungsfall_primary_key"]),
+                )
+                self._add_segment_group_children(row, node["primary_key"])
+            else:
+                row = self._add_child(
+                    parent,
+                    node,
+                    "segment",
+                    id_path_part(
+                        node["id"],
+                        self.tree.segment_qualifier(node) if node["id"] in ambiguous_segment_ids else None,
+                        node["id"] in ambiguous_segment_ids,
+                    ),
+                    is_on_uebertragungsdatei_level=node["is_on_uebertragungsdatei_level"],
+                    segment_id=node["id"],
+                    segment_name=node["name"],
+                    segment_number=node["number"],
+                    segment_ahb_status=node["ahb_status"],
+                    segment_position=node["position"],
+                )
+                self._add_segment_children(row, node["primary_key"])
+
+    def _add_segment_children(self, parent: _Row, primary_key: uuid.UUID) -> None:
+        data_element_groups = self.tree.data_element_groups.get(primary_key, [])
+        data_elements = self.tree.bare_data_elements.get(primary_key, [])
+        ambiguous_data_element_ids = _ids_with_siblings(data_elements)
+        children = [
+            *(("dataelementgroup", node) for node in data_element_groups),
+            *(("dataelement", node) for node in data_elements),
+        ]
+        for node_type, node in sorted(children, key=lambda child: child[1]["position"]):
+            if node_type == "dataelementgroup":
+                row = self._add_child(
+                    parent,
+                    node,
+                    "dataelementgroup",
+                    f"{node['id']}>",
+                    dataelementgroup_id=node["id"],
+                    dataelementgroup_name=node["name"],
+                    dataelementgroup_position=node["position"],
+                )
+                self._add_data_elements(row, self.tree.grouped_data_elements.get(node["primary_key"], []))
+            else:
+                self._add_data_element(parent, node, node["id"] in ambiguous_data_element_ids)
+
+    def _add_data_elements(self, parent: _Row, data_elements: list[_Row]) -> None:
+        ambiguous_data_element_ids = _ids_with_siblings(data_elements)
+        for node in data_elements:
+            self._add_data_element(parent, node, node["id"] in ambiguous_data_element_ids)
+
+    def _add_data_element(self, parent: _Row, node: _Row, needs_qualifier: bool) -> None:
+        row = self._add_child(
+            parent,
+            node,
+            "dataelement",
+            id_path_part(node["id"], self.tree.data_element_qualifier(node), needs_qualifier),
+            dataelement_id=node["id"],
+            dataelement_name=node["name"],
+            dataelement_position=node["position"],
+            dataelement_ahb_status=node["ahb_status"],
+        )
+        for code in self.tree.codes.get(node["primary_key"], []):
+            self._add_child(
+                row,
+                code,
+                "code",
+                _join(code["value"], ">"),
+                code_id=code["primary_key"].hex,
+                code_name=code["name"],
+                code_description=code["description"],
+                code_value=code["value"],
+                code_ahb_status=code["ahb_status"],
+                code_position=code["position"],
+            )
+
+    def add_anwendungsfall(self, anwendungsfall: _Row) -> None:
+        """adds the rows of all segment groups, segments, data element (group)s and codes of the Anwendungsfall"""
+        anwendungshandbuch = self.anwendungshandbuch
+        primary_key = anwendungsfall["primary_key"]
+        segment_groups = self.tree.root_segment_groups.get(primary_key, [])
+        segments = self.tree.root_segments.get(primary_key, [])
+        ambiguous_segment_group_ids = _ids_with_siblings(segment_groups)
+        ambiguous_segment_ids = _ids_with_siblings(segments)
+        metadata = {
+            "anwendungsfall_pk": primary_key.hex,
+            "pruefidentifikator": anwendungsfall["pruefidentifikator"],
+            "format": _to_sqlite(anwendungsfall["format"]),
+            "versionsnummer": anwendungshandbuch["versionsnummer"],
+            "gueltig_von": _to_sqlite(anwendungshandbuch["gueltig_von"]),
+            "gueltig_bis": _to_sqlite(anwendungshandbuch["gueltig_bis"]),
+            "beschreibung": anwendungsfall["beschreibung"],
+            "kommunikationsrichtungen": (
+                json.dumps(anwendungsfall["kommunikationsrichtungen"])
+                if anwendungsfall["kommunikationsrichtungen"] is not None
+                else None
+            ),
+            "edifact_format_version": _to_sqlite(anwendungshandbuch["edifact_format_version"]),
+            "anwendungshandbuch_primary_key": anwendungshandbuch["primary_key"].hex,
+        }
+        roots = [*(("segment_group", node) for node in segment_groups), *(("segment", node) for node in segments)]
+        for root_order, (node_type, node) in enumerate(sorted(roots, key=lambda root: root[1]["position"]), start=1):
+            is_segment_group = node_type == "segment_group"
+            ambiguous_ids = ambiguous_segment_group_ids if is_segment_group else ambiguous_segment_ids
+            qualifier: str | None = None
+            if node["id"] in ambiguous_ids:
+                qualifier = (
+                    self.tree.segment_group_qualifier(node) if is_segment_group else self.tree.segment_qualifier(node)
+                )
+            row = {column: None for column in _COLUMNS} | metadata
+            row |= {
+                "current_id": node["primary_key"].hex,
+                "root_id": node["primary_key"].hex,
+                "depth": 0,
+                "position": node["position"],
+                "digest": node["digest"],
+                "path": node["name"],
+                "parent_path": node["name"],
+                "root_order": root_order,
+                "type": node_type,
+                "source_id": node["primary_key"].hex,
+                "sort_path": f"{node['position']:05d}-",
+                "id_path": id_path_part(node["id"], qualifier, node["id"] in ambiguous_ids),
+            }
+            if is_segment_group:
+                row |= {
+                    "segmentgroup_id": node["id"],
+                    "segmentgroup_name": node["name"],
+                    "segmentgroup_ahb_status": node["ahb_status"],
+                    "segmentgroup_position": node["position"],
+                    "segmentgroup_anwendungsfall_primary_key": _to_sqlite(node["anwendungsfall_primary_key"]),
+                }
+                self.rows.append(row)
+                self._add_segment_group_children(row, node["primary_key"])
+            else:
+                row |= {
+                    "is_on_uebertragungsdatei_level": node["is_on_uebertragungsdatei_level"],
+                    "segment_id": node["id"],
+                    "segment_name": node["name"],
+                    "segment_number": node["number"],
+                    "segment_ahb_status": node["ahb_status"],
+                    "segment_position": node["position"],
+                }
+                self.rows.append(row)
+                self._add_segment_children(row, node["primary_key"])
+
+
+_LINE_NAME_COLUMNS = ("code_name", "dataelement_name", "dataelementgroup_name", "segment_name", "segmentgroup_name")
+_LINE_AHB_STATUS_COLUMNS = (
+    "code_ahb_status",
+    "dataelement_ahb_status",
+    "segment_ahb_status",
+    "segmentgroup_ahb_status",
+)
+
+
+def ahb_rows_to_hierarchy_rows(ahbs_as_rows: Iterable[AhbRows]) -> list[tuple[Any, ...]]:
+    """
+    computes the rows of ahb_hierarchy_materialized from the raw rows of the AHBs (see ahb_to_rows), ordered like
+    materialize_ahb_view.sql orders them (by Anwendungsfall primary key and sort_path).
+    Each row is a tuple of the values (as SQLite stores them) in the order of the table columns.
+    """
+    rows_per_anwendungsfall: dict[str, list[_Row]] = {}
+    for ahb_rows in ahbs_as_rows:
+        flattener = _Flattener(ahb_rows)
+        for anwendungsfall in flattener.anwendungsfaelle:
+            first_row_index = len(flattener.rows)
+            flattener.add_anwendungsfall(anwendungsfall)
+            rows_per_anwendungsfall[anwendungsfall["primary_key"].hex] = flattener.rows[first_row_index:]
+    inherited_columns = _COLUMNS[1:-2]  # all but id, line_name and line_ahb_status
+    return [
+        (
+            uuid.uuid4().hex.upper(),  # like hex(randomblob(16))
+            *(row[column] for column in inherited_columns),
+            _trim(_coalesce(row, _LINE_NAME_COLUMNS)),
+            _trim(_coalesce(row, _LINE_AHB_STATUS_COLUMNS)),
+        )
+        for anwendungsfall_primary_key in sorted(rows_per_anwendungsfall)
+        for row in rows_per_anwendungsfall[anwendungsfall_primary_key]
+    ]
+
+
+def insert_hierarchy_rows(connection: Connection, hierarchy_rows: list[tuple[Any, ...]]) -> None:
+    """
+    inserts the rows (see ahb_rows_to_hierarchy_rows) into the (existing) table ahb_hierarchy_materialized.
+    The caller is responsible for committing.
+    """
+    if hierarchy_rows:
+        connection.exec_driver_sql(_INSERT_STATEMENT, hierarchy_rows)
+
+
+__all__ = ["ahb_rows_to_hierarchy_rows", "insert_hierarchy_rows"]
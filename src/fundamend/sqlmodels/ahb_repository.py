@@ -0,0 +1,275 @@
+"""
+A read-only query facade over a database that has been created by create_db_and_populate_with_ahb_view (and optionally
+create_and_fill_ahb_expression_table, create_ahbtabellen_view and the diff views), e.g. for web servers that serve AHB
+data to a frontend.
+Instead of opening a new connection (and session) per request, an AhbRepository keeps a pool of read-only connections.
+The AsyncAhbRepository offers the same queries as coroutines, e.g. for asyncio based web frameworks.
+"""
+
+import asyncio
+import sqlite3
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from types import TracebackType
+from urllib.parse import quote
+
+from efoli import EdifactFormat, EdifactFormatVersion
+
+try:
+    import sqlalchemy
+    from sqlalchemy.pool import QueuePool
+    from sqlmodel import Session, col, create_engine, select
+except ImportError as import_error:
+    import_error.msg += "; Did you install fundamend[sqlmodels] or did you try to import from fundamend.models instead?"
+    # sqlmodel is only an optional dependency when fundamend is used to fill a database
+    raise
+
+from fundamend.sqlmodels.ahb_formatversion_diff_view import AhbFormatversionDiffLine
+from fundamend.sqlmodels.ahb_pruefi_diff_view import AhbPruefiDiffLine
+from fundamend.sqlmodels.ahbtabellen_view import AhbTabellenLine
+from fundamend.sqlmodels.ahbview import AhbHierarchyMaterialized
+
+_NODE_TEXTS_STATEMENT = sqlalchemy.text(
+    "SELECT node_texts FROM ahb_expressions"
+    " WHERE edifact_format_version = :edifact_format_version AND format = :format AND expression = :expression"
+)
+
+
+class AhbRepository:
+    """
+    Typed, thread-safe, read-only queries against an AHB database file.
+    The file is opened as immutable SQLite URI (no locking, no change detection), so it must not be modified while the
+    repository is in use. Each thread checks out its own connection from a pool of (at most pool_size + max_overflow)
+    connections; every connection caches its prepared statements and memory-maps (up to mmap_size bytes of) the file,
+    so that the pages are shared between all connections via the OS page cache.
+    """
+
+    # pylint:disable=too-many-arguments
+    def __init__(
+        self,
+        sqlite_path: Path,
+        *,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        mmap_size: int = 256 * 1024 * 1024,
+        cached_statements: int = 256,
+    ):
+        if not sqlite_path.is_file():
+            raise FileNotFoundError(f"The database {sqlite_path} does not exist")
+        uri = f"file:{quote(str(sqlite_path.resolve()))}?mode=ro&immutable=1"
+
+        def _connect() -> sqlite3.Connection:
+            # the pool makes sure that a connection is only used by one thread at a time
+            connection = sqlite3.connect(uri, uri=True, check_same_thread=False, cached_statements=cached_statements)
+            connection.execute(f"PRAGMA mmap_size = {int(mmap_size)}")
+            connection.execute("PRAGMA query_only = ON")
+            return connection
+
+        self._engine = create_engine(
+            "sqlite://", creator=_connect, poolclass=QueuePool, pool_size=pool_size, max_overflow=max_overflow
+        )
+
+    @contextmanager
+    def _session(self) -> Iterator[Session]:
+        with Session(bind=self._engine) as session:
+            yield session
+
+    def get_ahb_lines(
+        self, pruefidentifikator: str, edifact_format_version: EdifactFormatVersion
+    ) -> list[AhbHierarchyMaterialized]:
+        """returns all rows of ahb_hierarchy_materialized of the Prüfidentifikator in the format version, in order"""
+        statement = (
+            select(AhbHierarchyMaterialized)
+            .where(AhbHierarchyMaterialized.pruefidentifikator == pruefidentifikator)
+            .where(AhbHierarchyMaterialized.edifact_format_version == edifact_format_version)
+            .order_by(col(AhbHierarchyMaterialized.sort_path))
+        )
+        with self._session() as session:
+            return list(session.exec(statement).all())
+
+    def get_ahbtabellen_lines(
+        self, pruefidentifikator: str, edifact_format_version: EdifactFormatVersion
+    ) -> list[AhbTabellenLine]:
+        """returns all rows of v_ahbtabellen of the Prüfidentifikator in the format version, in order"""
+        statement = (
+            select(AhbTabellenLine)
+            .where(AhbTabellenLine.pruefidentifikator == pruefidentifikator)
+            .where(AhbTabellenLine.format_version == edifact_format_version)
+            .order_by(col(AhbTabellenLine.sort_path))
+        )
+        with self._session() as session:
+            return list(session.exec(statement).all())
+
+    def get_node_texts(
+        self, expression: str, edifact_format: EdifactFormat, edifact_format_version: EdifactFormatVersion
+    ) -> str | None:
+        """
+        returns the human-readable texts of the conditions in the expression (see ahb_expressions), e.g.
+        '[1] Wenn Aufteilung vorhanden' or None if the expression is unknown (in this format and format version)
+        """
+        with self._engine.connect() as connection:
+            return connection.execute(
+                _NODE_TEXTS_STATEMENT,
+                {
+                    "edifact_format_version": edifact_format_version.name,
+                    "format": edifact_format.name,
+                    "expression": expression,
+                },
+            ).scalar_one_or_none()
+
+    def get_formatversion_diff(
+        self,
+        pruefidentifikator: str,
+        old_format_version: EdifactFormatVersion,
+        new_format_version: EdifactFormatVersion,
+        include_unchanged: bool = True,
+    ) -> list[AhbFormatversionDiffLine]:
+        """compares the Prüfidentifikator between two format versions (see v_ahb_formatversion_diff)"""
+        statement = (
+            select(AhbFormatversionDiffLine)
+            .where(AhbFormatversionDiffLine.old_format_version == old_format_version)
+            .where(AhbFormatversionDiffLine.new_format_version == new_format_version)
+            .where(AhbFormatversionDiffLine.old_pruefidentifikator == pruefidentifikator)
+            .where(AhbFormatversionDiffLine.new_pruefidentifikator == pruefidentifikator)
+            .order_by(col(AhbFormatversionDiffLine.sort_path))
+        )
+        if not include_unchanged:
+            statement = statement.where(AhbFormatversionDiffLine.diff_status != "unchanged")
+        with self._session() as session:
+            return list(session.exec(statement).all())
+
+    def get_pruefi_diff(
+        self,
+        edifact_format_version: EdifactFormatVersion,
+        old_pruefidentifikator: str,
+        new_pruefidentifikator: str,
+        include_unchanged: bool = True,
+    ) -> list[AhbPruefiDiffLine]:
+        """compares two Prüfidentifikatoren within the same format version (see v_ahb_pruefi_diff)"""
+        statement = (
+            select(AhbPruefiDiffLine)
+            .where(AhbPruefiDiffLine.old_format_version == edifact_format_version)
+            .where(AhbPruefiDiffLine.new_format_version == edifact_format_version)
+            .where(AhbPruefiDiffLine.old_pruefidentifikator == old_pruefidentifikator)
+            .where(AhbPruefiDiffLine.new_pruefidentifikator == new_pruefidentifikator)
+            .order_by(col(AhbPruefiDiffLine.sort_path))
+        )
+        if not include_unchanged:
+            statement = statement.where(AhbPruefiDiffLine.diff_status != "unchanged")
+        with self._session() as session:
+            return list(session.exec(statement).all())
+
+    def close(self) -> None:
+        """closes all pooled connections"""
+        self._engine.dispose()
+
+    def __enter__(self) -> "AhbRepository":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+
+class AsyncAhbRepository:
+    """
+    The same queries as AhbRepository (with the same arguments), but awaitable.
+    Each query runs on a pooled connection in a worker thread (asyncio.to_thread), so the event loop is never blocked
+    by SQLite. Because the database file is read-only and every thread uses its own connection, concurrent queries are
+    fine.
+    """
+
+    # pylint:disable=too-many-arguments
+    def __init__(
+        self,
+        sqlite_path: Path,
+        *,
+        pool_size: int = 5,
+        max_overflow: int = 10,
+        mmap_size: int = 256 * 1024 * 1024,
+        cached_statements: int = 256,
+    ):
+        self._repository = AhbRepository(
+            sqlite_path,
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            mmap_size=mmap_size,
+            cached_statements=cached_statements,
+        )
+
+    async def get_ahb_lines(
+        self, pruefidentifikator: str, edifact_format_version: EdifactFormatVersion
+    ) -> list[AhbHierarchyMaterialized]:
+        """see AhbRepository.get_ahb_lines"""
+        return await asyncio.to_thread(self._repository.get_ahb_lines, pruefidentifikator, edifact_format_version)
+
+    async def get_ahbtabellen_lines(
+        self, pruefidentifikator: str, edifact_format_version: EdifactFormatVersion
+    ) -> list[AhbTabellenLine]:
+        """see AhbRepository.get_ahbtabellen_lines"""
+        return await asyncio.to_thread(
+            self._repository.get_ahbtabellen_lines, pruefidentifikator, edifact_format_version
+        )
+
+    async def get_node_texts(
+        self, expression: str, edifact_format: EdifactFormat, edifact_format_version: EdifactFormatVersion
+    ) -> str | None:
+        """see AhbRepository.get_node_texts"""
+        return await asyncio.to_thread(
+            self._repository.get_node_texts, expression, edifact_format, edifact_format_version
+        )
+
+    async def get_formatversion_diff(
+        self,
+        pruefidentifikator: str,
+        old_format_version: EdifactFormatVersion,
+        new_format_version: EdifactFormatVersion,
+        include_unchanged: bool = True,
+    ) -> list[AhbFormatversionDiffLine]:
+        """see AhbRepository.get_formatversion_diff"""
+        return await asyncio.to_thread(
+            self._repository.get_formatversion_diff,
+            pruefidentifikator,
+            old_format_version,
+            new_format_version,
+            include_unchanged,
+        )
+
+    async def get_pruefi_diff(
+        self,
+        edifact_format_version: EdifactFormatVersion,
+        old_pruefidentifikator: str,
+        new_pruefidentifikator: str,
+        include_unchanged: bool = True,
+    ) -> list[AhbPruefiDiffLine]:
+        """see AhbRepository.get_pruefi_diff"""
+        return await asyncio.to_thread(
+            self._repository.get_pruefi_diff,
+            edifact_format_version,
+            old_pruefidentifikator,
+            new_pruefidentifikator,
+            include_unchanged,
+        )
+
+    async def close(self) -> None:
+        """closes all pooled connections"""
+        await asyncio.to_thread(self._repository.close)
+
+    async def __aenter__(self) -> "AsyncAhbRepository":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+
+__all__ = ["AhbRepository", "AsyncAhbRepository"]
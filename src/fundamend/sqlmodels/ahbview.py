@@ -13,7 +13,7 @@ from typing import Literal
 from uuid import UUID
 
 import sqlalchemy
-from efoli import EdifactFormatVersion, get_edifact_format_version
+from efoli import EdifactFormat, EdifactFormatVersion, get_edifact_format_version
 from pydantic import BaseModel
 from sqlalchemy import JSON, Column
 from sqlalchemy.sql.elements import TextClause
@@ -28,31 +28,55 @@ except ImportError as import_error:
 
 from fundamend import AhbReader
 from fundamend import Anwendungshandbuch as PydanticAnwendungshandbuch
+from fundamend.instrumentation import _measure_stage
+from fundamend.sqlmodels.ahb_bulk_insert import AhbRows, ahb_to_rows, bulk_insert_ahb_rows
+from fundamend.sqlmodels.ahb_materializer import ahb_rows_to_hierarchy_rows, insert_hierarchy_rows
 from fundamend.sqlmodels.anwendungshandbuch import (
     Anwendungsfall,
+    Bedingung,
     Code,
     DataElement,
     DataElementGroup,
+    Paket,
     Segment,
     SegmentGroup,
     SegmentGroupLink,
+    UbBedingung,
 )
 from fundamend.sqlmodels.anwendungshandbuch import Anwendungshandbuch as SqlAnwendungshandbuch
-from fundamend.sqlmodels.internals import _execute_bare_sql
+from fundamend.sqlmodels.internals import _execute_bare_sql, _map, _vacuum
 
 _logger = logging.getLogger(__name__)
 
 
-def create_ahb_view(session: Session) -> None:
+def create_ahb_view(session: Session, ahbs_as_rows: Iterable[AhbRows] | None = None) -> None:
     """
     Create a materialized view for the Anwendungshandbücher using a SQLAlchemy session.
+    By default, the hierarchy is derived from the raw tables by materialize_ahb_view.sql. If the raw rows (see
+    ahb_to_rows) of all AHBs in the database are provided, the hierarchy is computed from them in Python in a single
+    pass instead (see ahb_materializer.py), which is faster; the resulting table is the same.
     Warning: This is only tested for SQLite!
     """
-    _execute_bare_sql(session=session, path_to_sql_commands=Path(__file__).parent / "materialize_ahb_view.sql")
+    with _measure_stage("materialize_ahb_view") as stage:
+        if ahbs_as_rows is None:
+            _execute_bare_sql(session=session, path_to_sql_commands=Path(__file__).parent / "materialize_ahb_view.sql")
+        else:
+            _execute_bare_sql(
+                session=session, path_to_sql_commands=Path(__file__).parent / "create_ahb_hierarchy_materialized.sql"
+            )
+            with _measure_stage("insert", AhbHierarchyMaterialized.__tablename__) as insert_stage:
+                hierarchy_rows = ahb_rows_to_hierarchy_rows(ahbs_as_rows)
+                insert_hierarchy_rows(session.connection(), hierarchy_rows)
+                insert_stage.rows = len(hierarchy_rows)
+            session.commit()
+        _execute_bare_sql(
+            session=session, path_to_sql_commands=Path(__file__).parent / "index_ahb_hierarchy_materialized.sql"
+        )
 
-    number_of_inserted_rows = session.scalar(
-        select(func.count(AhbHierarchyMaterialized.id))  # type: ignore[arg-type] # pylint:disable=not-callable #
-    )
+        number_of_inserted_rows = session.scalar(
+            select(func.count(AhbHierarchyMaterialized.id))  # type: ignore[arg-type] # pylint:disable=not-callable #
+        )
+        stage.rows = number_of_inserted_rows
     _logger.info(
         "Inserted %d rows into the materialized view %s",
         number_of_inserted_rows,
@@ -115,15 +139,91 @@ _after_bulk_insert_ops: list[TextClause] = [
 ]
 
 
+_AhbFile = Path | tuple[Path, date, date | None] | tuple[Path, Literal[None], Literal[None]]
+
+
+def _read_ahb(item: _AhbFile) -> tuple[PydanticAnwendungshandbuch, date | None, date | None]:
+    """
+    reads a single AHB file, removes outdated AWFs and AWFs without pruefidentifikator and returns it together with its
+    gueltig_von and gueltig_bis date.
+    """
+    ahb: PydanticAnwendungshandbuch
+    gueltig_von: date | None
+    gueltig_bis: date | None
+    if isinstance(item, Path):
+        ahb = AhbReader(item).read()
+        gueltig_von = None
+        gueltig_bis = None
+    elif isinstance(item, tuple):
+        ahb = AhbReader(item[0]).read()
+        gueltig_von = item[1]
+        gueltig_bis = item[2]
+    else:
+        raise ValueError(f"Invalid item type in ahb_files: {type(item)}")
+    ahb_contains_bad_awfs = any(awf for awf in ahb.anwendungsfaelle if awf.is_outdated or not awf.pruefidentifikator)
+    if ahb_contains_bad_awfs:
+        ahb = ahb.model_copy(
+            update={
+                "anwendungsfaelle": tuple(
+                    awf for awf in ahb.anwendungsfaelle if awf.pruefidentifikator and not awf.is_outdated
+                )
+            }
+        )
+        _logger.warning("Removed some AWFs from AHB with version %s before adding to DB", ahb.versionsnummer)
+    return ahb, gueltig_von, gueltig_bis
+
+
+def _read_and_convert_ahb(item: _AhbFile) -> SqlAnwendungshandbuch:
+    """
+    reads a single AHB file and converts it to a (not yet persisted) SqlAnwendungshandbuch.
+    This is a module level function, so that it can be pickled and executed in a worker process.
+    """
+    ahb, gueltig_von, gueltig_bis = _read_ahb(item)
+    with _measure_stage("orm_conversion", ahb.versionsnummer):
+        sql_ahb = SqlAnwendungshandbuch.from_model(ahb)
+    sql_ahb.gueltig_von = gueltig_von
+    sql_ahb.gueltig_bis = gueltig_bis
+    if sql_ahb.gueltig_von is not None:
+        sql_ahb.edifact_format_version = get_edifact_format_version(sql_ahb.gueltig_von)
+    return sql_ahb
+
+
+def _read_and_convert_ahb_to_rows(item: _AhbFile) -> AhbRows:
+    """
+    reads a single AHB file and converts it to plain rows for the bulk insert (see ahb_to_rows).
+    This is a module level function, so that it can be pickled and executed in a worker process.
+    """
+    ahb, gueltig_von, gueltig_bis = _read_ahb(item)
+    with _measure_stage("orm_conversion", ahb.versionsnummer):
+        return ahb_to_rows(ahb, gueltig_von, gueltig_bis)
+
+
+_TABLES_KEPT_ON_DROP: tuple[type[SQLModel], ...] = (Bedingung, UbBedingung, Paket)
+"""the raw tables that create_db_and_populate_with_ahb_view does not drop (they're needed for the ahb_expressions)"""
+
+
 def create_db_and_populate_with_ahb_view(
-    ahb_files: Iterable[Path | tuple[Path, date, date | None] | tuple[Path, Literal[None], Literal[None]]],
+    ahb_files: Iterable[_AhbFile],
     drop_raw_tables: bool = False,
+    max_workers: int | None = 1,
+    use_bulk_insert: bool = False,
+    use_python_materializer: bool = False,
 ) -> Path:
     """
     Creates a SQLite database as temporary file, populates it with the AHBs provided and the materializes the AHB view.
     You may provide either paths to the AHB.xml files or tuples where each Path comes with a gueltig_von and gueltig_bis
     date.
     Optionally deletes the original tables to have a smaller db file (only if the prüfis are unique across all AHBs).
+    By default, the AHB files are read and converted one after another in the calling process. If max_workers is not 1,
+    this is done in a process pool with max_workers processes (None means: as many as there are CPUs); only inserting
+    into the database happens in the calling process. The result is the same (the order of ahb_files is preserved).
+    If use_bulk_insert is True, the raw tables are filled with plain executemany INSERTs instead of the ORM (faster,
+    same table contents, see ahb_bulk_insert.py).
+    If use_python_materializer is True, the AHB view is computed in Python from the raw rows instead of by
+    materialize_ahb_view.sql (faster, same result, see ahb_materializer.py); this implies use_bulk_insert.
+    If both use_python_materializer and drop_raw_tables are True, the raw tables are not even filled; only the
+    Bedingungen, Pakete and UB-Bedingungen (which the ahb_expressions table needs) are written besides the AHB view.
+    If drop_raw_tables is True, the database file is compacted (VACUUM) at the end.
     Returns the path to the temporary database file.
     The calling code should move the file to a permanent location if needed.
     """
@@ -138,55 +238,50 @@ def create_db_and_populate_with_ahb_view(
         for _op in _before_bulk_insert_ops:
             conn.execute(_op)
         conn.commit()
-    with Session(bind=engine) as session:
-        sql_ahbs: list[SqlAnwendungshandbuch] = []
-        for item in ahb_files:
-            ahb: PydanticAnwendungshandbuch
-            gueltig_von: date | None
-            gueltig_bis: date | None
-            if isinstance(item, Path):
-                ahb = AhbReader(item).read()
-                gueltig_von = None
-                gueltig_bis = None
-            elif isinstance(item, tuple):
-                ahb = AhbReader(item[0]).read()
-                gueltig_von = item[1]
-                gueltig_bis = item[2]
-            else:
-                raise ValueError(f"Invalid item type in ahb_files: {type(item)}")
-            ahb_contains_bad_awfs = any(
-                awf for awf in ahb.anwendungsfaelle if awf.is_outdated or not awf.pruefidentifikator
-            )
-            if ahb_contains_bad_awfs:
-                ahb = ahb.model_copy(
-                    update={
-                        "anwendungsfaelle": tuple(
-                            awf for awf in ahb.anwendungsfaelle if awf.pruefidentifikator and not awf.is_outdated
-                        )
-                    }
-                )
-                _logger.warning("Removed some AWFs from AHB with version %s before adding to DB", ahb.versionsnummer)
-            sql_ahb = SqlAnwendungshandbuch.from_model(ahb)
-            sql_ahb.gueltig_von = gueltig_von
-            sql_ahb.gueltig_bis = gueltig_bis
-            if sql_ahb.gueltig_von is not None:
-                sql_ahb.edifact_format_version = get_edifact_format_version(sql_ahb.gueltig_von)
-            sql_ahbs.append(sql_ahb)
+    ahbs_as_rows: list[AhbRows] | None = None
+    if use_bulk_insert or use_python_materializer:
+        ahbs_as_rows = _map(_read_and_convert_ahb_to_rows, ahb_files, max_workers)
+        with engine.connect() as conn:
+            for ahb_rows in ahbs_as_rows:
+                (ahb_row,) = ahb_rows[SqlAnwendungshandbuch]
+                pruefis_added += [
+                    _PruefiValidity(
+                        pruefidentifikator=awf_row["pruefidentifikator"],
+                        gueltig_bis=ahb_row["gueltig_bis"],
+                        gueltig_von=ahb_row["gueltig_von"],
+                    )
+                    for awf_row in ahb_rows[Anwendungsfall]
+                ]
+                rows_to_insert = ahb_rows
+                if use_python_materializer and drop_raw_tables:
+                    # the other raw rows would be deleted right after materializing the view anyway
+                    rows_to_insert = {table: ahb_rows[table] for table in _TABLES_KEPT_ON_DROP if table in ahb_rows}
+                with _measure_stage("insert", f"AHB {ahb_row['versionsnummer']}") as stage:
+                    bulk_insert_ahb_rows(conn, rows_to_insert)
+                    stage.rows = sum(len(rows) for rows in rows_to_insert.values())
+            conn.commit()
+    else:
+        sql_ahbs: list[SqlAnwendungshandbuch] = _map(_read_and_convert_ahb, ahb_files, max_workers)
+        for sql_ahb in sql_ahbs:
             pruefis_added += [
                 _PruefiValidity(
-                    pruefidentifikator=af.pruefidentifikator, gueltig_bis=gueltig_bis, gueltig_von=gueltig_von
+                    pruefidentifikator=af.pruefidentifikator,
+                    gueltig_bis=sql_ahb.gueltig_bis,
+                    gueltig_von=sql_ahb.gueltig_von,
                 )
                 for af in sql_ahb.anwendungsfaelle
             ]
-        session.add_all(sql_ahbs)
-        session.commit()
+        with Session(bind=engine) as session, _measure_stage("insert", "AHBs") as stage:
+            session.add_all(sql_ahbs)
+            stage.rows = len(session.new)  # including all cascaded children
+            session.commit()
     with engine.connect() as conn:
         for _op in _after_bulk_insert_ops:
             conn.execute(_op)
         conn.commit()
     # reopen a new connection/session after aggressive bulk insert to avoid side effects of PRAGMA (re)settings
     with Session(bind=engine) as session:
-        create_ahb_view(session)
+        create_ahb_view(session, ahbs_as_rows if use_python_materializer else None)
         if drop_raw_tables:
             _check_for_no_overlaps(pruefis_added)
             for model_class in [
@@ -202,9 +297,137 @@ def create_db_and_populate_with_ahb_view(
                 session.execute(sqlalchemy.text(f"DROP TABLE IF EXISTS {model_class.__tablename__};"))
                 _logger.debug("Dropped %s", model_class.__tablename__)
         session.commit()
+    if drop_raw_tables:
+        _vacuum(engine)
+    engine.dispose()
     return sqlite_path
 
 
+def _materialize_single_ahb(ahb_rows: AhbRows, scratch_path: Path) -> None:
+    """
+    fills a new scratch database at scratch_path with the raw rows of a single AHB and materializes its AHB view there.
+    The materialization depends only on the rows of the respective AHB, so the result can be copied as-is.
+    """
+    scratch_engine = create_engine(f"sqlite:///{scratch_path}")
+    SQLModel.metadata.create_all(scratch_engine)
+    with scratch_engine.connect() as conn:
+        bulk_insert_ahb_rows(conn, ahb_rows)
+        conn.commit()
+    with Session(bind=scratch_engine) as session:
+        create_ahb_view(session)
+    scratch_engine.dispose()
+
+
+def add_or_replace_ahb(sqlite_path: Path, ahb_file: _AhbFile) -> UUID:
+    """
+    Adds a single AHB to an existing database (created by create_db_and_populate_with_ahb_view without dropping the raw
+    tables) instead of rebuilding the entire database, e.g. when the BDEW publishes a corrected AHB.
+    Existing AHBs that share at least one Prüfidentifikator with an overlapping validity period with the new AHB are
+    replaced, i.e. deleted before the new AHB is inserted.
+    Only the rows of the added and replaced AHBs in ahb_hierarchy_materialized are (re-)materialized. If the
+    ahb_expressions table exists, the expressions of the affected format versions and formats are re-created as well.
+    Returns the primary key of the added AHB.
+    """
+    ahb_rows = _read_and_convert_ahb_to_rows(ahb_file)
+    (ahb_row,) = ahb_rows[SqlAnwendungshandbuch]
+    new_validity_per_pruefi = {
+        awf_row["pruefidentifikator"]: _PruefiValidity(
+            pruefidentifikator=awf_row["pruefidentifikator"],
+            gueltig_von=ahb_row["gueltig_von"],
+            gueltig_bis=ahb_row["gueltig_bis"],
+        )
+        for awf_row in ahb_rows[Anwendungsfall]
+    }
+    affected_format_versions_and_formats: set[tuple[EdifactFormatVersion, EdifactFormat]] = {
+        (ahb_row["edifact_format_version"], awf_row["format"])
+        for awf_row in ahb_rows[Anwendungsfall]
+        if ahb_row["edifact_format_version"] is not None
+    }
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    table_names = set(sqlalchemy.inspect(engine).get_table_names())
+    if not {SqlAnwendungshandbuch.__tablename__, AhbHierarchyMaterialized.__tablename__} <= table_names:
+        raise ValueError(
+            f"The database {sqlite_path} contains no AHB view or no raw AHB tables (were they dropped?); rebuild it instead"
+        )
+    with tempfile.TemporaryDirectory() as scratch_directory:
+        scratch_path = Path(scratch_directory) / "scratch.sqlite"
+        # everything that can fail without touching the target database is done first
+        _materialize_single_ahb(ahb_rows, scratch_path)
+        with Session(bind=engine) as session:
+            existing_awfs = session.exec(
+                select(Anwendungsfall.pruefidentifikator, Anwendungsfall.format, SqlAnwendungshandbuch).join(
+                    SqlAnwendungshandbuch,
+                    Anwendungsfall.anwendungshandbuch_primary_key == SqlAnwendungshandbuch.primary_key,  # type: ignore[arg-type]
+                )
+            ).all()
+            replaced_ahbs = {
+                existing_ahb.primary_key: existing_ahb
+                for pruefidentifikator, _, existing_ahb in existing_awfs
+                if pruefidentifikator in new_validity_per_pruefi
+                and new_validity_per_pruefi[pruefidentifikator].overlaps(
+                    _PruefiValidity(
+                        pruefidentifikator=pruefidentifikator,
+                        gueltig_von=existing_ahb.gueltig_von,
+                        gueltig_bis=existing_ahb.gueltig_bis,
+                    )
+                )
+            }
+            affected_format_versions_and_formats |= {
+                (existing_ahb.edifact_format_version, EdifactFormat(edifact_format))
+                for _, edifact_format, existing_ahb in existing_awfs
+                if existing_ahb.primary_key in replaced_ahbs and existing_ahb.edifact_format_version is not None
+            }
+            # ATTACH is not possible inside a transaction, so it has to be the first statement of this session
+            session.execute(
+                sqlalchemy.text("ATTACH DATABASE :scratch_path AS scratch"), {"scratch_path": str(scratch_path)}
+            )
+            for replaced_primary_key, replaced_ahb in replaced_ahbs.items():
+                _logger.info("Replacing AHB %s (%s)", replaced_ahb.versionsnummer, replaced_primary_key)
+                _execute_bare_sql(
+                    session=session,
+                    path_to_sql_commands=Path(__file__).parent / "delete_ahb.sql",
+                    parameters={"anwendungshandbuch_primary_key": replaced_primary_key.hex},
+                    commit=False,
+                )
+            bulk_insert_ahb_rows(session.connection(), ahb_rows)
+            materialized_columns = ", ".join(
+                row[1]
+                for row in session.execute(sqlalchemy.text("PRAGMA scratch.table_info(ahb_hierarchy_materialized)"))
+            )
+            copy_materialized_rows = sqlalchemy.text(
+                f"INSERT INTO main.ahb_hierarchy_materialized ({materialized_columns}) "
+                f"SELECT {materialized_columns} FROM scratch.ahb_hierarchy_materialized"
+            )
+            try:
+                session.execute(copy_materialized_rows)
+            except sqlalchemy.exc.IntegrityError:
+                # same fallback as in _execute_bare_sql during a full rebuild: the unique per AHB indexes become plain ones
+                unique_indexes = session.execute(
+                    sqlalchemy.text(
+                        "SELECT name, sql FROM main.sqlite_master WHERE tbl_name = 'ahb_hierarchy_materialized' "
+                        "AND name LIKE '%_per_ahb' AND sql LIKE '% UNIQUE %'"
+                    )
+                ).all()
+                for index_name, index_sql in unique_indexes:
+                    session.execute(sqlalchemy.text(f"DROP INDEX main.{index_name}"))
+                    session.execute(sqlalchemy.text(index_sql.replace(" UNIQUE ", " ")))
+                session.execute(copy_materialized_rows)
+            session.commit()
+            session.execute(sqlalchemy.text("DETACH DATABASE scratch"))
+            if "ahb_expressions" in table_names and affected_format_versions_and_formats:
+                # the expression table requires the optional ahbicht dependency; it only exists if that's installed
+                from fundamend.sqlmodels.expression_view import (  # noqa: PLC0415
+                    create_and_fill_ahb_expression_table,
+                )
+
+                create_and_fill_ahb_expression_table(
+                    session, format_versions_and_formats=affected_format_versions_and_formats
+                )
+    engine.dispose()
+    new_primary_key: UUID = ahb_row["primary_key"]
+    return new_primary_key
+
+
 class AhbHierarchyMaterialized(SQLModel, table=True):
     """
     A materialized flattened AHB hierarchy containing segment groups, segments, data elements, codes,
@@ -276,5 +499,9 @@ class AhbHierarchyMaterialized(SQLModel, table=True):
     code_ahb_status: str | None = Field(default=None, index=True)
     code_position: int | None = Field(default=None, index=True)
 
+    # the digest of the node (segment group, segment, data element (group) or code) of this row, see
+    # FundamendBaseModel.digest: equal digests mean equal sub-trees (e.g. across Prüfidentifikatoren or format versions)
+    digest: str | None = Field(default=None, index=True)
+
 
-__all__ = ["AhbHierarchyMaterialized", "create_ahb_view", "create_db_and_populate_with_ahb_view"]
+__all__ = ["AhbHierarchyMaterialized", "add_or_replace_ahb", "create_ahb_view", "create_db_and_populate_with_ahb_view"]
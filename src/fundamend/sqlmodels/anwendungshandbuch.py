@@ -46,6 +46,7 @@ class Code(SQLModel, table=True):
     value: str | None = Field(default=None, index=True)  # e.g. 'UTILTS'
     ahb_status: str  #: e.g. 'X' # new for AHB
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     dataelement: Union["DataElement", None] = Relationship(back_populates="codes")
     data_element_primary_key: UUID | None = Field(default=None, foreign_key="dataelement.primary_key")
@@ -58,6 +59,7 @@ class Code(SQLModel, table=True):
             value=model.value,
             ahb_status=model.ahb_status,
             position=position,
+            digest=model.digest,
         )
 
     def to_model(self) -> PydanticCode:
@@ -84,6 +86,7 @@ class DataElement(SQLModel, table=True):
     name: str = Field(index=True)  # e.g. 'Nachrichtentyp-Kennung'
     codes: list[Code] = Relationship(back_populates="dataelement")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
     ahb_status: str | None = None
     dataelementgroup: Union["DataElementGroup", None] = Relationship(back_populates="data_elements")
     data_element_group_primary_key: UUID | None = Field(default=None, foreign_key="dataelementgroup.primary_key")
@@ -102,6 +105,7 @@ class DataElement(SQLModel, table=True):
             ],
             ahb_status=model.ahb_status,
             position=position,
+            digest=model.digest,
         )
         return result
 
@@ -138,6 +142,7 @@ class DataElementGroup(SQLModel, table=True):
     name: str = Field(index=True)  # e.g. 'Dokumenten-/Nachrichtenname'
     data_elements: list[DataElement] = Relationship(back_populates="dataelementgroup")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
     segment: Union["Segment", None] = Relationship(back_populates="data_element_groups")
     segment_primary_key: UUID | None = Field(default=None, foreign_key="segment.primary_key")
 
@@ -147,6 +152,7 @@ class DataElementGroup(SQLModel, table=True):
             id=model.id,
             name=model.name,
             position=position,
+            digest=model.digest,
         )
         for position_index, x in enumerate(model.data_elements):
             de = DataElement.from_model(x, position=position_index)
@@ -188,6 +194,7 @@ class Segment(SQLModel, table=True):
     data_elements: list[DataElement] = Relationship(back_populates="segment")
     data_element_groups: list[DataElementGroup] = Relationship(back_populates="segment")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     segmentgroup: Union["SegmentGroup", None] = Relationship(back_populates="segments")
     segmentgroup_primary_key: UUID | None = Field(default=None, foreign_key="segmentgroup.primary_key")
@@ -203,6 +210,7 @@ class Segment(SQLModel, table=True):
             number=model.number,
             ahb_status=model.ahb_status,
             position=position,
+            digest=model.digest,
             is_on_uebertragungsdatei_level=model.is_on_uebertragungsdatei_level,
         )
         for _position, element in enumerate(model.data_elements):
@@ -263,6 +271,7 @@ class SegmentGroup(SQLModel, table=True):
     ahb_status: str | None  #: e.g. 'Muss'
     segments: list[Segment] = Relationship(back_populates="segmentgroup")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
     # Define self-referential relationship
     segment_groups: list["SegmentGroup"] = Relationship(
         back_populates="parent_segment_group",
@@ -294,6 +303,7 @@ class SegmentGroup(SQLModel, table=True):
             name=model.name,
             ahb_status=model.ahb_status,
             position=position,
+            digest=model.digest,
         )
         for _position, element in enumerate(model.elements):
             if isinstance(element, PydanticSegment):
@@ -354,6 +364,7 @@ class Anwendungsfall(SQLModel, table=True):
     segments: list[Segment] = Relationship(back_populates="anwendungsfall")
     segment_groups: list[SegmentGroup] = Relationship(back_populates="anwendungsfall")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
     anwendungshandbuch: Union["Anwendungshandbuch", None] = Relationship(back_populates="anwendungsfaelle")
     anwendungshandbuch_primary_key: UUID | None = Field(default=None, foreign_key="anwendungshandbuch.primary_key")
 
@@ -370,6 +381,7 @@ class Anwendungsfall(SQLModel, table=True):
             ),
             format=model.format,
             position=position,
+            digest=model.digest,
         )
         for _position, element in enumerate(model.elements):
             if isinstance(element, PydanticSegment):
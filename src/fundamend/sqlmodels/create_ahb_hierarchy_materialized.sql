@@ -0,0 +1,59 @@
+-- This SQLite script creates the (empty) table ahb_hierarchy_materialized for the Python side flattener in
+-- ahb_materializer.py. The columns (and their declared types) are the same as those that the CREATE TABLE ... AS
+-- statement in materialize_ahb_view.sql creates.
+
+DROP TABLE IF EXISTS ahb_hierarchy_materialized;
+
+CREATE TABLE ahb_hierarchy_materialized
+(
+    id,
+    anwendungsfall_pk                       TEXT,
+    current_id                              TEXT,
+    root_id                                 TEXT,
+    parent_id,
+    depth,
+    position                                INT,
+    path                                    TEXT,
+    parent_path                             TEXT,
+    root_order,
+    type,
+    source_id                               TEXT,
+    sort_path,
+    id_path,
+    pruefidentifikator                      TEXT,
+    format                                  TEXT,
+    versionsnummer                          TEXT,
+    gueltig_von                             NUM,
+    gueltig_bis                             NUM,
+    beschreibung                            TEXT,
+    kommunikationsrichtungen                NUM,
+    edifact_format_version                  TEXT,
+    anwendungshandbuch_primary_key          TEXT,
+    is_on_uebertragungsdatei_level,
+    segmentgroup_id,
+    segmentgroup_name,
+    segmentgroup_ahb_status,
+    segmentgroup_position,
+    segmentgroup_anwendungsfall_primary_key,
+    segment_id,
+    segment_name,
+    segment_number,
+    segment_ahb_status,
+    segment_position,
+    dataelementgroup_id,
+    dataelementgroup_name,
+    dataelementgroup_position,
+    dataelement_id,
+    dataelement_name,
+    dataelement_position,
+    dataelement_ahb_status,
+    code_id,
+    code_name,
+    code_description,
+    code_value,
+    code_ahb_status,
+    code_position,
+    digest                                  TEXT,
+    line_name,
+    line_ahb_status
+);
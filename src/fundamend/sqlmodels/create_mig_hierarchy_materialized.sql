@@ -0,0 +1,73 @@
+-- This SQLite script creates the (empty) table mig_hierarchy_materialized for the Python side flattener in
+-- mig_materializer.py. The columns (and their declared types) are the same as those that the CREATE TABLE ... AS
+-- statement in materialize_mig_view.sql creates.
+
+DROP TABLE IF EXISTS mig_hierarchy_materialized;
+
+CREATE TABLE mig_hierarchy_materialized
+(
+    id,
+    mig_pk                                  TEXT,
+    current_id                              TEXT,
+    root_id                                 TEXT,
+    parent_id,
+    depth,
+    position                                INT,
+    path                                    TEXT,
+    parent_path                             TEXT,
+    root_order,
+    type,
+    source_id                               TEXT,
+    sort_path,
+    id_path,
+    format                                  TEXT,
+    versionsnummer                          TEXT,
+    gueltig_von                             NUM,
+    gueltig_bis                             NUM,
+    edifact_format_version                  TEXT,
+    is_on_uebertragungsdatei_level,
+    segmentgroup_id,
+    segmentgroup_name,
+    segmentgroup_status_std,
+    segmentgroup_status_specification,
+    segmentgroup_counter,
+    segmentgroup_level,
+    segmentgroup_max_rep_std,
+    segmentgroup_max_rep_specification,
+    segmentgroup_position,
+    segment_id,
+    segment_name,
+    segment_status_std,
+    segment_status_specification,
+    segment_counter,
+    segment_level,
+    segment_number,
+    segment_max_rep_std,
+    segment_max_rep_specification,
+    segment_example,
+    segment_description,
+    segment_position,
+    dataelementgroup_id,
+    dataelementgroup_name,
+    dataelementgroup_description,
+    dataelementgroup_status_std,
+    dataelementgroup_status_specification,
+    dataelementgroup_position,
+    dataelement_id,
+    dataelement_name,
+    dataelement_description,
+    dataelement_status_std,
+    dataelement_status_specification,
+    dataelement_format_std,
+    dataelement_format_specification,
+    dataelement_position,
+    code_id,
+    code_name,
+    code_description,
+    code_value,
+    code_position,
+    digest                                  TEXT,
+    line_name,
+    line_status_std,
+    line_status_specification
+);
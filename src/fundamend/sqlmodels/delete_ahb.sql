@@ -0,0 +1,63 @@
+-- This SQLite script deletes a single Anwendungshandbuch (given by its primary key) with all its Anwendungsfälle,
+-- segment groups, segments, data element groups, data elements, codes, Bedingungen, UB-Bedingungen and Pakete from the
+-- raw tables as well as its rows from the materialized ahb_hierarchy_materialized table.
+-- There are no ON DELETE CASCADE foreign keys, so we collect the primary keys of all children first (top-down).
+
+DROP TABLE IF EXISTS _deleted_awf;
+CREATE TEMP TABLE _deleted_awf AS
+SELECT primary_key AS pk
+FROM anwendungsfall
+WHERE anwendungshandbuch_primary_key = :anwendungshandbuch_primary_key;
+
+-- segment groups are either directly below an Anwendungsfall or nested (via segmentgrouplink) in other segment groups
+DROP TABLE IF EXISTS _deleted_sg;
+CREATE TEMP TABLE _deleted_sg AS
+WITH RECURSIVE deleted_sg_cte(pk) AS (SELECT primary_key
+                                      FROM segmentgroup
+                                      WHERE anwendungsfall_primary_key IN (SELECT pk FROM _deleted_awf)
+                                      UNION
+                                      SELECT link.child_id
+                                      FROM segmentgrouplink link
+                                               JOIN deleted_sg_cte parent ON link.parent_id = parent.pk)
+SELECT pk
+FROM deleted_sg_cte;
+
+DROP TABLE IF EXISTS _deleted_segment;
+CREATE TEMP TABLE _deleted_segment AS
+SELECT primary_key AS pk
+FROM segment
+WHERE anwendungsfall_primary_key IN (SELECT pk FROM _deleted_awf)
+   OR segmentgroup_primary_key IN (SELECT pk FROM _deleted_sg);
+
+DROP TABLE IF EXISTS _deleted_deg;
+CREATE TEMP TABLE _deleted_deg AS
+SELECT primary_key AS pk
+FROM dataelementgroup
+WHERE segment_primary_key IN (SELECT pk FROM _deleted_segment);
+
+DROP TABLE IF EXISTS _deleted_de;
+CREATE TEMP TABLE _deleted_de AS
+SELECT primary_key AS pk
+FROM dataelement
+WHERE segment_primary_key IN (SELECT pk FROM _deleted_segment)
+   OR data_element_group_primary_key IN (SELECT pk FROM _deleted_deg);
+
+-- bottom-up, so that no foreign key ever points to a deleted row
+DELETE FROM code WHERE data_element_primary_key IN (SELECT pk FROM _deleted_de);
+DELETE FROM dataelement WHERE primary_key IN (SELECT pk FROM _deleted_de);
+DELETE FROM dataelementgroup WHERE primary_key IN (SELECT pk FROM _deleted_deg);
+DELETE FROM segment WHERE primary_key IN (SELECT pk FROM _deleted_segment);
+DELETE FROM segmentgrouplink WHERE child_id IN (SELECT pk FROM _deleted_sg) OR parent_id IN (SELECT pk FROM _deleted_sg);
+DELETE FROM segmentgroup WHERE primary_key IN (SELECT pk FROM _deleted_sg);
+DELETE FROM anwendungsfall WHERE primary_key IN (SELECT pk FROM _deleted_awf);
+DELETE FROM bedingung WHERE anwendungshandbuch_primary_key = :anwendungshandbuch_primary_key;
+DELETE FROM ubbedingung WHERE anwendungshandbuch_primary_key = :anwendungshandbuch_primary_key;
+DELETE FROM paket WHERE anwendungshandbuch_primary_key = :anwendungshandbuch_primary_key;
+DELETE FROM anwendungshandbuch WHERE primary_key = :anwendungshandbuch_primary_key;
+DELETE FROM ahb_hierarchy_materialized WHERE anwendungshandbuch_primary_key = :anwendungshandbuch_primary_key;
+
+DROP TABLE _deleted_awf;
+DROP TABLE _deleted_sg;
+DROP TABLE _deleted_segment;
+DROP TABLE _deleted_deg;
+DROP TABLE _deleted_de;
@@ -0,0 +1,150 @@
+"""
+An opt-in on-disk memo of the ahbicht results for AHB expressions.
+Expressions like 'Muss [1] U [2]' recur across format versions and database rebuilds; parsing (and - even more so -
+validating) them with ahbicht is the dominant cost of create_and_fill_ahb_expression_table. The results only depend
+on the expression, the format, the format version and the ahbicht version, but not on the AHB (the node_texts are
+composed from the AHB's Bedingungen afterwards), so they can be reused by every later build.
+"""
+
+import logging
+import sqlite3
+from collections.abc import Collection, Mapping
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as get_package_version
+from pathlib import Path
+
+from efoli import EdifactFormat, EdifactFormatVersion
+from pydantic import BaseModel
+
+from fundamend.cache import default_cache_dir
+
+_logger = logging.getLogger(__name__)
+
+ExpressionCacheKey = tuple[EdifactFormat, EdifactFormatVersion, str]
+"""an expression (e.g. 'Muss [1] U [2]') is always interpreted in the context of a format and format version"""
+
+
+class ExpressionEvaluation(BaseModel):
+    """
+    what ahbicht found out about a single expression: whether it is valid and which condition keys it references
+    """
+
+    is_valid: bool
+    error_message: str | None = None
+    bedingung_keys: list[str] = []  #: format constraints, requirement constraints and hints, e.g. ['1', '2', '501']
+    paket_keys: list[str] = []  #: e.g. ['1P']
+    ubbedingung_keys: list[str] = []  #: e.g. ['UB1']
+
+
+def _ahbicht_version() -> str:
+    try:
+        return get_package_version("ahbicht")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+_CREATE_TABLE = """
+CREATE TABLE IF NOT EXISTS ahbicht_expression_results (
+    ahbicht_version TEXT NOT NULL,
+    use_cpu_intensive_validity_check INTEGER NOT NULL,
+    edifact_format TEXT NOT NULL,
+    edifact_format_version TEXT NOT NULL,
+    expression TEXT NOT NULL,
+    evaluation TEXT NOT NULL,
+    PRIMARY KEY (ahbicht_version, use_cpu_intensive_validity_check, edifact_format, edifact_format_version, expression)
+)
+"""
+
+
+class ExpressionCache:
+    """
+    A SQLite file that memoizes the ahbicht results per (expression, format, format version, ahbicht version).
+    Pass it to create_and_fill_ahb_expression_table; then only expressions that have never been seen before are
+    evaluated.
+    """
+
+    def __init__(self, cache_path: Path | None = None):
+        """
+        initialize by providing the path of the SQLite file (defaults to ahbicht_expressions.sqlite in
+        fundamend.cache.default_cache_dir())
+        """
+        self._cache_path = cache_path or default_cache_dir() / "ahbicht_expressions.sqlite"
+
+    @property
+    def cache_path(self) -> Path:
+        """the SQLite file in which the results are stored"""
+        return self._cache_path
+
+    def _connect(self) -> sqlite3.Connection:
+        self._cache_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self._cache_path, timeout=60)
+        connection.execute(_CREATE_TABLE)
+        return connection
+
+    def lookup(
+        self, keys: Collection[ExpressionCacheKey], use_cpu_intensive_validity_check: bool
+    ) -> dict[ExpressionCacheKey, ExpressionEvaluation]:
+        """returns the cached evaluations of those keys that have been evaluated before (all others are missing)"""
+        result: dict[ExpressionCacheKey, ExpressionEvaluation] = {}
+        ahbicht_version = _ahbicht_version()
+        try:
+            connection = self._connect()
+            try:
+                for key in keys:
+                    edifact_format, edifact_format_version, expression = key
+                    row = connection.execute(
+                        "SELECT evaluation FROM ahbicht_expression_results WHERE ahbicht_version = ? AND "
+                        "use_cpu_intensive_validity_check = ? AND edifact_format = ? AND edifact_format_version = ? "
+                        "AND expression = ?",
+                        (
+                            ahbicht_version,
+                            use_cpu_intensive_validity_check,
+                            str(edifact_format),
+                            str(edifact_format_version),
+                            expression,
+                        ),
+                    ).fetchone()
+                    if row is not None:
+                        result[key] = ExpressionEvaluation.model_validate_json(row[0])
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error, ValueError) as error:
+            # a broken cache must never break the database build; we just evaluate the expressions again
+            _logger.warning("Ignoring the unreadable expression cache %s: %s", self._cache_path, error)
+        return result
+
+    def store(
+        self, evaluations: Mapping[ExpressionCacheKey, ExpressionEvaluation], use_cpu_intensive_validity_check: bool
+    ) -> None:
+        """adds the given evaluations to the cache"""
+        ahbicht_version = _ahbicht_version()
+        try:
+            connection = self._connect()
+            try:
+                with connection:
+                    connection.executemany(
+                        "INSERT OR REPLACE INTO ahbicht_expression_results VALUES (?, ?, ?, ?, ?, ?)",
+                        [
+                            (
+                                ahbicht_version,
+                                use_cpu_intensive_validity_check,
+                                str(edifact_format),
+                                str(edifact_format_version),
+                                expression,
+                                evaluation.model_dump_json(),
+                            )
+                            for (edifact_format, edifact_format_version, expression), evaluation in evaluations.items()
+                        ],
+                    )
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error) as error:
+            # a read-only cache must not break the database build; we just lose the caching
+            _logger.warning("Could not write to the expression cache %s: %s", self._cache_path, error)
+
+    def clear(self) -> None:
+        """deletes all cached results"""
+        self._cache_path.unlink(missing_ok=True)
+
+
+__all__ = ["ExpressionCache", "ExpressionCacheKey", "ExpressionEvaluation"]
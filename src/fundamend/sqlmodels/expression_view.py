@@ -5,12 +5,18 @@ helper module to create a table with a "Bedingung" column like the one in the PD
 import asyncio
 import logging
 import uuid
+from collections.abc import Collection
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 from efoli import EdifactFormat, EdifactFormatVersion
-from sqlalchemy import Index
+from pydantic import BaseModel
+from sqlalchemy import Index, delete
 
+from fundamend.instrumentation import _measure_stage
 from fundamend.sqlmodels import AhbHierarchyMaterialized, Bedingung
 from fundamend.sqlmodels.anwendungshandbuch import Paket, UbBedingung
+from fundamend.sqlmodels.expression_cache import ExpressionCache, ExpressionCacheKey, ExpressionEvaluation
+from fundamend.sqlmodels.internals import _map
 
 try:
     from sqlmodel import Field, Session, SQLModel, UniqueConstraint, col, select
@@ -33,96 +39,259 @@ except ImportError as import_error:
 _logger = logging.getLogger(__name__)
 
 
-def _generate_node_texts(session: Session, expression: str, ahb_pk: uuid.UUID) -> str:
-    categorized_key_extract = asyncio.run(extract_categorized_keys(expression))
-    bedingung_keys = (
-        categorized_key_extract.format_constraint_keys
+class _ConditionTexts(BaseModel):
+    """
+    the texts of all Bedingungen, Pakete and UB-Bedingungen of one AHB; each maps the nummer to the text
+    """
+
+    bedingungen: dict[str, str] = {}
+    pakete: dict[str, str] = {}
+    ubbedingungen: dict[str, str] = {}
+
+
+def _load_condition_texts(
+    session: Session, anwendungshandbuch_pks: Collection[uuid.UUID]
+) -> dict[uuid.UUID, _ConditionTexts]:
+    """
+    loads the texts of all Bedingungen, Pakete and UB-Bedingungen of the given AHBs at once (instead of selecting them
+    over and over again for each expression). The texts are sorted by their nummer.
+    """
+    condition_texts = {ahb_pk: _ConditionTexts() for ahb_pk in anwendungshandbuch_pks}
+    for bedingung in session.exec(
+        select(Bedingung)
+        .where(col(Bedingung.anwendungshandbuch_primary_key).in_(condition_texts.keys()))
+        .order_by(Bedingung.nummer)
+    ):
+        # the primary key is only None before the AHB is inserted
+        texts_of_ahb = condition_texts[bedingung.anwendungshandbuch_primary_key]  # type: ignore[index]
+        texts_of_ahb.bedingungen[bedingung.nummer] = bedingung.text
+    for paket in session.exec(
+        select(Paket)
+        .where(col(Paket.anwendungshandbuch_primary_key).in_(condition_texts.keys()))
+        .order_by(Paket.nummer)
+    ):
+        texts_of_ahb = condition_texts[paket.anwendungshandbuch_primary_key]  # type: ignore[index]
+        texts_of_ahb.pakete[paket.nummer] = paket.text
+    for ubbedingung in session.exec(
+        select(UbBedingung)
+        .where(col(UbBedingung.anwendungshandbuch_primary_key).in_(condition_texts.keys()))
+        .order_by(UbBedingung.nummer)
+    ):
+        texts_of_ahb = condition_texts[ubbedingung.anwendungshandbuch_primary_key]  # type: ignore[index]
+        texts_of_ahb.ubbedingungen[ubbedingung.nummer] = ubbedingung.text
+    return condition_texts
+
+
+async def _extract_keys(expression: str) -> ExpressionEvaluation:
+    categorized_key_extract = await extract_categorized_keys(expression)
+    return ExpressionEvaluation(
+        is_valid=True,
+        bedingung_keys=categorized_key_extract.format_constraint_keys
         + categorized_key_extract.requirement_constraint_keys
-        + categorized_key_extract.hint_keys
+        + categorized_key_extract.hint_keys,
+        paket_keys=categorized_key_extract.package_keys,
+        ubbedingung_keys=categorized_key_extract.time_condition_keys,
     )
-    paket_keys = categorized_key_extract.package_keys
-    ubbedingung_keys = categorized_key_extract.time_condition_keys
-    # probably, we'd be faster if we just loaded all pakete and all bedingungen once instead of selecting over and over
-    # again for each expression
-    bedingungen = {
-        x.nummer: x.text
-        for x in session.exec(
-            select(Bedingung).where(
-                col(Bedingung.nummer).in_(bedingung_keys),  # pylint:disable=no-member
-                Bedingung.anwendungshandbuch_primary_key == ahb_pk,
-            )
-        ).all()
-    }
-    pakete = {
-        x.nummer: x.text
-        for x in session.exec(
-            select(Paket).where(
-                col(Paket.nummer).in_(paket_keys),
-                Paket.anwendungshandbuch_primary_key == ahb_pk,  # pylint:disable=no-member
-            )
-        ).all()
-    }
-    ubbedingungen = {
-        x.nummer: x.text
-        for x in session.exec(
-            select(UbBedingung).where(
-                col(UbBedingung.nummer).in_(ubbedingung_keys),  # pylint:disable=no-member
-                UbBedingung.anwendungshandbuch_primary_key == ahb_pk,
-            )
-        ).all()
+
+
+def _generate_node_texts(evaluation: ExpressionEvaluation, condition_texts: _ConditionTexts) -> str:
+    if not evaluation.is_valid:
+        # we might actually get a meaningful node_texts even for invalid expressions, but I don't like it
+        return ""
+    bedingung_keys = set(evaluation.bedingung_keys)
+    paket_keys = set(evaluation.paket_keys)
+    ubbedingung_keys = set(evaluation.ubbedingung_keys)
+    joined_dict = {
+        **{key: text for key, text in condition_texts.bedingungen.items() if key in bedingung_keys},
+        **{key: text for key, text in condition_texts.pakete.items() if key in paket_keys},
+        **{key: text for key, text in condition_texts.ubbedingungen.items() if key in ubbedingung_keys},
     }
-    joined_dict = {**bedingungen, **pakete, **ubbedingungen}
     node_texts = "\n".join([f"[{key}] {value}" for key, value in joined_dict.items()])
     return node_texts
 
 
-def _get_validity_node_texts_and_error_message_cpu_intensive(
+async def _evaluate_expression_cpu_intensive(
     expression: str,
-    session: Session,
-    anwendungshandbuch_pk: uuid.UUID,
     edifact_format: EdifactFormat,
     edifact_format_version: EdifactFormatVersion,
-) -> tuple[bool, str, str | None]:
-    is_valid = True  # default: assume valid unless proven otherwise
-    error_message: str | None = None
+) -> ExpressionEvaluation:
     try:
-        is_valid, error_message = asyncio.run(is_valid_expression(expression, edifact_format, edifact_format_version))
-        if is_valid:  # we might actually get a meaningful node_texts even for invalid expressions, but I don't like it
-            node_texts = _generate_node_texts(session, expression, anwendungshandbuch_pk)
-        else:
-            node_texts = ""
+        is_valid, error_message = await is_valid_expression(expression, edifact_format, edifact_format_version)
+        if not is_valid:
+            return ExpressionEvaluation(is_valid=False, error_message=error_message)
     except NotImplementedError:  # ahbicht fault/missing feature -> act like it's valid
-        is_valid = True
-        node_texts = _generate_node_texts(session, expression, anwendungshandbuch_pk)
-        error_message = None
-    return is_valid, node_texts, error_message
+        pass
+    return await _extract_keys(expression)
 
 
-def _get_validity_node_texts_and_error_message_fast(
-    expression: str, session: Session, anwendungshandbuch_pk: uuid.UUID
-) -> tuple[bool, str, str | None]:
+async def _evaluate_expression_fast(expression: str) -> ExpressionEvaluation:
     try:
-        node_texts = _generate_node_texts(session, expression, anwendungshandbuch_pk)
+        return await _extract_keys(expression)
     except SyntaxError as syntax_error:
         _logger.info("The expression '%s' could not be parsed: %s", expression, syntax_error)
-        return (
-            False,
-            "",
-            str(syntax_error),
-        )  # I decided against returning the error message, although it's tempting - but still bad practice
+        # I decided against returning the error message, although it's tempting - but still bad practice
+        return ExpressionEvaluation(is_valid=False, error_message=str(syntax_error))
     except VisitError as visit_error:
         _logger.info("The expression '%s' could not be parsed: %s", expression, visit_error)
-        return False, "", str(visit_error)
-    return True, node_texts, None
+        return ExpressionEvaluation(is_valid=False, error_message=str(visit_error))
 
 
-def create_and_fill_ahb_expression_table(session: Session, use_cpu_intensive_validity_check: bool = False) -> None:
+class _ExpressionsToEvaluate(BaseModel):
     """
-    creates and fills the ahb_expressions table. It uses the ahb_hierarchy_materialized table to extract all expressions
-    and parses each expression with ahbicht. The latter has to be done in Python.
-    If the CPU intensive validity check is enabled, not only expression alone is checked but also all its possible
-    outcomes. This leads to only few additional expressions marked as invalid but is very slow.
+    all (unique) expressions of one format and format version that have to be evaluated.
+    This is the unit of work that is sent to the worker processes.
+    """
+
+    edifact_format: EdifactFormat
+    edifact_format_version: EdifactFormatVersion
+    expressions: list[str] = []
+    use_cpu_intensive_validity_check: bool
+
+
+async def _evaluate_expressions_concurrently(job: _ExpressionsToEvaluate) -> list[ExpressionEvaluation]:
+    if job.use_cpu_intensive_validity_check:
+        return await asyncio.gather(
+            *(
+                _evaluate_expression_cpu_intensive(expression, job.edifact_format, job.edifact_format_version)
+                for expression in job.expressions
+            )
+        )
+    return await asyncio.gather(*(_evaluate_expression_fast(expression) for expression in job.expressions))
+
+
+def _evaluate_expressions(job: _ExpressionsToEvaluate) -> list[ExpressionEvaluation]:
+    """
+    evaluates all expressions of the job in one event loop and returns their evaluations (in order).
+    If this is called from inside a running event loop (where asyncio.run is not allowed), the job is evaluated in a new
+    event loop in a separate thread; in async code, prefer create_and_fill_ahb_expression_table_async instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:  # no running event loop in this thread
+        return asyncio.run(_evaluate_expressions_concurrently(job))
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, _evaluate_expressions_concurrently(job)).result()
+
+
+def _plan_evaluations(
+    keys: Collection[ExpressionCacheKey],
+    use_cpu_intensive_validity_check: bool,
+    expression_cache: ExpressionCache | None,
+) -> tuple[dict[ExpressionCacheKey, ExpressionEvaluation], list[_ExpressionsToEvaluate]]:
+    """
+    returns the evaluations that are found in the expression_cache (if any) and the jobs to evaluate all others
+    """
+    evaluations: dict[ExpressionCacheKey, ExpressionEvaluation] = {}
+    if expression_cache is not None:
+        evaluations = expression_cache.lookup(keys, use_cpu_intensive_validity_check)
+    jobs: dict[tuple[EdifactFormat, EdifactFormatVersion], _ExpressionsToEvaluate] = {}
+    for edifact_format, edifact_format_version, expression in keys:
+        if (edifact_format, edifact_format_version, expression) in evaluations:
+            continue
+        if (edifact_format, edifact_format_version) not in jobs:
+            jobs[(edifact_format, edifact_format_version)] = _ExpressionsToEvaluate(
+                edifact_format=edifact_format,
+                edifact_format_version=edifact_format_version,
+                use_cpu_intensive_validity_check=use_cpu_intensive_validity_check,
+            )
+        jobs[(edifact_format, edifact_format_version)].expressions.append(expression)
+    return evaluations, list(jobs.values())
+
+
+def _collect_evaluations(
+    cached_evaluations: dict[ExpressionCacheKey, ExpressionEvaluation],
+    jobs: list[_ExpressionsToEvaluate],
+    evaluations_per_job: list[list[ExpressionEvaluation]],
+    use_cpu_intensive_validity_check: bool,
+    expression_cache: ExpressionCache | None,
+) -> dict[ExpressionCacheKey, ExpressionEvaluation]:
+    """
+    merges the cached and the new evaluations; the latter are stored in the expression_cache (if any)
+    """
+    new_evaluations = {
+        (job.edifact_format, job.edifact_format_version, expression): evaluation
+        for job, job_evaluations in zip(jobs, evaluations_per_job, strict=True)
+        for expression, evaluation in zip(job.expressions, job_evaluations, strict=True)
+    }
+    _logger.info("Evaluated %d expressions, %d were cached", len(new_evaluations), len(cached_evaluations))
+    if expression_cache is not None and new_evaluations:
+        expression_cache.store(new_evaluations, use_cpu_intensive_validity_check)
+    return cached_evaluations | new_evaluations
+
+
+def _evaluate_all_expressions(
+    keys: Collection[ExpressionCacheKey],
+    use_cpu_intensive_validity_check: bool,
+    max_workers: int | None,
+    expression_cache: ExpressionCache | None,
+) -> dict[ExpressionCacheKey, ExpressionEvaluation]:
+    """
+    evaluates all expressions; those that are found in the expression_cache (if any) are not evaluated again
+    """
+    cached_evaluations, jobs = _plan_evaluations(keys, use_cpu_intensive_validity_check, expression_cache)
+    with _measure_stage("expression_evaluation", f"{len(cached_evaluations)} cached") as stage:
+        evaluations_per_job = _map(_evaluate_expressions, jobs, max_workers)
+        stage.rows = sum(len(job.expressions) for job in jobs)
+    return _collect_evaluations(
+        cached_evaluations, jobs, evaluations_per_job, use_cpu_intensive_validity_check, expression_cache
+    )
+
+
+async def _evaluate_all_expressions_async(
+    keys: Collection[ExpressionCacheKey],
+    use_cpu_intensive_validity_check: bool,
+    max_workers: int | None,
+    expression_cache: ExpressionCache | None,
+) -> dict[ExpressionCacheKey, ExpressionEvaluation]:
+    """
+    like _evaluate_all_expressions but awaitable: with max_workers=1 the expressions are evaluated in a thread (ahbicht
+    is CPU bound and never yields, so it must not run in the event loop), otherwise in a process pool
+    """
+    cached_evaluations, jobs = await asyncio.to_thread(
+        _plan_evaluations, keys, use_cpu_intensive_validity_check, expression_cache
+    )
+    with _measure_stage("expression_evaluation", f"{len(cached_evaluations)} cached") as stage:
+        if max_workers == 1:
+            evaluations_per_job = await asyncio.to_thread(_map, _evaluate_expressions, jobs, 1)
+        else:
+            loop = asyncio.get_running_loop()
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                evaluations_per_job = list(
+                    await asyncio.gather(*(loop.run_in_executor(executor, _evaluate_expressions, job) for job in jobs))
+                )
+        stage.rows = sum(len(job.expressions) for job in jobs)
+    return await asyncio.to_thread(
+        _collect_evaluations,
+        cached_evaluations,
+        jobs,
+        evaluations_per_job,
+        use_cpu_intensive_validity_check,
+        expression_cache,
+    )
+
+
+_ExpressionRow = tuple[EdifactFormatVersion, str, str, uuid.UUID, str, str | None]
+"""
+edifact_format_version, format, expression (ahb_status), anwendungshandbuch_primary_key, versionsnummer, beschreibung
+"""
+
+
+def _select_expression_rows(
+    session: Session,
+    format_versions_and_formats: Collection[tuple[EdifactFormatVersion, EdifactFormat]] | None,
+) -> tuple[list[_ExpressionRow], dict[uuid.UUID, _ConditionTexts]]:
+    """
+    deletes the expressions that are re-created (if format_versions_and_formats is given) and returns one row per unique
+    expression (per format and format version) together with the condition texts of the respective AHBs
     """
+    if format_versions_and_formats is not None:
+        for format_version, edifact_format in format_versions_and_formats:
+            session.execute(
+                delete(AhbExpression).where(
+                    col(AhbExpression.edifact_format_version) == format_version,
+                    col(AhbExpression.format) == edifact_format,
+                )
+            )
     rows: list[tuple[EdifactFormatVersion | None, str, str | None, uuid.UUID, str, str | None]] = []
     for ahb_status_col in [
         AhbHierarchyMaterialized.segmentgroup_ahb_status,
@@ -139,7 +308,7 @@ def create_and_fill_ahb_expression_table(session: Session, use_cpu_intensive_val
             AhbHierarchyMaterialized.beschreibung,
         )
         rows.extend(session.exec(stmt))
-    non_empty_rows: list[tuple[EdifactFormatVersion, str, str, uuid.UUID, str, str | None]] = [
+    non_empty_rows: list[_ExpressionRow] = [
         r  # type: ignore[misc]
         for r in rows
         if r[2] is not None and r[0] is not None and r[2].strip()
@@ -148,6 +317,9 @@ def create_and_fill_ahb_expression_table(session: Session, use_cpu_intensive_val
         raise ValueError(
             "No rows found in ahb_hierarchy_materialized table; Run `create_db_and_populate_with_ahb_view` before."
         )
+    if format_versions_and_formats is not None:
+        selected_combinations = set(format_versions_and_formats)
+        non_empty_rows = [r for r in non_empty_rows if (r[0], EdifactFormat(r[1])) in selected_combinations]
     # Several AHBs that share the same (format_version, format) -- e.g. UTILMD Strom and UTILMD Gas -- can
     # define the same condition number (e.g. [106]) with *different* text, while ahb_expressions is keyed
     # only by (format_version, format, expression). Whichever AHB survives the de-duplication below therefore
@@ -163,28 +335,40 @@ def create_and_fill_ahb_expression_table(session: Session, use_cpu_intensive_val
         for row in non_empty_rows
         if (key := (row[0], row[1], row[2].strip())) not in seen and not seen.add(key)  # type: ignore[func-returns-value]
     ]
+    condition_texts = _load_condition_texts(session, {row[3] for row in unique_rows})
+    return unique_rows, condition_texts
+
+
+def _expression_keys(unique_rows: list[_ExpressionRow]) -> set[ExpressionCacheKey]:
+    # there are ~3600 unique rows for FV2410+FV2504 as of 2025-04-15
+    return {(EdifactFormat(row[1]), row[0], row[2].strip()) for row in unique_rows}
+
+
+def _insert_expression_rows(
+    session: Session,
+    unique_rows: list[_ExpressionRow],
+    condition_texts: dict[uuid.UUID, _ConditionTexts],
+    evaluations: dict[ExpressionCacheKey, ExpressionEvaluation],
+) -> None:
     ahb_expression_rows: list[AhbExpression] = []
-    for row in unique_rows:  # there are ~3600 unique rows for FV2410+FV2504 as of 2025-04-15
+    for row in unique_rows:
         expression = row[2].strip()
-        if use_cpu_intensive_validity_check:
-            # as of 2025-04-15 I have no clue how long this actually takes for all expressions
-            _, node_texts, error_message = _get_validity_node_texts_and_error_message_cpu_intensive(
-                expression, session, row[3], EdifactFormat(row[1]), row[0]
-            )
-        else:
-            _, node_texts, error_message = _get_validity_node_texts_and_error_message_fast(expression, session, row[3])
+        edifact_format = EdifactFormat(row[1])
+        evaluation = evaluations[(edifact_format, row[0], expression)]
         ahb_expression_rows.append(
             AhbExpression(
                 edifact_format_version=row[0],
-                format=row[1],
+                format=edifact_format,
                 expression=expression,
-                node_texts=node_texts,
+                node_texts=_generate_node_texts(evaluation, condition_texts[row[3]]),
                 anwendungshandbuch_primary_key=row[3],
-                ahbicht_error_message=error_message,
+                ahbicht_error_message=evaluation.error_message,
             )
         )
-    session.add_all(ahb_expression_rows)
-    session.commit()
+    with _measure_stage("insert", AhbExpression.__tablename__) as stage:
+        session.add_all(ahb_expression_rows)
+        stage.rows = len(ahb_expression_rows)
+        session.commit()
     _logger.info(
         "Inserted %d rows into the table %s",
         len(ahb_expression_rows),
@@ -192,6 +376,63 @@ def create_and_fill_ahb_expression_table(session: Session, use_cpu_intensive_val
     )
 
 
+def create_and_fill_ahb_expression_table(
+    session: Session,
+    use_cpu_intensive_validity_check: bool = False,
+    format_versions_and_formats: Collection[tuple[EdifactFormatVersion, EdifactFormat]] | None = None,
+    max_workers: int | None = 1,
+    expression_cache: ExpressionCache | None = None,
+) -> None:
+    """
+    creates and fills the ahb_expressions table. It uses the ahb_hierarchy_materialized table to extract all expressions
+    and parses each expression with ahbicht. The latter has to be done in Python.
+    If the CPU intensive validity check is enabled, not only expression alone is checked but also all its possible
+    outcomes. This leads to only few additional expressions marked as invalid but is very slow.
+    If format_versions_and_formats is given, only the expressions of these (format version, format) combinations are
+    (re-)created; existing expressions of other combinations are kept (used for incremental updates of the database).
+    The texts of the Bedingungen, Pakete and UB-Bedingungen are loaded once per AHB; the expressions of each format and
+    format version are evaluated concurrently in one event loop. If max_workers is not 1, they are evaluated in a
+    process pool with max_workers processes (None means: one per CPU). This is worth it mainly for the CPU intensive
+    validity check.
+    If an expression_cache is given, the ahbicht results are memoized on disk, so that later runs (e.g. after adding a
+    single AHB) only evaluate the expressions that have not been seen before.
+    Inside a running event loop, use create_and_fill_ahb_expression_table_async instead.
+    """
+    unique_rows, condition_texts = _select_expression_rows(session, format_versions_and_formats)
+    evaluations = _evaluate_all_expressions(
+        _expression_keys(unique_rows),
+        use_cpu_intensive_validity_check=use_cpu_intensive_validity_check,
+        max_workers=max_workers,
+        expression_cache=expression_cache,
+    )
+    _insert_expression_rows(session, unique_rows, condition_texts, evaluations)
+
+
+async def create_and_fill_ahb_expression_table_async(
+    session: Session,
+    use_cpu_intensive_validity_check: bool = False,
+    format_versions_and_formats: Collection[tuple[EdifactFormatVersion, EdifactFormat]] | None = None,
+    max_workers: int | None = 1,
+    expression_cache: ExpressionCache | None = None,
+) -> None:
+    """
+    the async counterpart of create_and_fill_ahb_expression_table (same arguments, same result).
+    The (CPU bound) ahbicht evaluations run in a thread (or, if max_workers is not 1, in a process pool) just like the
+    (blocking) database and cache accesses, so the event loop is never blocked for long.
+    The session must not be used concurrently while this runs.
+    """
+    unique_rows, condition_texts = await asyncio.to_thread(
+        _select_expression_rows, session, format_versions_and_formats
+    )
+    evaluations = await _evaluate_all_expressions_async(
+        _expression_keys(unique_rows),
+        use_cpu_intensive_validity_check=use_cpu_intensive_validity_check,
+        max_workers=max_workers,
+        expression_cache=expression_cache,
+    )
+    await asyncio.to_thread(_insert_expression_rows, session, unique_rows, condition_texts, evaluations)
+
+
 class AhbExpression(SQLModel, table=True):
     """
     A table that contains all expressions that are used in any AHB, each with prüfidentifikator and format_version.
@@ -0,0 +1,107 @@
+-- This SQLite script indexes the table ahb_hierarchy_materialized and makes the id_paths unique.
+-- It runs after the table has been filled, either by materialize_ahb_view.sql or by the Python side flattener
+-- in ahb_materializer.py.
+
+CREATE UNIQUE INDEX idx_hierarchy_id ON ahb_hierarchy_materialized (id);
+CREATE INDEX idx_hierarchy_afpk ON ahb_hierarchy_materialized (anwendungsfall_pk);
+CREATE INDEX idx_hierarchy_awfpk_sort ON ahb_hierarchy_materialized (anwendungsfall_pk, sort_path);
+CREATE INDEX idx_hierarchy_type ON ahb_hierarchy_materialized (type);
+CREATE INDEX idx_hierarchy_pruefidentifikator ON ahb_hierarchy_materialized (pruefidentifikator);
+CREATE INDEX idx_hierarchy_format ON ahb_hierarchy_materialized (format);
+CREATE INDEX idx_hierarchy_format_format_version ON ahb_hierarchy_materialized (format, edifact_format_version);
+CREATE INDEX idx_hierarchy_versionsnummer ON ahb_hierarchy_materialized (versionsnummer);
+CREATE INDEX idx_hierarchy_gueltig_von ON ahb_hierarchy_materialized (gueltig_von);
+CREATE INDEX idx_hierarchy_gueltig_bis ON ahb_hierarchy_materialized (gueltig_bis);
+CREATE INDEX idx_hierarchy_beschreibung ON ahb_hierarchy_materialized (beschreibung);
+CREATE INDEX idx_hierarchy_beschreibung_lower ON ahb_hierarchy_materialized (lower(beschreibung));
+CREATE INDEX idx_hierarchy_beschreibung_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(beschreibung), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_kommunikationsrichtungen ON ahb_hierarchy_materialized (kommunikationsrichtungen);
+CREATE INDEX idx_hierarchy_edifact_format_version ON ahb_hierarchy_materialized (edifact_format_version);
+CREATE INDEX idx_hierarchy_segmentgroup_id ON ahb_hierarchy_materialized (segmentgroup_id);
+CREATE INDEX idx_hierarchy_segmentgroup_id_lower ON ahb_hierarchy_materialized (lower(segmentgroup_id));
+CREATE INDEX idx_hierarchy_segmentgroup_id_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(segmentgroup_id), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_segmentgroup_name ON ahb_hierarchy_materialized (segmentgroup_name);
+CREATE INDEX idx_hierarchy_segmentgroup_position ON ahb_hierarchy_materialized (segmentgroup_position);
+CREATE INDEX idx_hierarchy_segment_id ON ahb_hierarchy_materialized (segment_id);
+CREATE INDEX idx_hierarchy_segment_id_lower ON ahb_hierarchy_materialized (lower(segment_id));
+CREATE INDEX idx_hierarchy_segment_id_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(segment_id), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_segment_name ON ahb_hierarchy_materialized (segment_name);
+CREATE INDEX idx_hierarchy_segment_number ON ahb_hierarchy_materialized (segment_number);
+CREATE INDEX idx_hierarchy_segment_position ON ahb_hierarchy_materialized (segment_position);
+CREATE INDEX idx_hierarchy_dataelementgroup_id ON ahb_hierarchy_materialized (dataelementgroup_id);
+CREATE INDEX idx_hierarchy_dataelementgroup_name ON ahb_hierarchy_materialized (dataelementgroup_name);
+CREATE INDEX idx_hierarchy_dataelementgroup_position ON ahb_hierarchy_materialized (dataelementgroup_position);
+CREATE INDEX idx_hierarchy_dataelement_id ON ahb_hierarchy_materialized (dataelement_id);
+CREATE INDEX idx_hierarchy_dataelement_id_lower ON ahb_hierarchy_materialized (lower(dataelement_id));
+CREATE INDEX idx_hierarchy_dataelement_id_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(dataelement_id), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_dataelement_name ON ahb_hierarchy_materialized (dataelement_name);
+CREATE INDEX idx_hierarchy_dataelement_position ON ahb_hierarchy_materialized (dataelement_position);
+CREATE INDEX idx_hierarchy_dataelement_ahb_status ON ahb_hierarchy_materialized (dataelement_ahb_status);
+CREATE INDEX idx_hierarchy_code_id ON ahb_hierarchy_materialized (code_id);
+CREATE INDEX idx_hierarchy_code_name ON ahb_hierarchy_materialized (code_name);
+CREATE INDEX idx_hierarchy_code_description ON ahb_hierarchy_materialized (code_description);
+CREATE INDEX idx_hierarchy_code_description_lower ON ahb_hierarchy_materialized (lower(code_description));
+CREATE INDEX idx_hierarchy_code_description_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(code_description), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_code_value ON ahb_hierarchy_materialized (code_value);
+CREATE INDEX idx_hierarchy_code_value_lower ON ahb_hierarchy_materialized (lower(code_value));
+CREATE INDEX idx_hierarchy_code_value_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(code_value), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_code_ahb_status ON ahb_hierarchy_materialized (code_ahb_status);
+CREATE INDEX idx_hierarchy_code_position ON ahb_hierarchy_materialized (code_position);
+CREATE INDEX idx_hierarchy_digest ON ahb_hierarchy_materialized (digest);
+CREATE INDEX idx_hierarchy_path ON ahb_hierarchy_materialized (path);
+CREATE INDEX idx_hierarchy_id_path ON ahb_hierarchy_materialized (id_path);
+CREATE INDEX idx_hierarchy_sort ON ahb_hierarchy_materialized (sort_path);
+
+-- the following 2 indexes are to speed of v_ahbtabellen only
+CREATE INDEX idx_ahb_tabellen_filter1 ON ahb_hierarchy_materialized (dataelement_ahb_status) WHERE type = 'dataelement' AND dataelement_ahb_status IS NOT NULL;
+CREATE INDEX idx_ahb_tabellen_filter2 ON ahb_hierarchy_materialized (type) WHERE type <> 'dataelementgroup';
+
+-- indexes for computed columns for v_ahbtabellen
+CREATE INDEX idx_line_ahb_status ON ahb_hierarchy_materialized (line_ahb_status);
+CREATE INDEX idx_line_ahb_status_lower ON ahb_hierarchy_materialized (lower(line_ahb_status));
+CREATE INDEX idx_line_ahb_status_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(line_ahb_status), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_line_name ON ahb_hierarchy_materialized (line_name);
+CREATE INDEX idx_line_name_lower ON ahb_hierarchy_materialized (lower(line_name));
+CREATE INDEX idx_line_name_unicode_lower ON ahb_hierarchy_materialized (REPLACE(REPLACE(REPLACE(LOWER(line_name), 'Ä', 'ä'), 'Ö', 'ö'), 'Ü', 'ü'));
+CREATE INDEX idx_hierarchy_sort_path_per_ahb ON ahb_hierarchy_materialized (sort_path, pruefidentifikator, edifact_format_version);
+
+-- Fallback: append occurrence counter '#N' to any id_paths that are still not unique after qualifier injection.
+-- This handles edge cases where the qualifier is NULL (no code children) or shared among siblings:
+-- - IFTSTA (prüfi 21045): flat segment group naming leads to multiple STS segments with the same
+--   qualifier under identical structural paths. See #258 by hf-mrdachner for details.
+-- - PARTIN FII: repeated "Name des Kontoinhabers" (D_3192) fields, see #259
+-- - PRICAT IMD: repeated IMD segments under the same path
+-- The counter is local (counts only within the duplicate group), so it's stable as long as the
+-- number and order of identical siblings doesn't change between versions.
+-- NOTE: We pre-compute counter values in a temp table because SQLite's UPDATE processes rows sequentially,
+-- which means subqueries in the SET clause see already-modified rows, breaking self-referencing counters.
+CREATE TEMP TABLE _id_path_counter_fix AS
+SELECT id,
+       id_path || '#' || ROW_NUMBER() OVER (
+           PARTITION BY id_path, pruefidentifikator, edifact_format_version
+           ORDER BY sort_path, id
+       ) AS new_id_path
+FROM ahb_hierarchy_materialized
+WHERE id IN (SELECT h1.id
+             FROM ahb_hierarchy_materialized h1
+             WHERE EXISTS (SELECT 1
+                           FROM ahb_hierarchy_materialized h2
+                           WHERE h2.id_path = h1.id_path
+                             AND h2.pruefidentifikator = h1.pruefidentifikator
+                             AND (h2.edifact_format_version = h1.edifact_format_version OR
+                                  (h2.edifact_format_version IS NULL AND h1.edifact_format_version IS NULL))
+                             AND h2.id != h1.id));
+
+CREATE UNIQUE INDEX _idx_counter_fix ON _id_path_counter_fix(id);
+
+UPDATE ahb_hierarchy_materialized
+SET id_path = (SELECT cf.new_id_path FROM _id_path_counter_fix cf WHERE cf.id = ahb_hierarchy_materialized.id)
+WHERE id IN (SELECT id FROM _id_path_counter_fix);
+
+DROP TABLE _id_path_counter_fix;
+
+-- if the unique part of the following indexes raises an integrity error, this is handled by the calling python code
+-- column order optimized for v_ahb_formatversion_diff/v_ahb_pruefi_diff queries: filter by (version, pruefi) first, then lookup by id_path/path
+CREATE UNIQUE INDEX idx_hierarchy_id_path_per_ahb ON ahb_hierarchy_materialized (edifact_format_version, pruefidentifikator, id_path);
+
+CREATE UNIQUE INDEX idx_hierarchy_path_per_ahb ON ahb_hierarchy_materialized (edifact_format_version, pruefidentifikator, path);
@@ -0,0 +1,109 @@
+-- This SQLite script indexes the table mig_hierarchy_materialized and makes the id_paths and paths unique.
+-- It runs after the table has been filled, either by materialize_mig_view.sql or by the Python side flattener
+-- in mig_materializer.py.
+
+-- Create indexes for efficient querying
+CREATE UNIQUE INDEX idx_mig_hierarchy_id ON mig_hierarchy_materialized (id);
+CREATE INDEX idx_mig_hierarchy_mig_pk ON mig_hierarchy_materialized (mig_pk);
+CREATE INDEX idx_mig_hierarchy_mig_pk_sort ON mig_hierarchy_materialized (mig_pk, sort_path);
+CREATE INDEX idx_mig_hierarchy_type ON mig_hierarchy_materialized (type);
+CREATE INDEX idx_mig_hierarchy_format ON mig_hierarchy_materialized (format);
+CREATE INDEX idx_mig_hierarchy_format_version ON mig_hierarchy_materialized (format, edifact_format_version);
+CREATE INDEX idx_mig_hierarchy_versionsnummer ON mig_hierarchy_materialized (versionsnummer);
+CREATE INDEX idx_mig_hierarchy_gueltig_von ON mig_hierarchy_materialized (gueltig_von);
+CREATE INDEX idx_mig_hierarchy_gueltig_bis ON mig_hierarchy_materialized (gueltig_bis);
+CREATE INDEX idx_mig_hierarchy_edifact_format_version ON mig_hierarchy_materialized (edifact_format_version);
+
+-- Segment group indexes
+CREATE INDEX idx_mig_hierarchy_segmentgroup_id ON mig_hierarchy_materialized (segmentgroup_id);
+CREATE INDEX idx_mig_hierarchy_segmentgroup_name ON mig_hierarchy_materialized (segmentgroup_name);
+CREATE INDEX idx_mig_hierarchy_segmentgroup_position ON mig_hierarchy_materialized (segmentgroup_position);
+
+-- Segment indexes
+CREATE INDEX idx_mig_hierarchy_segment_id ON mig_hierarchy_materialized (segment_id);
+CREATE INDEX idx_mig_hierarchy_segment_name ON mig_hierarchy_materialized (segment_name);
+CREATE INDEX idx_mig_hierarchy_segment_number ON mig_hierarchy_materialized (segment_number);
+CREATE INDEX idx_mig_hierarchy_segment_position ON mig_hierarchy_materialized (segment_position);
+
+-- Data element group indexes
+CREATE INDEX idx_mig_hierarchy_dataelementgroup_id ON mig_hierarchy_materialized (dataelementgroup_id);
+CREATE INDEX idx_mig_hierarchy_dataelementgroup_name ON mig_hierarchy_materialized (dataelementgroup_name);
+CREATE INDEX idx_mig_hierarchy_dataelementgroup_position ON mig_hierarchy_materialized (dataelementgroup_position);
+
+-- Data element indexes
+CREATE INDEX idx_mig_hierarchy_dataelement_id ON mig_hierarchy_materialized (dataelement_id);
+CREATE INDEX idx_mig_hierarchy_dataelement_name ON mig_hierarchy_materialized (dataelement_name);
+CREATE INDEX idx_mig_hierarchy_dataelement_position ON mig_hierarchy_materialized (dataelement_position);
+
+-- Code indexes
+CREATE INDEX idx_mig_hierarchy_code_id ON mig_hierarchy_materialized (code_id);
+CREATE INDEX idx_mig_hierarchy_code_name ON mig_hierarchy_materialized (code_name);
+CREATE INDEX idx_mig_hierarchy_code_value ON mig_hierarchy_materialized (code_value);
+CREATE INDEX idx_mig_hierarchy_code_position ON mig_hierarchy_materialized (code_position);
+CREATE INDEX idx_mig_hierarchy_digest ON mig_hierarchy_materialized (digest);
+
+-- Path indexes
+CREATE INDEX idx_mig_hierarchy_path ON mig_hierarchy_materialized (path);
+CREATE INDEX idx_mig_hierarchy_id_path ON mig_hierarchy_materialized (id_path);
+CREATE INDEX idx_mig_hierarchy_sort ON mig_hierarchy_materialized (sort_path);
+
+-- Computed column indexes
+CREATE INDEX idx_mig_line_name ON mig_hierarchy_materialized (line_name);
+CREATE INDEX idx_mig_line_status_std ON mig_hierarchy_materialized (line_status_std);
+CREATE INDEX idx_mig_line_status_specification ON mig_hierarchy_materialized (line_status_specification);
+
+-- Fallback: append occurrence counter '#N' to any id_paths still not unique after qualifier injection.
+CREATE TEMP TABLE _id_path_counter_fix AS
+SELECT id,
+       id_path || '#' || ROW_NUMBER() OVER (
+           PARTITION BY id_path, format, edifact_format_version
+           ORDER BY sort_path, id
+       ) AS new_id_path
+FROM mig_hierarchy_materialized
+WHERE id IN (SELECT h1.id
+             FROM mig_hierarchy_materialized h1
+             WHERE EXISTS (SELECT 1
+                           FROM mig_hierarchy_materialized h2
+                           WHERE h2.id_path = h1.id_path
+                             AND h2.format = h1.format
+                             AND (h2.edifact_format_version = h1.edifact_format_version OR
+                                  (h2.edifact_format_version IS NULL AND h1.edifact_format_version IS NULL))
+                             AND h2.id != h1.id));
+
+CREATE UNIQUE INDEX _idx_counter_fix ON _id_path_counter_fix(id);
+
+UPDATE mig_hierarchy_materialized
+SET id_path = (SELECT cf.new_id_path FROM _id_path_counter_fix cf WHERE cf.id = mig_hierarchy_materialized.id)
+WHERE id IN (SELECT id FROM _id_path_counter_fix);
+
+DROP TABLE _id_path_counter_fix;
+
+-- Append counter '#N' to path where duplicates exist (for diff view matching)
+CREATE TEMP TABLE _path_counter_fix AS
+SELECT id,
+       path || ' #' || ROW_NUMBER() OVER (
+           PARTITION BY path, format, edifact_format_version
+           ORDER BY sort_path, id
+       ) AS new_path
+FROM mig_hierarchy_materialized
+WHERE id IN (SELECT h1.id
+             FROM mig_hierarchy_materialized h1
+             WHERE EXISTS (SELECT 1
+                           FROM mig_hierarchy_materialized h2
+                           WHERE h2.path = h1.path
+                             AND h2.format = h1.format
+                             AND (h2.edifact_format_version = h1.edifact_format_version OR
+                                  (h2.edifact_format_version IS NULL AND h1.edifact_format_version IS NULL))
+                             AND h2.id != h1.id));
+
+CREATE UNIQUE INDEX _idx_path_counter_fix ON _path_counter_fix(id);
+
+UPDATE mig_hierarchy_materialized
+SET path = (SELECT pf.new_path FROM _path_counter_fix pf WHERE pf.id = mig_hierarchy_materialized.id)
+WHERE id IN (SELECT id FROM _path_counter_fix);
+
+DROP TABLE _path_counter_fix;
+
+-- Unique indexes for diff view support
+CREATE UNIQUE INDEX idx_mig_hierarchy_id_path_per_mig ON mig_hierarchy_materialized (edifact_format_version, format, id_path);
+CREATE UNIQUE INDEX idx_mig_hierarchy_path_per_mig ON mig_hierarchy_materialized (edifact_format_version, format, path);
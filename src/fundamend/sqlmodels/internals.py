@@ -1,6 +1,13 @@
 """internal helper functions"""
 
+import uuid
+from collections import defaultdict
+from collections.abc import Callable, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from enum import Enum
 from pathlib import Path
+from typing import Any, TypeVar
 
 try:
     import sqlalchemy
@@ -10,10 +17,40 @@ except ImportError as import_error:
     # sqlmodel is only an optional dependency when fundamend is used to fill a database
     raise
 
+from fundamend.instrumentation import _measure_stage
+from fundamend.models.id_path import (
+    data_element_qualifier,
+    ids_with_siblings,
+    segment_group_qualifier,
+    segment_qualifier,
+)
 
-def _execute_bare_sql(session: Session, path_to_sql_commands: Path) -> None:
+_S = TypeVar("_S")
+_T = TypeVar("_T")
+
+
+def _describe_statement(path_to_sql_commands: Path, statement: str, max_length: int = 100) -> str:
+    """returns e.g. 'materialize_ahb_view.sql: CREATE TEMP TABLE _seg_qual AS SELECT ...' to identify the statement"""
+    code_lines = []
+    for line in statement.splitlines():
+        comment_start = line.find("--")
+        if comment_start >= 0 and line[:comment_start].count("'") % 2 == 0:  # not inside a string literal
+            code_lines.append(line[:comment_start])
+        else:
+            code_lines.append(line)
+    code = " ".join(" ".join(code_lines).split())
+    if len(code) > max_length:
+        code = code[:max_length] + " ..."
+    return f"{path_to_sql_commands.name}: {code}"
+
+
+def _execute_bare_sql(
+    session: Session, path_to_sql_commands: Path, parameters: dict[str, Any] | None = None, commit: bool = True
+) -> None:
     """
     Execute bare SQL from the path_to_sqlcommands in the given SQLAlchemy session.
+    The optional parameters are bound to the respective :placeholders in the SQL statements.
+    If commit is False, committing is left to the caller (e.g. to run the statements as part of a larger transaction).
     """
 
     with open(path_to_sql_commands, encoding="utf-8") as sql_file:
@@ -24,11 +61,153 @@ def _execute_bare_sql(session: Session, path_to_sql_commands: Path) -> None:
     for bare_statement in bare_statements:
         statement = bare_statement.strip()
         if statement:
-            try:
-                session.execute(sqlalchemy.text(statement))
-            except sqlalchemy.exc.IntegrityError:
-                if " UNIQUE " in bare_statement:
-                    session.execute(sqlalchemy.text(bare_statement.replace(" UNIQUE ", " ")))
-                else:
-                    raise
-    session.commit()
+            with _measure_stage("sql_statement", _describe_statement(path_to_sql_commands, statement)) as stage:
+                try:
+                    result = session.execute(sqlalchemy.text(statement), parameters)
+                except sqlalchemy.exc.IntegrityError:
+                    if " UNIQUE " in bare_statement:
+                        result = session.execute(sqlalchemy.text(bare_statement.replace(" UNIQUE ", " ")), parameters)
+                    else:
+                        raise
+                if isinstance(result, sqlalchemy.CursorResult) and result.rowcount >= 0:
+                    stage.rows = result.rowcount
+    if commit:
+        session.commit()
+
+
+def _vacuum(engine: sqlalchemy.Engine) -> None:
+    """
+    rebuilds the SQLite database file without the free pages that dropped tables leave behind (VACUUM), so that the file
+    gets smaller. VACUUM cannot run inside a transaction.
+    """
+    with _measure_stage("vacuum"), engine.connect() as connection:
+        connection.execution_options(isolation_level="AUTOCOMMIT").exec_driver_sql("VACUUM")
+
+
+def _map(function: Callable[[_S], _T], items: Iterable[_S], max_workers: int | None) -> list[_T]:
+    """applies function to all items; in a process pool unless max_workers is 1. The order is preserved."""
+    if max_workers == 1:
+        return [function(item) for item in items]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(function, items))
+
+
+# The helpers below are shared by the Python side materializers (ahb_materializer.py and mig_materializer.py), which
+# compute the same rows as materialize_ahb_view.sql and materialize_mig_view.sql, respectively.
+
+_Row = dict[str, Any]
+
+
+def _to_sqlite(value: Any) -> Any:
+    """returns the value as it is stored in the raw tables (and hence copied into the materialized table by SQL)"""
+    if value is None:
+        return None
+    if isinstance(value, uuid.UUID):
+        return value.hex
+    if isinstance(value, Enum):
+        return value.name
+    if isinstance(value, date):
+        return value.isoformat()
+    return value
+
+
+def _join(*parts: str | None) -> str | None:
+    """concatenates like SQLs || operator, i.e. the result is NULL if any part is NULL"""
+    if any(part is None for part in parts):
+        return None
+    return "".join(parts)  # type:ignore[arg-type] # checked above
+
+
+def _trim(value: str | None) -> str | None:
+    """like SQLs trim(...), which only removes spaces"""
+    return value.strip(" ") if value is not None else None
+
+
+def _coalesce(row: _Row, columns: tuple[str, ...]) -> Any:
+    """like SQLs coalesce(...): the first of the columns that is not NULL"""
+    return next((row[column] for column in columns if row[column] is not None), None)
+
+
+def _by_parent(rows: Iterable[_Row], parent_key: str) -> dict[uuid.UUID, list[_Row]]:
+    """groups the rows by the given foreign key; every group is sorted by position"""
+    result: dict[uuid.UUID, list[_Row]] = defaultdict(list)
+    for row in rows:
+        if row[parent_key] is not None:
+            result[row[parent_key]].append(row)
+    for children in result.values():
+        children.sort(key=lambda child: child["position"])
+    return result
+
+
+def _ids_with_siblings(siblings: list[_Row]) -> set[str]:
+    """returns those ids that occur more than once among the siblings"""
+    return ids_with_siblings(sibling["id"] for sibling in siblings)
+
+
+class _HierarchyTree:
+    """
+    the parent-child relations between the raw rows (see ahb_to_rows/mig_to_rows) of the segment groups, segments, data
+    element (group)s and codes, so that the hierarchy can be walked top-down without any lookups in the database.
+    The root segment groups and segments are those whose root_key (the foreign key to the AHB/MIG) is set.
+    """
+
+    # pylint:disable=too-many-instance-attributes, too-many-arguments
+    def __init__(
+        self,
+        *,
+        root_key: str,
+        segment_groups: list[_Row],
+        segment_group_links: list[_Row],
+        segments: list[_Row],
+        data_element_groups: list[_Row],
+        data_elements: list[_Row],
+        codes: list[_Row],
+    ):
+        self.root_segment_groups = _by_parent(segment_groups, root_key)
+        self.root_segments = _by_parent((row for row in segments if row["segmentgroup_primary_key"] is None), root_key)
+        segment_group_per_primary_key = {row["primary_key"]: row for row in segment_groups}
+        self.child_segment_groups: dict[uuid.UUID, list[_Row]] = defaultdict(list)
+        for link in segment_group_links:
+            self.child_segment_groups[link["parent_id"]].append(segment_group_per_primary_key[link["child_id"]])
+        for children in self.child_segment_groups.values():
+            children.sort(key=lambda child: child["position"])
+        self.segments = _by_parent(segments, "segmentgroup_primary_key")
+        self.data_element_groups = _by_parent(data_element_groups, "segment_primary_key")
+        self.bare_data_elements = _by_parent(
+            (row for row in data_elements if row["data_element_group_primary_key"] is None), "segment_primary_key"
+        )
+        self.grouped_data_elements = _by_parent(data_elements, "data_element_group_primary_key")
+        self.codes = _by_parent(codes, "data_element_primary_key")
+        self._segment_group_qualifiers: dict[uuid.UUID, str | None] = {}
+
+    def _code_values(self, data_element: _Row) -> list[str | None]:
+        """the value of the first code of the data element (if any); that's all the qualifiers need"""
+        return [code["value"] for code in self.codes.get(data_element["primary_key"], [])[:1]]
+
+    def data_element_qualifier(self, data_element: _Row) -> str | None:
+        """see id_path.data_element_qualifier"""
+        return data_element_qualifier(self._code_values(data_element))
+
+    def segment_qualifier(self, segment: _Row) -> str | None:
+        """see id_path.segment_qualifier"""
+        return segment_qualifier(
+            (
+                self._code_values(data_element)
+                for data_element in self.bare_data_elements.get(segment["primary_key"], [])
+            ),
+            (
+                self._code_values(data_element)
+                for data_element_group in self.data_element_groups.get(segment["primary_key"], [])
+                for data_element in self.grouped_data_elements.get(data_element_group["primary_key"], [])
+            ),
+        )
+
+    def segment_group_qualifier(self, segment_group: _Row) -> str | None:
+        """see id_path.segment_group_qualifier"""
+        primary_key = segment_group["primary_key"]
+        if primary_key not in self._segment_group_qualifiers:
+            self._segment_group_qualifiers[primary_key] = segment_group_qualifier(
+                (self.segment_qualifier(segment) for segment in self.segments.get(primary_key, [])),
+                (self.segment_group_qualifier(child) for child in self.child_segment_groups.get(primary_key, [])),
+            )
+        return self._segment_group_qualifiers[primary_key]
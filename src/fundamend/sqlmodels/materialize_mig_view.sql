@@ -1,6 +1,7 @@
 -- This SQLite script materializes the hierarchy of the MIG (Message Implementation Guide) into a table.
 -- This allows for easy querying without 'unrolling' the recursive segment (group) hierarchy each time.
 -- There is a Pydantic model class for the 'mig_hierarchy_materialized' table: MigHierarchyMaterialized
+-- The indexes (and the id_path/path fixes that rely on them) are created afterwards by index_mig_hierarchy_materialized.sql.
 
 -- Drop previous materialized table if it exists
 DROP TABLE IF EXISTS mig_hierarchy_materialized;
@@ -113,6 +114,7 @@ WITH RECURSIVE
 
     ordered_roots AS (SELECT sg.primary_key,
                              sg.position,
+                             sg.digest,
                              'segment_group' AS type,
                              sg.id           AS root_id_text,
                              sg.name,
@@ -140,6 +142,7 @@ WITH RECURSIVE
 
                       SELECT s.primary_key,
                              s.position,
+                             s.digest,
                              'segment' AS type,
                              s.id      AS root_id_text,
                              s.name,
@@ -255,7 +258,9 @@ WITH RECURSIVE
                               NULL                                                                 AS code_name,
                               NULL                                                                 AS code_description,
                               NULL                                                                 AS code_value,
-                              NULL                                                                 AS code_position
+                              NULL                                                                 AS code_position,
+
+                              o.digest
                        FROM ordered_roots_with_order o),
 
     hierarchy AS (SELECT *
@@ -331,7 +336,9 @@ WITH RECURSIVE
                          h.code_name,
                          h.code_description,
                          h.code_value,
-                         h.code_position
+                         h.code_position,
+
+                         child.digest
                   FROM hierarchy h
                            JOIN migsegmentgrouplink link ON h.current_id = link.parent_id
                            JOIN migsegmentgroup child ON link.child_id = child.primary_key
@@ -407,7 +414,9 @@ WITH RECURSIVE
                          h.code_name,
                          h.code_description,
                          h.code_value,
-                         h.code_position
+                         h.code_position,
+
+                         s.digest
                   FROM hierarchy h
                            JOIN migsegment s ON s.segmentgroup_primary_key = h.current_id
                   WHERE h.type = 'segment_group'
@@ -478,7 +487,9 @@ WITH RECURSIVE
                          h.code_name,
                          h.code_description,
                          h.code_value,
-                         h.code_position
+                         h.code_position,
+
+                         deg.digest
                   FROM hierarchy h
                            JOIN migdataelementgroup deg ON deg.segment_primary_key = h.current_id
                   WHERE h.type = 'segment'
@@ -553,7 +564,9 @@ WITH RECURSIVE
                          h.code_name,
                          h.code_description,
                          h.code_value,
-                         h.code_position
+                         h.code_position,
+
+                         de.digest
                   FROM hierarchy h
                            JOIN migdataelement de ON de.segment_primary_key = h.current_id
                   WHERE h.type = 'segment'
@@ -629,7 +642,9 @@ WITH RECURSIVE
                          h.code_name,
                          h.code_description,
                          h.code_value,
-                         h.code_position
+                         h.code_position,
+
+                         de.digest
                   FROM hierarchy h
                            JOIN migdataelement de ON de.data_element_group_primary_key = h.current_id
                   WHERE h.type = 'dataelementgroup'
@@ -700,7 +715,9 @@ WITH RECURSIVE
                          c.name,
                          c.description,
                          c.value,
-                         c.position
+                         c.position,
+
+                         c.digest
                   FROM hierarchy h
                            JOIN migcode c ON c.data_element_primary_key = h.current_id
                   WHERE h.type = 'dataelement')
@@ -736,82 +753,6 @@ SELECT hex(randomblob(16)) AS id,
 FROM hierarchy
 ORDER BY mig_pk, sort_path;
 
-
--- Create indexes for efficient querying
-CREATE UNIQUE INDEX idx_mig_hierarchy_id ON mig_hierarchy_materialized (id);
-CREATE INDEX idx_mig_hierarchy_mig_pk ON mig_hierarchy_materialized (mig_pk);
-CREATE INDEX idx_mig_hierarchy_mig_pk_sort ON mig_hierarchy_materialized (mig_pk, sort_path);
-CREATE INDEX idx_mig_hierarchy_type ON mig_hierarchy_materialized (type);
-CREATE INDEX idx_mig_hierarchy_format ON mig_hierarchy_materialized (format);
-CREATE INDEX idx_mig_hierarchy_format_version ON mig_hierarchy_materialized (format, edifact_format_version);
-CREATE INDEX idx_mig_hierarchy_versionsnummer ON mig_hierarchy_materialized (versionsnummer);
-CREATE INDEX idx_mig_hierarchy_gueltig_von ON mig_hierarchy_materialized (gueltig_von);
-CREATE INDEX idx_mig_hierarchy_gueltig_bis ON mig_hierarchy_materialized (gueltig_bis);
-CREATE INDEX idx_mig_hierarchy_edifact_format_version ON mig_hierarchy_materialized (edifact_format_version);
-
--- Segment group indexes
-CREATE INDEX idx_mig_hierarchy_segmentgroup_id ON mig_hierarchy_materialized (segmentgroup_id);
-CREATE INDEX idx_mig_hierarchy_segmentgroup_name ON mig_hierarchy_materialized (segmentgroup_name);
-CREATE INDEX idx_mig_hierarchy_segmentgroup_position ON mig_hierarchy_materialized (segmentgroup_position);
-
--- Segment indexes
-CREATE INDEX idx_mig_hierarchy_segment_id ON mig_hierarchy_materialized (segment_id);
-CREATE INDEX idx_mig_hierarchy_segment_name ON mig_hierarchy_materialized (segment_name);
-CREATE INDEX idx_mig_hierarchy_segment_number ON mig_hierarchy_materialized (segment_number);
-CREATE INDEX idx_mig_hierarchy_segment_position ON mig_hierarchy_materialized (segment_position);
-
--- Data element group indexes
-CREATE INDEX idx_mig_hierarchy_dataelementgroup_id ON mig_hierarchy_materialized (dataelementgroup_id);
-CREATE INDEX idx_mig_hierarchy_dataelementgroup_name ON mig_hierarchy_materialized (dataelementgroup_name);
-CREATE INDEX idx_mig_hierarchy_dataelementgroup_position ON mig_hierarchy_materialized (dataelementgroup_position);
-
--- Data element indexes
-CREATE INDEX idx_mig_hierarchy_dataelement_id ON mig_hierarchy_materialized (dataelement_id);
-CREATE INDEX idx_mig_hierarchy_dataelement_name ON mig_hierarchy_materialized (dataelement_name);
-CREATE INDEX idx_mig_hierarchy_dataelement_position ON mig_hierarchy_materialized (dataelement_position);
-
--- Code indexes
-CREATE INDEX idx_mig_hierarchy_code_id ON mig_hierarchy_materialized (code_id);
-CREATE INDEX idx_mig_hierarchy_code_name ON mig_hierarchy_materialized (code_name);
-CREATE INDEX idx_mig_hierarchy_code_value ON mig_hierarchy_materialized (code_value);
-CREATE INDEX idx_mig_hierarchy_code_position ON mig_hierarchy_materialized (code_position);
-
--- Path indexes
-CREATE INDEX idx_mig_hierarchy_path ON mig_hierarchy_materialized (path);
-CREATE INDEX idx_mig_hierarchy_id_path ON mig_hierarchy_materialized (id_path);
-CREATE INDEX idx_mig_hierarchy_sort ON mig_hierarchy_materialized (sort_path);
-
--- Computed column indexes
-CREATE INDEX idx_mig_line_name ON mig_hierarchy_materialized (line_name);
-CREATE INDEX idx_mig_line_status_std ON mig_hierarchy_materialized (line_status_std);
-CREATE INDEX idx_mig_line_status_specification ON mig_hierarchy_materialized (line_status_specification);
-
--- Fallback: append occurrence counter '#N' to any id_paths still not unique after qualifier injection.
-CREATE TEMP TABLE _id_path_counter_fix AS
-SELECT id,
-       id_path || '#' || ROW_NUMBER() OVER (
-           PARTITION BY id_path, format, edifact_format_version
-           ORDER BY sort_path, id
-       ) AS new_id_path
-FROM mig_hierarchy_materialized
-WHERE id IN (SELECT h1.id
-             FROM mig_hierarchy_materialized h1
-             WHERE EXISTS (SELECT 1
-                           FROM mig_hierarchy_materialized h2
-                           WHERE h2.id_path = h1.id_path
-                             AND h2.format = h1.format
-                             AND (h2.edifact_format_version = h1.edifact_format_version OR
-                                  (h2.edifact_format_version IS NULL AND h1.edifact_format_version IS NULL))
-                             AND h2.id != h1.id));
-
-CREATE UNIQUE INDEX _idx_counter_fix ON _id_path_counter_fix(id);
-
-UPDATE mig_hierarchy_materialized
-SET id_path = (SELECT cf.new_id_path FROM _id_path_counter_fix cf WHERE cf.id = mig_hierarchy_materialized.id)
-WHERE id IN (SELECT id FROM _id_path_counter_fix);
-
-DROP TABLE _id_path_counter_fix;
-
 -- Clean up qualifier temp tables
 DROP TABLE IF EXISTS _seg_qual;
 DROP TABLE IF EXISTS _seg_needs_qual;
@@ -819,33 +760,3 @@ DROP TABLE IF EXISTS _sg_qual;
 DROP TABLE IF EXISTS _sg_needs_qual;
 DROP TABLE IF EXISTS _de_qual;
 DROP TABLE IF EXISTS _de_needs_qual;
-
--- Append counter '#N' to path where duplicates exist (for diff view matching)
-CREATE TEMP TABLE _path_counter_fix AS
-SELECT id,
-       path || ' #' || ROW_NUMBER() OVER (
-           PARTITION BY path, format, edifact_format_version
-           ORDER BY sort_path, id
-       ) AS new_path
-FROM mig_hierarchy_materialized
-WHERE id IN (SELECT h1.id
-             FROM mig_hierarchy_materialized h1
-             WHERE EXISTS (SELECT 1
-                           FROM mig_hierarchy_materialized h2
-                           WHERE h2.path = h1.path
-                             AND h2.format = h1.format
-                             AND (h2.edifact_format_version = h1.edifact_format_version OR
-                                  (h2.edifact_format_version IS NULL AND h1.edifact_format_version IS NULL))
-                             AND h2.id != h1.id));
-
-CREATE UNIQUE INDEX _idx_path_counter_fix ON _path_counter_fix(id);
-
-UPDATE mig_hierarchy_materialized
-SET path = (SELECT pf.new_path FROM _path_counter_fix pf WHERE pf.id = mig_hierarchy_materialized.id)
-WHERE id IN (SELECT id FROM _path_counter_fix);
-
-DROP TABLE _path_counter_fix;
-
--- Unique indexes for diff view support
-CREATE UNIQUE INDEX idx_mig_hierarchy_id_path_per_mig ON mig_hierarchy_materialized (edifact_format_version, format, id_path);
-CREATE UNIQUE INDEX idx_mig_hierarchy_path_per_mig ON mig_hierarchy_materialized (edifact_format_version, format, path);
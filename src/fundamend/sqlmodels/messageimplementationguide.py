@@ -43,6 +43,7 @@ class MigCode(SQLModel, table=True):
     description: str | None = Field(default=None, index=True)  # e.g. ''
     value: str | None = Field(default=None, index=True)  # e.g. 'UTILTS'
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     dataelement: Union["MigDataElement", None] = Relationship(back_populates="codes")
     data_element_primary_key: UUID | None = Field(default=None, foreign_key="migdataelement.primary_key")
@@ -54,6 +55,7 @@ class MigCode(SQLModel, table=True):
             description=model.description,
             value=model.value,
             position=position,
+            digest=model.digest,
         )
 
     def to_model(self) -> PydanticCode:
@@ -87,6 +89,7 @@ class MigDataElement(SQLModel, table=True):
     format_specification: str  # e.g. 'an..6'
     codes: list[MigCode] = Relationship(back_populates="dataelement")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     dataelementgroup: Union["MigDataElementGroup", None] = Relationship(back_populates="data_elements")
     data_element_group_primary_key: UUID | None = Field(default=None, foreign_key="migdataelementgroup.primary_key")
@@ -109,6 +112,7 @@ class MigDataElement(SQLModel, table=True):
                 for position_index, pydantic_code in enumerate(model.codes)
             ],
             position=position,
+            digest=model.digest,
         )
         return result
 
@@ -140,6 +144,7 @@ class MigDataElementGroup(SQLModel, table=True):
     status_specification: str  # MigStatus stored as string
     data_elements: list[MigDataElement] = Relationship(back_populates="dataelementgroup")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     segment: Union["MigSegment", None] = Relationship(back_populates="data_element_groups")
     segment_primary_key: UUID | None = Field(default=None, foreign_key="migsegment.primary_key")
@@ -153,6 +158,7 @@ class MigDataElementGroup(SQLModel, table=True):
             status_std=model.status_std.value,
             status_specification=model.status_specification.value,
             position=position,
+            digest=model.digest,
         )
         for position_index, x in enumerate(model.data_elements):
             de = MigDataElement.from_model(x, position=position_index)
@@ -196,6 +202,7 @@ class MigSegment(SQLModel, table=True):
     data_elements: list[MigDataElement] = Relationship(back_populates="segment")
     data_element_groups: list[MigDataElementGroup] = Relationship(back_populates="segment")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     segmentgroup: Union["MigSegmentGroup", None] = Relationship(back_populates="segments")
     segmentgroup_primary_key: UUID | None = Field(default=None, foreign_key="migsegmentgroup.primary_key")
@@ -219,6 +226,7 @@ class MigSegment(SQLModel, table=True):
             example=model.example,
             is_on_uebertragungsdatei_level=model.is_on_uebertragungsdatei_level,
             position=position,
+            digest=model.digest,
         )
         for _position, element in enumerate(model.data_elements):
             if isinstance(element, PydanticDataElement):
@@ -278,6 +286,7 @@ class MigSegmentGroup(SQLModel, table=True):
     status_specification: str  # MigStatus stored as string
     segments: list[MigSegment] = Relationship(back_populates="segmentgroup")
     position: int | None = Field(default=None, index=True)
+    digest: str | None = Field(default=None, index=True)  #: the digest of the pydantic model, see its .digest
 
     # Self-referential relationship for nested segment groups
     segment_groups: list["MigSegmentGroup"] = Relationship(
@@ -315,6 +324,7 @@ class MigSegmentGroup(SQLModel, table=True):
             status_std=model.status_std.value,
             status_specification=model.status_specification.value,
             position=position,
+            digest=model.digest,
         )
         for _position, element in enumerate(model.elements):
             if isinstance(element, PydanticSegment):
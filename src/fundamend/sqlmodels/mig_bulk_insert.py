@@ -0,0 +1,226 @@
+"""
+A bulk insert path for the raw MIG tables that bypasses the SQLAlchemy ORM (the MIG counterpart of ahb_bulk_insert.py).
+The Pydantic MessageImplementationGuide is walked once and the rows are emitted as plain dicts per table which are then
+written with one executemany-style insert() per table. The resulting table contents are the same as with the ORM (except
+for the random primary keys).
+"""
+
+# pylint: disable=duplicate-code
+# This module intentionally follows the same patterns as ahb_bulk_insert.py
+
+import uuid
+from collections import defaultdict
+from datetime import date
+from typing import Any
+
+from efoli import get_edifact_format_version
+
+try:
+    from sqlalchemy import insert
+    from sqlalchemy.engine import Connection
+    from sqlmodel import SQLModel
+except ImportError as import_error:
+    import_error.msg += "; Did you install fundamend[sqlmodels] or did you try to import from fundamend.models instead?"
+    # sqlmodel is only an optional dependency when fundamend is used to fill a database
+    raise
+
+from fundamend.models.messageimplementationguide import DataElement as PydanticDataElement
+from fundamend.models.messageimplementationguide import DataElementGroup as PydanticDataElementGroup
+from fundamend.models.messageimplementationguide import MessageImplementationGuide as PydanticMessageImplementationGuide
+from fundamend.models.messageimplementationguide import Segment as PydanticSegment
+from fundamend.models.messageimplementationguide import SegmentGroup as PydanticSegmentGroup
+from fundamend.sqlmodels.messageimplementationguide import (
+    MessageImplementationGuide,
+    MigCode,
+    MigDataElement,
+    MigDataElementGroup,
+    MigSegment,
+    MigSegmentGroup,
+    MigSegmentGroupLink,
+)
+
+# pylint:disable=too-many-arguments
+
+MigRows = dict[type[SQLModel], list[dict[str, Any]]]
+"""
+rows per SQLModel table class; each row is a dict of column name to value
+"""
+
+_INSERT_ORDER: list[type[SQLModel]] = [
+    MessageImplementationGuide,
+    MigSegmentGroup,
+    MigSegmentGroupLink,
+    MigSegment,
+    MigDataElementGroup,
+    MigDataElement,
+    MigCode,
+]
+"""parents before children, so that the foreign keys are valid at any time"""
+
+
+def _add_data_element(
+    rows: MigRows,
+    model: PydanticDataElement,
+    position: int,
+    segment_primary_key: uuid.UUID | None,
+    data_element_group_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[MigDataElement].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "description": model.description,
+            "status_std": model.status_std.value,
+            "status_specification": model.status_specification.value,
+            "format_std": model.format_std,
+            "format_specification": model.format_specification,
+            "position": position,
+            "digest": model.digest,
+            "data_element_group_primary_key": data_element_group_primary_key,
+            "segment_primary_key": segment_primary_key,
+        }
+    )
+    rows[MigCode].extend(
+        {
+            "primary_key": uuid.uuid4(),
+            "name": code.name,
+            "description": code.description,
+            "value": code.value,
+            "position": code_position,
+            "digest": code.digest,
+            "data_element_primary_key": primary_key,
+        }
+        for code_position, code in enumerate(model.codes)
+    )
+
+
+def _add_segment(
+    rows: MigRows,
+    model: PydanticSegment,
+    position: int,
+    segmentgroup_primary_key: uuid.UUID | None,
+    mig_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[MigSegment].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "description": model.description,
+            "counter": model.counter,
+            "level": model.level,
+            "number": model.number,
+            "max_rep_std": model.max_rep_std,
+            "max_rep_specification": model.max_rep_specification,
+            "status_std": model.status_std.value,
+            "status_specification": model.status_specification.value,
+            "example": model.example,
+            "is_on_uebertragungsdatei_level": model.is_on_uebertragungsdatei_level,
+            "position": position,
+            "digest": model.digest,
+            "segmentgroup_primary_key": segmentgroup_primary_key,
+            "mig_primary_key": mig_primary_key,
+        }
+    )
+    for element_position, element in enumerate(model.data_elements):
+        if isinstance(element, PydanticDataElement):
+            _add_data_element(rows, element, element_position, primary_key, None)
+            continue
+        if isinstance(element, PydanticDataElementGroup):
+            group_primary_key = uuid.uuid4()
+            rows[MigDataElementGroup].append(
+                {
+                    "primary_key": group_primary_key,
+                    "id": element.id,
+                    "name": element.name,
+                    "description": element.description,
+                    "status_std": element.status_std.value,
+                    "status_specification": element.status_specification.value,
+                    "position": element_position,
+                    "digest": element.digest,
+                    "segment_primary_key": primary_key,
+                }
+            )
+            for data_element_position, data_element in enumerate(element.data_elements):
+                _add_data_element(rows, data_element, data_element_position, None, group_primary_key)
+
+
+def _add_segment_group(
+    rows: MigRows,
+    model: PydanticSegmentGroup,
+    position: int,
+    parent_primary_key: uuid.UUID | None,
+    mig_primary_key: uuid.UUID | None,
+) -> None:
+    primary_key = uuid.uuid4()
+    rows[MigSegmentGroup].append(
+        {
+            "primary_key": primary_key,
+            "id": model.id,
+            "name": model.name,
+            "counter": model.counter,
+            "level": model.level,
+            "max_rep_std": model.max_rep_std,
+            "max_rep_specification": model.max_rep_specification,
+            "status_std": model.status_std.value,
+            "status_specification": model.status_specification.value,
+            "position": position,
+            "digest": model.digest,
+            "mig_primary_key": mig_primary_key,
+        }
+    )
+    if parent_primary_key is not None:
+        rows[MigSegmentGroupLink].append({"parent_id": parent_primary_key, "child_id": primary_key})
+    for element_position, element in enumerate(model.elements):
+        if isinstance(element, PydanticSegment):
+            _add_segment(rows, element, element_position, primary_key, None)
+            continue
+        if isinstance(element, PydanticSegmentGroup):
+            _add_segment_group(rows, element, element_position, primary_key, None)
+
+
+def mig_to_rows(
+    model: PydanticMessageImplementationGuide, gueltig_von: date | None = None, gueltig_bis: date | None = None
+) -> MigRows:
+    """
+    walks the given MessageImplementationGuide once and returns the rows of all raw MIG tables.
+    The rows are the same as those of MessageImplementationGuide.from_model(model) (with gueltig_von/bis and the
+    edifact_format_version set like in create_db_and_populate_with_mig_view), but no ORM objects are created.
+    """
+    rows: MigRows = defaultdict(list)
+    primary_key = uuid.uuid4()
+    rows[MessageImplementationGuide].append(
+        {
+            "primary_key": primary_key,
+            "veroeffentlichungsdatum": model.veroeffentlichungsdatum,
+            "autor": model.autor,
+            "versionsnummer": model.versionsnummer,
+            "format": model.format,
+            "gueltig_von": gueltig_von,
+            "gueltig_bis": gueltig_bis,
+            "edifact_format_version": get_edifact_format_version(gueltig_von) if gueltig_von is not None else None,
+        }
+    )
+    for position, element in enumerate(model.elements):
+        if isinstance(element, PydanticSegment):
+            _add_segment(rows, element, position, None, primary_key)
+            continue
+        if isinstance(element, PydanticSegmentGroup):
+            _add_segment_group(rows, element, position, None, primary_key)
+    return rows
+
+
+def bulk_insert_mig_rows(connection: Connection, rows: MigRows) -> None:
+    """
+    inserts the given rows (see mig_to_rows) with one executemany-style INSERT per table.
+    The caller is responsible for committing.
+    """
+    for row_class in _INSERT_ORDER:
+        if rows.get(row_class):
+            connection.execute(insert(row_class.__table__), rows[row_class])  # type: ignore[attr-defined]
+
+
+__all__ = ["MigRows", "bulk_insert_mig_rows", "mig_to_rows"]
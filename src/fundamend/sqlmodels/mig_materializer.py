@@ -0,0 +1,380 @@
+"""
+A Python side alternative to materialize_mig_view.sql (the MIG counterpart of ahb_materializer.py).
+The rows of mig_hierarchy_materialized are computed in a single depth-first traversal per MIG from the rows that are
+created for the raw tables (see mig_bulk_insert.py) instead of reconstructing the hierarchy with recursive CTEs.
+The result is the same row for row (except for the random id).
+"""
+
+# pylint: disable=duplicate-code
+# This module intentionally follows the same patterns as ahb_materializer.py
+
+import uuid
+from collections.abc import Iterable
+from typing import Any
+
+try:
+    from sqlalchemy.engine import Connection
+except ImportError as import_error:
+    import_error.msg += "; Did you install fundamend[sqlmodels] or did you try to import from fundamend.models instead?"
+    # sqlmodel is only an optional dependency when fundamend is used to fill a database
+    raise
+
+from fundamend.models.id_path import id_path_part
+from fundamend.sqlmodels.internals import (
+    _coalesce,
+    _HierarchyTree,
+    _ids_with_siblings,
+    _join,
+    _Row,
+    _to_sqlite,
+    _trim,
+)
+from fundamend.sqlmodels.messageimplementationguide import (
+    MessageImplementationGuide,
+    MigCode,
+    MigDataElement,
+    MigDataElementGroup,
+    MigSegment,
+    MigSegmentGroup,
+    MigSegmentGroupLink,
+)
+from fundamend.sqlmodels.mig_bulk_insert import MigRows
+
+_COLUMNS: tuple[str, ...] = (
+    "id",
+    "mig_pk",
+    "current_id",
+    "root_id",
+    "parent_id",
+    "depth",
+    "position",
+    "path",
+    "parent_path",
+    "root_order",
+    "type",
+    "source_id",
+    "sort_path",
+    "id_path",
+    "format",
+    "versionsnummer",
+    "gueltig_von",
+    "gueltig_bis",
+    "edifact_format_version",
+    "is_on_uebertragungsdatei_level",
+    "segmentgroup_id",
+    "segmentgroup_name",
+    "segmentgroup_status_std",
+    "segmentgroup_status_specification",
+    "segmentgroup_counter",
+    "segmentgroup_level",
+    "segmentgroup_max_rep_std",
+    "segmentgroup_max_rep_specification",
+    "segmentgroup_position",
+    "segment_id",
+    "segment_name",
+    "segment_status_std",
+    "segment_status_specification",
+    "segment_counter",
+    "segment_level",
+    "segment_number",
+    "segment_max_rep_std",
+    "segment_max_rep_specification",
+    "segment_example",
+    "segment_description",
+    "segment_position",
+    "dataelementgroup_id",
+    "dataelementgroup_name",
+    "dataelementgroup_description",
+    "dataelementgroup_status_std",
+    "dataelementgroup_status_specification",
+    "dataelementgroup_position",
+    "dataelement_id",
+    "dataelement_name",
+    "dataelement_description",
+    "dataelement_status_std",
+    "dataelement_status_specification",
+    "dataelement_format_std",
+    "dataelement_format_specification",
+    "dataelement_position",
+    "code_id",
+    "code_name",
+    "code_description",
+    "code_value",
+    "code_position",
+    "digest",
+    "line_name",
+    "line_status_std",
+    "line_status_specification",
+)
+"""the columns of mig_hierarchy_materialized (see create_mig_hierarchy_materialized.sql)"""
+
+_INSERT_STATEMENT = (
+    f"INSERT INTO mig_hierarchy_materialized ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' for _ in _COLUMNS)})"
+)
+
+
+def _segment_group_columns(node: _Row) -> _Row:
+    return {
+        "segmentgroup_id": node["id"],
+        "segmentgroup_name": node["name"],
+        "segmentgroup_status_std": node["status_std"],
+        "segmentgroup_status_specification": node["status_specification"],
+        "segmentgroup_counter": node["counter"],
+        "segmentgroup_level": node["level"],
+        "segmentgroup_max_rep_std": node["max_rep_std"],
+        "segmentgroup_max_rep_specification": node["max_rep_specification"],
+        "segmentgroup_position": node["position"],
+    }
+
+
+def _segment_columns(node: _Row) -> _Row:
+    return {
+        "is_on_uebertragungsdatei_level": node["is_on_uebertragungsdatei_level"],
+        "segment_id": node["id"],
+        "segment_name": node["name"],
+        "segment_status_std": node["status_std"],
+        "segment_status_specification": node["status_specification"],
+        "segment_counter": node["counter"],
+        "segment_level": node["level"],
+        "segment_number": node["number"],
+        "segment_max_rep_std": node["max_rep_std"],
+        "segment_max_rep_specification": node["max_rep_specification"],
+        "segment_example": node["example"],
+        "segment_description": node["description"],
+        "segment_position": node["position"],
+    }
+
+
+class _Flattener:
+    """
+    walks the hierarchy of a single MIG depth-first and collects the rows of mig_hierarchy_materialized.
+    The values in the rows are already converted to what SQLite stores (e.g. hex strings for UUIDs).
+    """
+
+    def __init__(self, rows: MigRows):
+        (self.mig,) = rows[MessageImplementationGuide]
+        self.tree = _HierarchyTree(
+            root_key="mig_primary_key",
+            segment_groups=rows[MigSegmentGroup],
+            segment_group_links=rows[MigSegmentGroupLink],
+            segments=rows[MigSegment],
+            data_element_groups=rows[MigDataElementGroup],
+            data_elements=rows[MigDataElement],
+            codes=rows[MigCode],
+        )
+        self.rows: list[_Row] = []
+
+    def _add_child(self, parent: _Row, node: _Row, node_type: str, id_path_part: str | None, **columns: Any) -> _Row:
+        """adds a row for node below the parent row; all columns that are not given are inherited from the parent"""
+        row = {
+            **parent,
+            "current_id": node["primary_key"].hex,
+            "parent_id": parent["current_id"],
+            "depth": parent["depth"] + 1,
+            "position": node["position"],
+            "digest": node["digest"],
+            "path": _join(parent["path"], " > ", node["name"]),
+            "parent_path": parent["path"],
+            "type": node_type,
+            "sort_path": _join(parent["sort_path"], f"{node['position']:05d}-"),
+            "id_path": _join(parent["id_path"], id_path_part),
+            **columns,
+        }
+        self.rows.append(row)
+        return row
+
+    def _add_segment_group_children(self, parent: _Row, primary_key: uuid.UUID) -> None:
+        child_segment_groups = self.tree.child_segment_groups.get(primary_key, [])
+        segments = self.tree.segments.get(primary_key, [])
+        ambiguous_segment_group_ids = _ids_with_siblings(child_segment_groups)
+        ambiguous_segment_ids = _ids_with_siblings(segments)
+        children = [
+            *(("segment_group", node) for node in child_segment_groups),
+            *(("segment", node) for node in segments),
+        ]
+        for node_type, node in sorted(children, key=lambda child: child[1]["position"]):
+            if node_type == "segment_group":
+                row = self._add_child(
+                    parent,
+                    node,
+                    "segment_group",
+                    id_path_part(
+                        node["id"],
+                        self.tree.segment_group_qualifier(node) if node["id"] in ambiguous_segment_group_ids else None,
+                        node["id"] in ambiguous_segment_group_ids,
+                    ),
+                    **_segment_group_columns(node),
+                )
+                self._add_segment_group_children(row, node["primary_key"])
+            else:
+                row = self._add_child(
+                    parent,
+                    node,
+                    "segment",
+                    id_path_part(
+                        node["id"],
+                        self.tree.segment_qualifier(node) if node["id"] in ambiguous_segment_ids else None,
+                        node["id"] in ambiguous_segment_ids,
+                    ),
+                    **_segment_columns(node),
+                )
+                self._add_segment_children(row, node["primary_key"])
+
+    def _add_segment_children(self, parent: _Row, primary_key: uuid.UUID) -> None:
+        data_element_groups = self.tree.data_element_groups.get(primary_key, [])
+        data_elements = self.tree.bare_data_elements.get(primary_key, [])
+        ambiguous_data_element_ids = _ids_with_siblings(data_elements)
+        children = [
+            *(("dataelementgroup", node) for node in data_element_groups),
+            *(("dataelement", node) for node in data_elements),
+        ]
+        for node_type, node in sorted(children, key=lambda child: child[1]["position"]):
+            if node_type == "dataelementgroup":
+                row = self._add_child(
+                    parent,
+                    node,
+                    "dataelementgroup",
+                    f"{node['id']}>",
+                    dataelementgroup_id=node["id"],
+                    dataelementgroup_name=node["name"],
+                    dataelementgroup_description=node["description"],
+                    dataelementgroup_status_std=node["status_std"],
+                    dataelementgroup_status_specification=node["status_specification"],
+                    dataelementgroup_position=node["position"],
+                )
+                self._add_data_elements(row, self.tree.grouped_data_elements.get(node["primary_key"], []))
+            else:
+                self._add_data_element(parent, node, node["id"] in ambiguous_data_element_ids)
+
+    def _add_data_elements(self, parent: _Row, data_elements: list[_Row]) -> None:
+        ambiguous_data_element_ids = _ids_with_siblings(data_elements)
+        for node in data_elements:
+            self._add_data_element(parent, node, node["id"] in ambiguous_data_element_ids)
+
+    def _add_data_element(self, parent: _Row, node: _Row, needs_qualifier: bool) -> None:
+        row = self._add_child(
+            parent,
+            node,
+            "dataelement",
+            id_path_part(node["id"], self.tree.data_element_qualifier(node), needs_qualifier),
+            dataelement_id=node["id"],
+            dataelement_name=node["name"],
+            dataelement_description=node["description"],
+            dataelement_status_std=node["status_std"],
+            dataelement_status_specification=node["status_specification"],
+            dataelement_format_std=node["format_std"],
+            dataelement_format_specification=node["format_specification"],
+            dataelement_position=node["position"],
+        )
+        for code in self.tree.codes.get(node["primary_key"], []):
+            self._add_child(
+                row,
+                code,
+                "code",
+                _join(code["value"], ">"),
+                code_id=code["primary_key"].hex,
+                code_name=code["name"],
+                code_description=code["description"],
+                code_value=code["value"],
+                code_position=code["position"],
+            )
+
+    def add_mig(self) -> None:
+        """adds the rows of all segment groups, segments, data element (group)s and codes of the MIG"""
+        primary_key = self.mig["primary_key"]
+        segment_groups = self.tree.root_segment_groups.get(primary_key, [])
+        segments = self.tree.root_segments.get(primary_key, [])
+        ambiguous_segment_group_ids = _ids_with_siblings(segment_groups)
+        ambiguous_segment_ids = _ids_with_siblings(segments)
+        metadata = {
+            "mig_pk": primary_key.hex,
+            "format": _to_sqlite(self.mig["format"]),
+            "versionsnummer": self.mig["versionsnummer"],
+            "gueltig_von": _to_sqlite(self.mig["gueltig_von"]),
+            "gueltig_bis": _to_sqlite(self.mig["gueltig_bis"]),
+            "edifact_format_version": _to_sqlite(self.mig["edifact_format_version"]),
+        }
+        roots = [*(("segment_group", node) for node in segment_groups), *(("segment", node) for node in segments)]
+        for root_order, (node_type, node) in enumerate(sorted(roots, key=lambda root: root[1]["position"]), start=1):
+            is_segment_group = node_type == "segment_group"
+            ambiguous_ids = ambiguous_segment_group_ids if is_segment_group else ambiguous_segment_ids
+            qualifier: str | None = None
+            if node["id"] in ambiguous_ids:
+                qualifier = (
+                    self.tree.segment_group_qualifier(node) if is_segment_group else self.tree.segment_qualifier(node)
+                )
+            row = {column: None for column in _COLUMNS} | metadata
+            row |= {
+                "current_id": node["primary_key"].hex,
+                "root_id": node["primary_key"].hex,
+                "depth": 0,
+                "position": node["position"],
+                "digest": node["digest"],
+                "path": node["name"],
+                "parent_path": node["name"],
+                "root_order": root_order,
+                "type": node_type,
+                "source_id": node["primary_key"].hex,
+                "sort_path": f"{node['position']:05d}-",
+                "id_path": id_path_part(node["id"], qualifier, node["id"] in ambiguous_ids),
+            }
+            if is_segment_group:
+                row |= _segment_group_columns(node)
+                self.rows.append(row)
+                self._add_segment_group_children(row, node["primary_key"])
+            else:
+                row |= _segment_columns(node)
+                self.rows.append(row)
+                self._add_segment_children(row, node["primary_key"])
+
+
+_LINE_NAME_COLUMNS = ("code_name", "dataelement_name", "dataelementgroup_name", "segment_name", "segmentgroup_name")
+_LINE_STATUS_STD_COLUMNS = (
+    "dataelement_status_std",
+    "dataelementgroup_status_std",
+    "segment_status_std",
+    "segmentgroup_status_std",
+)
+_LINE_STATUS_SPECIFICATION_COLUMNS = (
+    "dataelement_status_specification",
+    "dataelementgroup_status_specification",
+    "segment_status_specification",
+    "segmentgroup_status_specification",
+)
+
+
+def mig_rows_to_hierarchy_rows(migs_as_rows: Iterable[MigRows]) -> list[tuple[Any, ...]]:
+    """
+    computes the rows of mig_hierarchy_materialized from the raw rows of the MIGs (see mig_to_rows), ordered like
+    materialize_mig_view.sql orders them (by MIG primary key and sort_path).
+    Each row is a tuple of the values (as SQLite stores them) in the order of the table columns.
+    """
+    rows_per_mig: dict[str, list[_Row]] = {}
+    for mig_rows in migs_as_rows:
+        flattener = _Flattener(mig_rows)
+        flattener.add_mig()
+        rows_per_mig[flattener.mig["primary_key"].hex] = flattener.rows
+    inherited_columns = _COLUMNS[1:-3]  # all but id and the line_... columns
+    return [
+        (
+            uuid.uuid4().hex.upper(),  # like hex(randomblob(16))
+            *(row[column] for column in inherited_columns),
+            _trim(_coalesce(row, _LINE_NAME_COLUMNS)),
+            _trim(_coalesce(row, _LINE_STATUS_STD_COLUMNS)),
+            _trim(_coalesce(row, _LINE_STATUS_SPECIFICATION_COLUMNS)),
+        )
+        for mig_primary_key in sorted(rows_per_mig)
+        for row in rows_per_mig[mig_primary_key]
+    ]
+
+
+def insert_mig_hierarchy_rows(connection: Connection, hierarchy_rows: list[tuple[Any, ...]]) -> None:
+    """
+    inserts the rows (see mig_rows_to_hierarchy_rows) into the (existing) table mig_hierarchy_materialized.
+    The caller is responsible for committing.
+    """
+    if hierarchy_rows:
+        connection.exec_driver_sql(_INSERT_STATEMENT, hierarchy_rows)
+
+
+__all__ = ["insert_mig_hierarchy_rows", "mig_rows_to_hierarchy_rows"]
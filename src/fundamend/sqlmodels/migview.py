@@ -27,7 +27,8 @@ except ImportError as import_error:
 
 from fundamend import MessageImplementationGuide as PydanticMessageImplementationGuide
 from fundamend import MigReader
-from fundamend.sqlmodels.internals import _execute_bare_sql
+from fundamend.instrumentation import _measure_stage
+from fundamend.sqlmodels.internals import _execute_bare_sql, _vacuum
 from fundamend.sqlmodels.messageimplementationguide import MessageImplementationGuide as SqlMessageImplementationGuide
 from fundamend.sqlmodels.messageimplementationguide import (
     MigCode,
@@ -37,20 +38,40 @@ from fundamend.sqlmodels.messageimplementationguide import (
     MigSegmentGroup,
     MigSegmentGroupLink,
 )
+from fundamend.sqlmodels.mig_bulk_insert import MigRows, bulk_insert_mig_rows, mig_to_rows
+from fundamend.sqlmodels.mig_materializer import insert_mig_hierarchy_rows, mig_rows_to_hierarchy_rows
 
 _logger = logging.getLogger(__name__)
 
 
-def create_mig_view(session: Session) -> None:
+def create_mig_view(session: Session, migs_as_rows: Iterable[MigRows] | None = None) -> None:
     """
     Create a materialized view for the Message Implementation Guides using a SQLAlchemy session.
+    By default, the hierarchy is derived from the raw tables by materialize_mig_view.sql. If the raw rows (see
+    mig_to_rows) of all MIGs are provided, the hierarchy is computed from them in Python in a single pass instead (see
+    mig_materializer.py), which is faster; the resulting table is the same. The raw tables are not read in this case.
     Warning: This is only tested for SQLite!
     """
-    _execute_bare_sql(session=session, path_to_sql_commands=Path(__file__).parent / "materialize_mig_view.sql")
+    with _measure_stage("materialize_mig_view") as stage:
+        if migs_as_rows is None:
+            _execute_bare_sql(session=session, path_to_sql_commands=Path(__file__).parent / "materialize_mig_view.sql")
+        else:
+            _execute_bare_sql(
+                session=session, path_to_sql_commands=Path(__file__).parent / "create_mig_hierarchy_materialized.sql"
+            )
+            with _measure_stage("insert", MigHierarchyMaterialized.__tablename__) as insert_stage:
+                hierarchy_rows = mig_rows_to_hierarchy_rows(migs_as_rows)
+                insert_mig_hierarchy_rows(session.connection(), hierarchy_rows)
+                insert_stage.rows = len(hierarchy_rows)
+            session.commit()
+        _execute_bare_sql(
+            session=session, path_to_sql_commands=Path(__file__).parent / "index_mig_hierarchy_materialized.sql"
+        )
 
-    number_of_inserted_rows = session.scalar(
-        select(func.count(MigHierarchyMaterialized.id))  # type: ignore[arg-type] # pylint:disable=not-callable
-    )
+        number_of_inserted_rows = session.scalar(
+            select(func.count(MigHierarchyMaterialized.id))  # type: ignore[arg-type] # pylint:disable=not-callable
+        )
+        stage.rows = number_of_inserted_rows
     _logger.info(
         "Inserted %d rows into the materialized view %s",
         number_of_inserted_rows,
@@ -73,15 +94,30 @@ _after_bulk_insert_ops: list[TextClause] = [
 ]
 
 
+def _read_mig(
+    item: Path | tuple[Path, date, date | None] | tuple[Path, Literal[None], Literal[None]],
+) -> tuple[PydanticMessageImplementationGuide, date | None, date | None]:
+    """reads the MIG and returns it together with its gueltig_von and gueltig_bis date"""
+    if isinstance(item, Path):
+        return MigReader(item).read(), None, None
+    if isinstance(item, tuple):
+        return MigReader(item[0]).read(), item[1], item[2]
+    raise ValueError(f"Invalid item type in mig_files: {type(item)}")
+
+
 def create_db_and_populate_with_mig_view(
     mig_files: Iterable[Path | tuple[Path, date, date | None] | tuple[Path, Literal[None], Literal[None]]],
     drop_raw_tables: bool = False,
+    use_python_materializer: bool = False,
 ) -> Path:
     """
     Creates a SQLite database as temporary file, populates it with the MIGs provided and materializes the MIG view.
     You may provide either paths to the MIG.xml files or tuples where each Path comes with a gueltig_von and gueltig_bis
     date.
-    Optionally deletes the original tables to have a smaller db file.
+    Optionally deletes the original tables (and compacts the file with VACUUM) to have a smaller db file.
+    If use_python_materializer is True, the raw tables are filled with plain executemany INSERTs instead of the ORM and
+    the MIG view is computed in Python from the raw rows instead of by materialize_mig_view.sql (faster, same result,
+    see mig_bulk_insert.py and mig_materializer.py). Combined with drop_raw_tables, the raw tables are not even filled.
     Returns the path to the temporary database file.
     The calling code should move the file to a permanent location if needed.
     """
@@ -96,30 +132,37 @@ def create_db_and_populate_with_mig_view(
             conn.execute(_op)
         conn.commit()
 
-    with Session(bind=engine) as session:
-        sql_migs: list[SqlMessageImplementationGuide] = []
-        for item in mig_files:
-            mig: PydanticMessageImplementationGuide
-            gueltig_von: date | None
-            gueltig_bis: date | None
-            if isinstance(item, Path):
-                mig = MigReader(item).read()
-                gueltig_von = None
-                gueltig_bis = None
-            elif isinstance(item, tuple):
-                mig = MigReader(item[0]).read()
-                gueltig_von = item[1]
-                gueltig_bis = item[2]
-            else:
-                raise ValueError(f"Invalid item type in mig_files: {type(item)}")
-            sql_mig = SqlMessageImplementationGuide.from_model(mig)
-            sql_mig.gueltig_von = gueltig_von
-            sql_mig.gueltig_bis = gueltig_bis
-            if sql_mig.gueltig_von is not None:
-                sql_mig.edifact_format_version = get_edifact_format_version(sql_mig.gueltig_von)
-            sql_migs.append(sql_mig)
-        session.add_all(sql_migs)
-        session.commit()
+    migs_as_rows: list[MigRows] | None = None
+    if use_python_materializer:
+        migs_as_rows = []
+        with engine.connect() as conn:
+            for item in mig_files:
+                mig, gueltig_von, gueltig_bis = _read_mig(item)
+                with _measure_stage("orm_conversion", mig.versionsnummer):
+                    mig_rows = mig_to_rows(mig, gueltig_von, gueltig_bis)
+                migs_as_rows.append(mig_rows)
+                if drop_raw_tables:
+                    continue  # the raw rows would be deleted right after materializing the view anyway
+                with _measure_stage("insert", f"MIG {mig.versionsnummer}") as stage:
+                    bulk_insert_mig_rows(conn, mig_rows)
+                    stage.rows = sum(len(rows) for rows in mig_rows.values())
+            conn.commit()
+    else:
+        with Session(bind=engine) as session:
+            sql_migs: list[SqlMessageImplementationGuide] = []
+            for item in mig_files:
+                mig, gueltig_von, gueltig_bis = _read_mig(item)
+                with _measure_stage("orm_conversion", mig.versionsnummer):
+                    sql_mig = SqlMessageImplementationGuide.from_model(mig)
+                sql_mig.gueltig_von = gueltig_von
+                sql_mig.gueltig_bis = gueltig_bis
+                if sql_mig.gueltig_von is not None:
+                    sql_mig.edifact_format_version = get_edifact_format_version(sql_mig.gueltig_von)
+                sql_migs.append(sql_mig)
+            with _measure_stage("insert", "MIGs") as stage:
+                session.add_all(sql_migs)
+                stage.rows = len(session.new)  # including all cascaded children
+                session.commit()
 
     with engine.connect() as conn:
         for _op in _after_bulk_insert_ops:
@@ -127,7 +170,7 @@ def create_db_and_populate_with_mig_view(
         conn.commit()
 
     with Session(bind=engine) as session:
-        create_mig_view(session)
+        create_mig_view(session, migs_as_rows)
         if drop_raw_tables:
             for model_class in [
                 SqlMessageImplementationGuide,
@@ -141,6 +184,9 @@ def create_db_and_populate_with_mig_view(
                 session.execute(sqlalchemy.text(f"DROP TABLE IF EXISTS {model_class.__tablename__};"))
                 _logger.debug("Dropped %s", model_class.__tablename__)
         session.commit()
+    if drop_raw_tables:
+        _vacuum(engine)
+    engine.dispose()
 
     return sqlite_path
 
@@ -228,6 +274,10 @@ class MigHierarchyMaterialized(SQLModel, table=True):
     code_value: str | None = Field(default=None, index=True)
     code_position: int | None = Field(default=None, index=True)
 
+    # the digest of the node (segment group, segment, data element (group) or code) of this row, see
+    # FundamendBaseModel.digest: equal digests mean equal sub-trees (e.g. across format versions)
+    digest: str | None = Field(default=None, index=True)
+
     # Computed columns
     line_name: str | None = Field(default=None, index=True)
     line_status_std: str | None = Field(default=None, index=True)
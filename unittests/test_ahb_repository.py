@@ -0,0 +1,140 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from pathlib import Path
+
+import pytest
+from efoli import EdifactFormat, EdifactFormatVersion
+from sqlmodel import Session, col, create_engine, select
+
+from fundamend.sqlmodels import (
+    AhbFormatversionDiffLine,
+    AhbHierarchyMaterialized,
+    AhbPruefiDiffLine,
+    AhbRepository,
+    AsyncAhbRepository,
+    create_ahb_formatversion_diff_view,
+    create_ahb_pruefi_diff_view,
+    create_ahbtabellen_view,
+    create_db_and_populate_with_ahb_view,
+)
+from fundamend.sqlmodels.expression_view import create_and_fill_ahb_expression_table
+
+from .conftest import example_files_root
+
+
+@pytest.fixture(scope="module")
+def ahb_database() -> Path:
+    sqlite_path = create_db_and_populate_with_ahb_view(
+        [
+            (
+                example_files_root / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+                date(2023, 10, 1),
+                date(2024, 4, 3),
+            ),
+            (example_files_root / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02.xml", date(2024, 4, 3), None),
+        ]
+    )
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        create_and_fill_ahb_expression_table(session)
+        create_ahbtabellen_view(session)
+        create_ahb_formatversion_diff_view(session)
+        create_ahb_pruefi_diff_view(session)
+        session.commit()
+    engine.dispose()
+    return sqlite_path
+
+
+def test_ahb_repository_returns_the_same_lines_as_a_session(ahb_database: Path) -> None:
+    engine = create_engine(f"sqlite:///{ahb_database}")
+    with Session(bind=engine) as session:
+        expected = [
+            row.model_dump()
+            for row in session.exec(
+                select(AhbHierarchyMaterialized)
+                .where(AhbHierarchyMaterialized.pruefidentifikator == "25001")
+                .where(AhbHierarchyMaterialized.edifact_format_version == EdifactFormatVersion.FV2404)
+                .order_by(col(AhbHierarchyMaterialized.sort_path))
+            ).all()
+        ]
+    engine.dispose()
+    with AhbRepository(ahb_database) as repository:
+        actual = [row.model_dump() for row in repository.get_ahb_lines("25001", EdifactFormatVersion.FV2404)]
+        ahbtabellen_lines = repository.get_ahbtabellen_lines("25001", EdifactFormatVersion.FV2404)
+    assert any(expected)
+    assert actual == expected
+    assert any(ahbtabellen_lines)
+    assert [line.sort_path for line in ahbtabellen_lines] == sorted(line.sort_path for line in ahbtabellen_lines)
+
+
+def test_ahb_repository_node_texts(ahb_database: Path) -> None:
+    with AhbRepository(ahb_database) as repository:
+        line = next(
+            line
+            for line in repository.get_ahbtabellen_lines("25001", EdifactFormatVersion.FV2404)
+            if line.bedingung is not None
+        )
+        assert line.line_ahb_status is not None
+        assert (
+            repository.get_node_texts(line.line_ahb_status, EdifactFormat.UTILTS, EdifactFormatVersion.FV2404)
+            == line.bedingung
+        )
+        assert repository.get_node_texts("Muss [99999]", EdifactFormat.UTILTS, EdifactFormatVersion.FV2404) is None
+
+
+def test_ahb_repository_diffs(ahb_database: Path) -> None:
+    with AhbRepository(ahb_database) as repository:
+        formatversion_diff = repository.get_formatversion_diff(
+            "25001", EdifactFormatVersion.FV2310, EdifactFormatVersion.FV2404
+        )
+        changed_formatversion_diff = repository.get_formatversion_diff(
+            "25001", EdifactFormatVersion.FV2310, EdifactFormatVersion.FV2404, include_unchanged=False
+        )
+        pruefi_diff = repository.get_pruefi_diff(EdifactFormatVersion.FV2404, "25001", "25002")
+    assert any(formatversion_diff)
+    assert all(isinstance(line, AhbFormatversionDiffLine) for line in formatversion_diff)
+    assert {line.diff_status for line in changed_formatversion_diff} <= {"added", "deleted", "modified"}
+    assert len(changed_formatversion_diff) < len(formatversion_diff)
+    assert any(pruefi_diff)
+    assert all(isinstance(line, AhbPruefiDiffLine) for line in pruefi_diff)
+    assert {line.diff_status for line in pruefi_diff} != {"unchanged"}
+
+
+def test_ahb_repository_is_thread_safe(ahb_database: Path) -> None:
+    pruefis = ["25001", "25002", "25003", "25004", "25005"] * 8
+    with AhbRepository(ahb_database, pool_size=2, max_overflow=2) as repository:
+        expected = {pruefi: repository.get_ahb_lines(pruefi, EdifactFormatVersion.FV2404) for pruefi in set(pruefis)}
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda pruefi: repository.get_ahb_lines(pruefi, EdifactFormatVersion.FV2404), pruefis)
+            )
+    for pruefi, result in zip(pruefis, results, strict=True):
+        assert [row.id for row in result] == [row.id for row in expected[pruefi]]
+
+
+def test_async_ahb_repository_returns_the_same_as_the_sync_one(ahb_database: Path) -> None:
+    pruefis = ["25001", "25002", "25003", "25004", "25005"]
+
+    async def _query_concurrently() -> tuple[list[list[AhbHierarchyMaterialized]], list[AhbPruefiDiffLine]]:
+        async with AsyncAhbRepository(ahb_database, pool_size=2) as repository:
+            lines = await asyncio.gather(
+                *(repository.get_ahb_lines(pruefi, EdifactFormatVersion.FV2404) for pruefi in pruefis)
+            )
+            pruefi_diff = await repository.get_pruefi_diff(EdifactFormatVersion.FV2404, "25001", "25002")
+        return list(lines), pruefi_diff
+
+    actual_lines, actual_pruefi_diff = asyncio.run(_query_concurrently())
+    with AhbRepository(ahb_database) as repository:
+        expected_lines = [repository.get_ahb_lines(pruefi, EdifactFormatVersion.FV2404) for pruefi in pruefis]
+        expected_pruefi_diff = repository.get_pruefi_diff(EdifactFormatVersion.FV2404, "25001", "25002")
+    assert all(any(lines) for lines in actual_lines)
+    assert [[row.model_dump() for row in lines] for lines in actual_lines] == [
+        [row.model_dump() for row in lines] for lines in expected_lines
+    ]
+    assert [line.model_dump() for line in actual_pruefi_diff] == [line.model_dump() for line in expected_pruefi_diff]
+
+
+def test_ahb_repository_raises_for_missing_file(tmp_path: Path) -> None:
+    with pytest.raises(FileNotFoundError):
+        AhbRepository(tmp_path / "does_not_exist.sqlite")
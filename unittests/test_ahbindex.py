@@ -0,0 +1,77 @@
+import shutil
+from pathlib import Path
+
+import pytest
+
+from fundamend.reader import AhbIndex, AhbReader
+from fundamend.reader.xml_backend import is_lxml_available
+
+_example_ahb = Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+
+
+@pytest.fixture
+def ahb_xml_path(tmp_path: Path) -> Path:
+    """a copy of the example AHB, so that the sidecar index is not written into the example_files directory"""
+    result = tmp_path / _example_ahb.name
+    shutil.copyfile(_example_ahb, result)
+    return result
+
+
+def test_index_contains_all_pruefidentifikatoren_in_document_order(ahb_xml_path: Path) -> None:
+    index = AhbIndex(ahb_xml_path)
+    eager_reader = AhbReader(ahb_xml_path)
+    assert index.pruefidentifikatoren == [awf.pruefidentifikator for awf in eager_reader.get_anwendungsfaelle()]
+    assert ahb_xml_path.with_name(ahb_xml_path.name + ".awfindex.json").is_file()
+
+
+def test_byte_ranges_cover_exactly_one_awf(ahb_xml_path: Path) -> None:
+    index = AhbIndex(ahb_xml_path)
+    xml_bytes = ahb_xml_path.read_bytes()
+    byte_range = index.get_byte_range("25001")
+    assert byte_range is not None
+    fragment = xml_bytes[byte_range[0] : byte_range[1]]
+    assert fragment.startswith(b'<AWF Pruefidentifikator="25001"')
+    assert fragment.endswith(b"</AWF>")
+    assert index.get_byte_range("11001") is None
+
+
+@pytest.mark.parametrize("pruefidentifikator", ["25001", "25004", "25009", "11001"])
+def test_indexed_lookup_matches_full_parse(ahb_xml_path: Path, pruefidentifikator: str) -> None:
+    indexed_reader = AhbReader(ahb_xml_path, use_index=True)
+    eager_reader = AhbReader(ahb_xml_path)
+    assert indexed_reader.get_anwendungsfall(pruefidentifikator) == eager_reader.get_anwendungsfall(pruefidentifikator)
+
+
+def test_index_is_rebuilt_when_the_xml_changes(ahb_xml_path: Path) -> None:
+    index_before = AhbIndex(ahb_xml_path)
+    range_before = index_before.get_byte_range("25002")
+    assert range_before is not None
+    # prepending a comment shifts all byte offsets
+    ahb_xml_path.write_bytes(
+        ahb_xml_path.read_bytes().replace(b"<AHB ", b"<!-- a comment that shifts all offsets -->\n<AHB ", 1)
+    )
+    index_after = AhbIndex(ahb_xml_path)
+    range_after = index_after.get_byte_range("25002")
+    assert range_after is not None
+    assert range_after[0] > range_before[0]
+    assert AhbReader(ahb_xml_path, use_index=True).get_anwendungsfall("25002") == AhbReader(
+        ahb_xml_path
+    ).get_anwendungsfall("25002")
+
+
+def test_index_is_stored_at_the_given_index_path(ahb_xml_path: Path, tmp_path: Path) -> None:
+    index_path = tmp_path / "indexes" / "utilts.awfindex.json"
+    index_path.parent.mkdir()
+    indexed_reader = AhbReader(ahb_xml_path, use_index=True, index_path=index_path)
+    assert indexed_reader.get_anwendungsfall("25001") == AhbReader(ahb_xml_path).get_anwendungsfall("25001")
+    assert index_path.is_file()
+    assert not ahb_xml_path.with_name(ahb_xml_path.name + ".awfindex.json").exists()
+
+
+@pytest.mark.skipif(not is_lxml_available(), reason="lxml is not installed")
+def test_indexed_lookup_uses_the_parser_backend(ahb_xml_path: Path) -> None:
+    lxml_element = AhbIndex(ahb_xml_path, parser_backend="lxml").get_anwendungsfall_element("25001")
+    assert lxml_element is not None
+    assert type(lxml_element).__module__.startswith("lxml")
+    indexed_reader = AhbReader(ahb_xml_path, use_index=True, parser_backend="lxml")
+    assert indexed_reader.get_anwendungsfall("25001") == AhbReader(ahb_xml_path).get_anwendungsfall("25001")
@@ -1,3 +1,5 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
 from datetime import date
 from pathlib import Path
 
@@ -5,7 +7,7 @@ import pytest
 from syrupy.assertion import SnapshotAssertion
 
 from fundamend.models.anwendungshandbuch import Anwendungsfall, Anwendungshandbuch, Bedingung, Paket, UbBedingung
-from fundamend.reader import AhbReader
+from fundamend.reader import AhbReader, read_ahb_async
 
 from .conftest import is_private_submodule_checked_out
 
@@ -220,3 +222,74 @@ def test_sanitizing_all_awf_beschreibungen(snapshot: SnapshotAssertion) -> None:
     # and commit the updated .ambr file.
     distinct_beschreibungen_as_list = list(sorted(all_sanitized_awf_beschreibungen))
     snapshot.assert_match(distinct_beschreibungen_as_list)
+
+
+@pytest.mark.parametrize(
+    "ahb_xml_file_path",
+    [
+        pytest.param(
+            Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+            id="UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+        ),
+        pytest.param(
+            Path(__file__).parent
+            / "example_files"
+            / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+            id="UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+        ),
+    ],
+)
+def test_streaming_mode_yields_the_same_result(ahb_xml_file_path: Path) -> None:
+    eager_reader = AhbReader(ahb_xml_file_path)
+    streaming_reader = AhbReader(ahb_xml_file_path, streaming=True)
+    assert streaming_reader.get_publishing_date() == eager_reader.get_publishing_date()
+    assert streaming_reader.get_author() == eager_reader.get_author()
+    assert streaming_reader.get_version() == eager_reader.get_version()
+    assert streaming_reader.get_bedingungen() == eager_reader.get_bedingungen()
+    assert streaming_reader.get_ub_bedingungen() == eager_reader.get_ub_bedingungen()
+    assert streaming_reader.get_pakete() == eager_reader.get_pakete()
+    assert list(streaming_reader.iter_anwendungsfaelle()) == eager_reader.get_anwendungsfaelle()
+    assert streaming_reader.get_anwendungsfall("25001") == eager_reader.get_anwendungsfall("25001")
+    assert streaming_reader.get_anwendungsfall("11001") is None
+    assert streaming_reader.read() == eager_reader.read()
+
+
+def test_metadata_only_mode_does_not_parse_the_entire_file(monkeypatch: pytest.MonkeyPatch) -> None:
+    ahb_xml_file_path = Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+    expected = AhbReader(ahb_xml_file_path).read()
+
+    def _must_not_be_called(*_: object) -> None:
+        raise AssertionError("The entire XML should not have been parsed")
+
+    monkeypatch.setattr("fundamend.reader.ahbreader.parse_xml", _must_not_be_called)
+    metadata_reader = AhbReader(ahb_xml_file_path, metadata_only=True)
+    assert metadata_reader.get_publishing_date() == expected.veroeffentlichungsdatum
+    assert metadata_reader.get_author() == expected.autor
+    assert metadata_reader.get_version() == expected.versionsnummer
+
+
+def test_read_ahb_async_yields_the_same_result() -> None:
+    ahb_xml_file_paths = [
+        Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+        Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02.xml",
+    ]
+
+    async def _read_concurrently() -> list[Anwendungshandbuch]:
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            return list(
+                await asyncio.gather(
+                    read_ahb_async(ahb_xml_file_paths[0]),  # in the default thread pool
+                    read_ahb_async(ahb_xml_file_paths[1], executor=executor),
+                )
+            )
+
+    assert asyncio.run(_read_concurrently()) == [AhbReader(path).read() for path in ahb_xml_file_paths]
+
+
+def test_read_streamed_passes_each_anwendungsfall_to_the_callback() -> None:
+    ahb_xml_file_path = Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+    expected = AhbReader(ahb_xml_file_path).read()
+    anwendungsfaelle: list[Anwendungsfall] = []
+    actual = AhbReader(ahb_xml_file_path, streaming=True).read_streamed(anwendungsfaelle.append)
+    assert actual.anwendungsfaelle == ()
+    assert actual.model_copy(update={"anwendungsfaelle": tuple(anwendungsfaelle)}) == expected
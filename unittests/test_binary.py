@@ -0,0 +1,69 @@
+import io
+from pathlib import Path
+
+import pytest
+
+from fundamend import Anwendungshandbuch, MessageImplementationGuide
+from fundamend.binary import dump, dumps, load, loads
+from fundamend.reader import AhbReader, MigReader
+from fundamend.sanitize import sanitize_ahb
+
+from .conftest import example_files_root
+
+
+@pytest.mark.parametrize(
+    "xml_file_name",
+    [
+        pytest.param("UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"),
+        pytest.param("UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml"),
+        pytest.param("UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml"),
+    ],
+)
+def test_ahb_roundtrip(xml_file_name: str) -> None:
+    ahb = AhbReader(example_files_root / xml_file_name).read()
+    data = dumps(ahb)
+    actual = loads(data, Anwendungshandbuch)
+    assert actual == ahb
+    assert actual.model_dump_json() == ahb.model_dump_json()
+    assert len(data) < len(ahb.model_dump_json())
+
+
+@pytest.mark.parametrize(
+    "xml_file_name",
+    [
+        pytest.param("UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml"),
+        pytest.param("UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml"),
+    ],
+)
+def test_mig_roundtrip(xml_file_name: str, tmp_path: Path) -> None:
+    mig = MigReader(example_files_root / xml_file_name).read()
+    binary_file_path = tmp_path / "mig.fmb"
+    with open(binary_file_path, "wb") as binary_file:
+        dump(mig, binary_file)
+    with open(binary_file_path, "rb") as binary_file:
+        actual = load(binary_file, MessageImplementationGuide)
+    assert actual == mig
+    assert actual.model_dump_json() == mig.model_dump_json()
+
+
+def test_sanitizing_a_loaded_ahb_yields_the_same_as_sanitizing_the_read_ahb() -> None:
+    """the loaded models must not share instances that sanitize_ahb modifies in place"""
+    mig = MigReader(example_files_root / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml").read()
+    ahb = AhbReader(example_files_root / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml").read()
+    loaded_ahb = loads(dumps(ahb), Anwendungshandbuch)
+    sanitize_ahb(mig, ahb)
+    sanitize_ahb(mig, loaded_ahb)
+    assert loaded_ahb == ahb
+
+
+def test_loads_raises_for_invalid_data() -> None:
+    mig = MigReader(example_files_root / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml").read()
+    data = dumps(mig)
+    with pytest.raises(ValueError, match="not in the fundamend binary format"):
+        loads(b"XYZ" + data[3:], MessageImplementationGuide)
+    with pytest.raises(ValueError, match="but a Anwendungshandbuch was expected"):
+        loads(data, Anwendungshandbuch)
+    with pytest.raises(ValueError, match="truncated"):
+        loads(data[:-8], MessageImplementationGuide)
+    with pytest.raises(ValueError, match="trailing"):
+        load(io.BytesIO(data + data[-4:]), MessageImplementationGuide)
@@ -0,0 +1,105 @@
+import os
+import shutil
+import zlib
+from pathlib import Path
+
+import pytest
+
+from fundamend.cache import ModelCache, load_ahb, load_mig
+from fundamend.reader import AhbReader, MigReader
+
+_example_files = Path(__file__).parent / "example_files"
+_example_ahb = _example_files / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+_example_mig = _example_files / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml"
+
+
+def _cache_entries(cache_dir: Path) -> list[Path]:
+    return sorted(cache_dir.glob("*.fundamend-cache"))
+
+
+def test_warm_load_does_not_parse_the_xml(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cold = load_ahb(_example_ahb, cache_dir=tmp_path)
+    assert cold == AhbReader(_example_ahb).read()
+    assert len(_cache_entries(tmp_path)) == 1
+
+    def _must_not_be_called(_: AhbReader) -> None:
+        raise AssertionError("The XML should not have been parsed again")
+
+    monkeypatch.setattr(AhbReader, "read", _must_not_be_called)
+    warm = load_ahb(_example_ahb, cache_dir=tmp_path)
+    assert warm == cold
+
+
+def test_mig_is_cached_separately_from_ahb(tmp_path: Path) -> None:
+    ahb = load_ahb(_example_ahb, cache_dir=tmp_path)
+    mig = load_mig(_example_mig, cache_dir=tmp_path)
+    assert mig == MigReader(_example_mig).read()
+    assert load_mig(_example_mig, cache_dir=tmp_path) == mig
+    assert load_ahb(_example_ahb, cache_dir=tmp_path) == ahb
+    assert len(_cache_entries(tmp_path)) == 2
+
+
+def test_cache_key_is_the_content_not_the_path(tmp_path: Path) -> None:
+    cache_dir = tmp_path / "cache"
+    copied_xml = tmp_path / "renamed.xml"
+    shutil.copyfile(_example_ahb, copied_xml)
+    load_ahb(_example_ahb, cache_dir=cache_dir)
+    load_ahb(copied_xml, cache_dir=cache_dir)
+    assert len(_cache_entries(cache_dir)) == 1
+    with open(copied_xml, "ab") as xml_file:
+        xml_file.write(b"\n")  # still the same AHB, but a different content hash
+    load_ahb(copied_xml, cache_dir=cache_dir)
+    assert len(_cache_entries(cache_dir)) == 2
+
+
+def test_broken_cache_entry_is_replaced(tmp_path: Path) -> None:
+    expected = load_ahb(_example_ahb, cache_dir=tmp_path)
+    (cache_entry,) = _cache_entries(tmp_path)
+    cache_entry.write_bytes(b"garbage")
+    assert load_ahb(_example_ahb, cache_dir=tmp_path) == expected
+    assert cache_entry.read_bytes() != b"garbage"
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        pytest.param(b"\x80\x09K\x01.", id="ValueError"),  # unsupported pickle protocol
+        pytest.param(b"cbuiltins\nint\n(X\x01\x00\x00\x00aX\x01\x00\x00\x00bX\x01\x00\x00\x00ctR.", id="TypeError"),
+        pytest.param(b"c_operator\ngetitem\n(}X\x01\x00\x00\x00xtR.", id="KeyError"),  # {}["x"]
+    ],
+)
+def test_cache_entry_with_a_broken_pickle_is_replaced(tmp_path: Path, payload: bytes) -> None:
+    expected = load_ahb(_example_ahb, cache_dir=tmp_path)
+    (cache_entry,) = _cache_entries(tmp_path)
+    cache_entry.write_bytes(zlib.compress(payload))
+    assert load_ahb(_example_ahb, cache_dir=tmp_path) == expected
+    assert zlib.decompress(cache_entry.read_bytes()) != payload
+
+
+def test_cache_entry_is_used_even_if_it_cannot_be_touched(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """e.g. a read-only (shared) cache directory: the LRU touch fails, but the entry itself is valid"""
+    cold = load_ahb(_example_ahb, cache_dir=tmp_path)
+
+    def _read_only_utime(path: Path) -> None:
+        raise PermissionError(f"Operation not permitted: {path}")
+
+    def _must_not_be_called(_: AhbReader) -> None:
+        raise AssertionError("The XML should not have been parsed again")
+
+    monkeypatch.setattr(os, "utime", _read_only_utime)
+    monkeypatch.setattr(AhbReader, "read", _must_not_be_called)
+    assert load_ahb(_example_ahb, cache_dir=tmp_path) == cold
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path: Path) -> None:
+    unbounded_cache = ModelCache(tmp_path)
+    unbounded_cache.load_ahb(_example_ahb)
+    (ahb_entry,) = _cache_entries(tmp_path)
+    os.utime(ahb_entry, (0, 0))  # independent of the mtime resolution of the file system
+    # the cache is too small for both entries; the AHB has been used less recently than the MIG
+    bounded_cache = ModelCache(tmp_path, max_size_bytes=ahb_entry.stat().st_size + 1)
+    bounded_cache.load_mig(_example_mig)
+    (remaining_entry,) = _cache_entries(tmp_path)
+    assert remaining_entry.name.startswith("mig_")
+    bounded_cache.clear()
+    assert not _cache_entries(tmp_path)
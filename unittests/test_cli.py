@@ -1,9 +1,13 @@
+import json
 import shutil
 from collections.abc import Iterator
 from pathlib import Path
 
 import pytest
 
+from fundamend import AhbReader, MigReader
+from fundamend.sanitize import sanitize_ahb
+
 _should_skip_typer_based_tests = False
 try:
     from typer.testing import CliRunner
@@ -132,3 +136,92 @@ def test_cli_directory_with_sanitize_compressed_splitted(example_files_fehlerkor
     shutil.rmtree(ahb_path.with_suffix(""))  # Clean up the created JSON file after the test
     mig_json_copy.with_suffix(".json").unlink()  # Clean up the copied JSON files after the test
     shutil.rmtree(ahb_json_copy.with_suffix(""))  # Clean up the copied JSON files after the test
+
+
+def test_cli_directory_in_parallel_reports_failures(example_files_lesefassung: Path) -> None:
+    if _should_skip_typer_based_tests:
+        pytest.skip("Seems like typer is not installed")
+    mig_path = example_files_lesefassung / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml"
+    ahb_path = example_files_lesefassung / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+    # a second pair (with another format in the file name) and a broken pair
+    other_mig_path = shutil.copyfile(mig_path, example_files_lesefassung / "IFTSTA_MIG_1.1c.xml")
+    other_ahb_path = shutil.copyfile(ahb_path, example_files_lesefassung / "IFTSTA_AHB_1.1c.xml")
+    (example_files_lesefassung / "ORDERS_MIG_kaputt.xml").write_text("<not xml", encoding="utf-8")
+    (example_files_lesefassung / "ORDERS_AHB_kaputt.xml").write_text("<not xml", encoding="utf-8")
+
+    with pytest.raises(RuntimeError, match="1 of 3 MIG/AHB pairs could not be converted"):
+        runner.invoke(app, ["-j", "2", "--xml-path", str(example_files_lesefassung.absolute())], catch_exceptions=False)
+    for path in [mig_path, ahb_path, other_mig_path, other_ahb_path]:
+        assert path.with_suffix(".json").is_file()
+    assert json.loads(other_ahb_path.with_suffix(".json").read_text(encoding="utf-8")) == json.loads(
+        ahb_path.with_suffix(".json").read_text(encoding="utf-8")
+    )
+
+
+def test_cli_directory_incremental(example_files_lesefassung: Path) -> None:
+    if _should_skip_typer_based_tests:
+        pytest.skip("Seems like typer is not installed")
+    mig_path = example_files_lesefassung / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml"
+    ahb_path = example_files_lesefassung / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+    arguments = ["-ai", "--xml-path", str(example_files_lesefassung.absolute())]
+
+    result = runner.invoke(app, arguments, catch_exceptions=False)
+    assert result.exit_code == 0
+    assert (example_files_lesefassung / ".xml2json_manifest.json").is_file()
+    json_files = [mig_path.with_suffix(".json"), *ahb_path.with_suffix("").glob("*.json")]
+    modification_times = {file: file.stat().st_mtime_ns for file in json_files}
+
+    result = runner.invoke(app, arguments, catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "UP TO DATE" in result.output
+    assert {file: file.stat().st_mtime_ns for file in json_files} == modification_times
+
+    # only the JSON file of the changed Prüfidentifikator is rewritten
+    ahb_path.write_text(
+        ahb_path.read_text(encoding="utf-8").replace(
+            'Pruefidentifikator="25001" Beschreibung="Berechnungsformel"',
+            'Pruefidentifikator="25001" Beschreibung="Geänderte Berechnungsformel"',
+        ),
+        encoding="utf-8",
+    )
+    result = runner.invoke(app, arguments, catch_exceptions=False)
+    assert result.exit_code == 0
+    assert "UP TO DATE" not in result.output
+    changed_files = {file for file in json_files if file.stat().st_mtime_ns != modification_times[file]}
+    assert changed_files == {ahb_path.with_suffix("") / "25001.json"}
+    assert "Geänderte Berechnungsformel" in (ahb_path.with_suffix("") / "25001.json").read_text(encoding="utf-8")
+
+    # other options invalidate the manifest
+    result = runner.invoke(app, ["-c", *arguments], catch_exceptions=False)
+    assert "UP TO DATE" not in result.output
+
+
+@pytest.mark.parametrize("sanitize", [False, True])
+def test_cli_split_ahb_streaming_yields_the_same_as_the_in_memory_model(
+    example_files_fehlerkorrektur: Path, sanitize: bool
+) -> None:
+    if _should_skip_typer_based_tests:
+        pytest.skip("Seems like typer is not installed")
+    mig_path = example_files_fehlerkorrektur / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml"
+    ahb_path = example_files_fehlerkorrektur / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml"
+    mig = MigReader(mig_path).read()
+    ahb = AhbReader(ahb_path).read()
+    if sanitize:
+        sanitize_ahb(mig, ahb)
+
+    result = runner.invoke(
+        app, ["-ap" if not sanitize else "-sap", str(example_files_fehlerkorrektur.absolute())], catch_exceptions=False
+    )
+    assert result.exit_code == 0
+    assert mig_path.with_suffix(".json").read_text(encoding="utf-8") == mig.model_dump_json(indent=2)
+    ahb_dir = ahb_path.with_suffix("")
+    assert {file.name for file in ahb_dir.glob("*.json")} == {"meta.json"} | {
+        f"{anwendungsfall.pruefidentifikator}.json" for anwendungsfall in ahb.anwendungsfaelle
+    }
+    for anwendungsfall in ahb.anwendungsfaelle:
+        assert (ahb_dir / f"{anwendungsfall.pruefidentifikator}.json").read_text(
+            encoding="utf-8"
+        ) == anwendungsfall.model_dump_json(indent=2)
+    assert (ahb_dir / "meta.json").read_text(encoding="utf-8") == ahb.model_dump_json(
+        exclude={"anwendungsfaelle"}, indent=2
+    )
@@ -0,0 +1,54 @@
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+
+from fundamend.models.anwendungshandbuch import Code
+from fundamend.reader import AhbReader, MigReader
+from fundamend.reader.construction import is_strict_validation_enabled, strict_validation, trusted_constructor
+
+from .conftest import example_files_root
+
+_ahb_files = sorted(example_files_root.glob("*_AHB_*.xml"))
+_mig_files = sorted(example_files_root.glob("*_MIG_*.xml"))
+
+
+@pytest.mark.parametrize("ahb_xml_file_path", [pytest.param(p, id=p.name) for p in _ahb_files])
+def test_trusted_and_validated_construction_yield_identical_ahbs(ahb_xml_file_path: Path) -> None:
+    with strict_validation():
+        validated_ahb = AhbReader(ahb_xml_file_path).read()
+    with strict_validation(enabled=False):
+        trusted_ahb = AhbReader(ahb_xml_file_path).read()
+    assert trusted_ahb == validated_ahb
+    assert trusted_ahb.model_dump_json() == validated_ahb.model_dump_json()
+    assert trusted_ahb.digest == validated_ahb.digest
+
+
+@pytest.mark.parametrize("mig_xml_file_path", [pytest.param(p, id=p.name) for p in _mig_files])
+def test_trusted_and_validated_construction_yield_identical_migs(mig_xml_file_path: Path) -> None:
+    with strict_validation():
+        validated_mig = MigReader(mig_xml_file_path).read()
+    with strict_validation(enabled=False):
+        trusted_mig = MigReader(mig_xml_file_path).read()
+    assert trusted_mig == validated_mig
+    assert trusted_mig.model_dump_json() == validated_mig.model_dump_json()
+    assert trusted_mig.digest == validated_mig.digest
+
+
+def test_strict_validation_rejects_what_the_trusted_constructor_accepts() -> None:
+    new_code = trusted_constructor(Code)
+    with strict_validation(enabled=False):
+        assert not is_strict_validation_enabled()
+        code = new_code(name="Nachricht", description=None, value="Z36", ahb_status="X")
+        assert code == Code(name="Nachricht", description=None, value="Z36", ahb_status="X")
+        assert code.model_fields_set == {"name", "description", "value", "ahb_status"}
+        unvalidated_code = new_code(name="Nachricht", description=None, value=36, ahb_status="X")
+        assert unvalidated_code.value == 36  # type:ignore[comparison-overlap]
+    with strict_validation():
+        assert is_strict_validation_enabled()
+        with pytest.raises(ValidationError):
+            new_code(name="Nachricht", description=None, value=36, ahb_status="X")
+        with pytest.raises(TypeError):
+            new_code(name="Nachricht", value="Z36", description=None, ahb_status="X")  # wrong order
+        with pytest.raises(TypeError):
+            new_code(name="Nachricht", value="Z36", ahb_status="X")  # the default description is not filled in
@@ -0,0 +1,111 @@
+from collections.abc import Iterator
+
+import pytest
+from sqlmodel import Session, create_engine, select
+
+from fundamend import AhbReader, MigReader
+from fundamend.models.anwendungshandbuch import Anwendungsfall, Segment, SegmentGroup
+from fundamend.models.base import FundamendBaseModel
+from fundamend.sanitize import sanitize_ahb
+from fundamend.sqlmodels import (
+    AhbHierarchyMaterialized,
+    MigHierarchyMaterialized,
+    create_db_and_populate_with_ahb_view,
+    create_db_and_populate_with_mig_view,
+)
+
+from .conftest import example_files_root
+
+_ahb_path = example_files_root / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml"
+_mig_path = example_files_root / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml"
+
+
+def _descendants(model: FundamendBaseModel) -> Iterator[FundamendBaseModel]:
+    """yields the segment groups, segments, data element (group)s and codes below the given model"""
+    for field_name in ("elements", "data_elements", "codes"):
+        for child in getattr(model, field_name, ()):
+            yield child
+            yield from _descendants(child)
+
+
+def test_digest_reflects_the_content() -> None:
+    ahb = AhbReader(_ahb_path).read()
+    assert ahb.digest == AhbReader(_ahb_path).read().digest
+    assert ahb.digest is ahb.digest  # cached
+    assert hash(ahb) == hash(AhbReader(_ahb_path).read())
+    first_anwendungsfall, second_anwendungsfall = ahb.anwendungsfaelle[:2]
+    assert first_anwendungsfall.digest != second_anwendungsfall.digest
+    assert first_anwendungsfall.elements[0] == second_anwendungsfall.elements[0]
+    assert first_anwendungsfall.elements[0].digest == second_anwendungsfall.elements[0].digest
+    digests_by_model = {model.digest: model for model in _descendants(first_anwendungsfall)}
+    for model in _descendants(first_anwendungsfall):
+        assert digests_by_model[model.digest] == model  # no collisions between unequal models
+
+    segment = next(model for model in _descendants(first_anwendungsfall) if isinstance(model, Segment))
+    modified_segment = segment.model_copy(update={"ahb_status": "X [2499]"})
+    assert modified_segment.digest != segment.digest
+    assert segment.model_copy().digest == segment.digest
+
+
+def test_digest_depends_on_the_order_of_the_elements() -> None:
+    segment_group = next(
+        model
+        for model in _descendants(AhbReader(_ahb_path).read().anwendungsfaelle[0])
+        if isinstance(model, SegmentGroup)
+    )
+    assert len(segment_group.elements) > 1
+    reversed_segment_group = segment_group.model_copy(update={"elements": segment_group.elements[::-1]})
+    assert reversed_segment_group.digest != segment_group.digest
+
+
+def test_sanitize_ahb_discards_the_cached_digests() -> None:
+    mig = MigReader(_mig_path).read()
+    ahb = AhbReader(_ahb_path).read()
+    digests_before_sanitizing = [anwendungsfall.digest for anwendungsfall in ahb.anwendungsfaelle]
+    _ = mig.digest
+    sanitize_ahb(mig, ahb)
+    expected_mig = MigReader(_mig_path).read()
+    expected_ahb = AhbReader(_ahb_path).read()
+    sanitize_ahb(expected_mig, expected_ahb)
+    assert [anwendungsfall.digest for anwendungsfall in ahb.anwendungsfaelle] == [
+        anwendungsfall.digest for anwendungsfall in expected_ahb.anwendungsfaelle
+    ]
+    assert [anwendungsfall.digest for anwendungsfall in ahb.anwendungsfaelle] != digests_before_sanitizing
+    assert mig.digest == expected_mig.digest
+
+
+@pytest.mark.parametrize("use_python_materializer", [False, True])
+def test_materialized_ahb_view_contains_the_digests(use_python_materializer: bool) -> None:
+    anwendungsfaelle: list[Anwendungsfall] = [
+        anwendungsfall
+        for anwendungsfall in AhbReader(_ahb_path).read().anwendungsfaelle
+        if not anwendungsfall.is_outdated
+    ]
+    sqlite_path = create_db_and_populate_with_ahb_view(
+        ahb_files=[_ahb_path], use_python_materializer=use_python_materializer
+    )
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        rows = session.exec(select(AhbHierarchyMaterialized)).all()
+    engine.dispose()
+    for anwendungsfall in anwendungsfaelle:
+        expected_root_digests = [element.digest for element in anwendungsfall.elements]
+        actual_root_digests = [
+            row.digest
+            for row in sorted(rows, key=lambda row: row.sort_path)
+            if row.pruefidentifikator == anwendungsfall.pruefidentifikator and row.depth == 0
+        ]
+        assert actual_root_digests == expected_root_digests
+    assert {row.digest for row in rows} == {
+        model.digest for anwendungsfall in anwendungsfaelle for model in _descendants(anwendungsfall)
+    }
+
+
+def test_materialized_mig_view_contains_the_digests() -> None:
+    mig = MigReader(_mig_path).read()
+    sqlite_path = create_db_and_populate_with_mig_view(mig_files=[_mig_path])
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        digests = set(session.exec(select(MigHierarchyMaterialized.digest)).all())
+    engine.dispose()
+    assert digests == {model.digest for model in _descendants(mig)}
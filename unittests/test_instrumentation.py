@@ -0,0 +1,59 @@
+import tracemalloc
+from datetime import date
+from pathlib import Path
+
+from fundamend import AhbReader
+from fundamend.instrumentation import StageEvent, _measure_stage, report_stages
+from fundamend.sqlmodels import create_db_and_populate_with_ahb_view
+
+_example_ahb = Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml"
+
+
+def test_stages_of_the_ahb_db_build_are_reported() -> None:
+    events: list[StageEvent] = []
+    with report_stages(events.append):
+        create_db_and_populate_with_ahb_view([(_example_ahb, date(2023, 10, 1), None)], use_bulk_insert=True)
+    stages = {event.stage for event in events}
+    assert {"xml_parse", "model_build", "orm_conversion", "insert", "sql_statement", "materialize_ahb_view"} <= stages
+    (materialization,) = [event for event in events if event.stage == "materialize_ahb_view"]
+    assert materialization.rows is not None and materialization.rows > 0
+    sql_statements = [event for event in events if event.stage == "sql_statement"]
+    assert {event.detail.split(": ")[0] for event in sql_statements if event.detail} == {
+        "materialize_ahb_view.sql",
+        "index_ahb_hierarchy_materialized.sql",
+    }
+    assert not any("--" in event.detail for event in sql_statements if event.detail)  # comments are stripped
+    # the statements are nested inside the materialization
+    assert sum(event.seconds for event in sql_statements) <= materialization.seconds
+    assert all(event.peak_memory_bytes is None for event in events)  # tracemalloc is not tracing
+
+
+def test_nothing_is_reported_outside_of_report_stages() -> None:
+    events: list[StageEvent] = []
+    with report_stages(events.append):
+        pass
+    AhbReader(_example_ahb).read()
+    assert not events
+
+
+def test_peak_memory_of_nested_stages() -> None:
+    events: list[StageEvent] = []
+    tracemalloc.start()
+    try:
+        with report_stages(events.append):
+            with _measure_stage("outer") as outer:
+                with _measure_stage("inner"):
+                    large_list = [0] * 1_000_000
+                del large_list
+                with _measure_stage("small"):
+                    pass
+                outer.rows = 2
+    finally:
+        tracemalloc.stop()
+    inner, small, outer_event = events
+    assert (inner.stage, small.stage, outer_event.stage) == ("inner", "small", "outer")
+    assert outer_event.rows == 2
+    assert inner.peak_memory_bytes is not None and inner.peak_memory_bytes >= 8_000_000
+    assert small.peak_memory_bytes is not None and small.peak_memory_bytes < inner.peak_memory_bytes
+    # the peak of the inner stage counts for the outer stage, too
+    assert outer_event.peak_memory_bytes is not None and outer_event.peak_memory_bytes >= inner.peak_memory_bytes
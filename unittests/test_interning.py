@@ -0,0 +1,88 @@
+from fundamend.interning import ModelInterner
+from fundamend.models.messageimplementationguide import Code, DataElementGroup, MessageImplementationGuide, Segment
+from fundamend.reader import AhbReader, MigReader
+from fundamend.sanitize import sanitize_ahb
+
+from .conftest import example_files_root
+
+_ahb_path = example_files_root / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml"
+_mig_path = example_files_root / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml"
+
+
+def _read_mig_with_example_code() -> MessageImplementationGuide:
+    """the example MIG has no example codes (which sanitize_ahb removes from the MIG), so we add one to UNH C_S009"""
+    mig = MigReader(_mig_path).read()
+    unh = mig.elements[0]
+    assert isinstance(unh, Segment)
+    data_element_group = unh.data_elements[1]
+    assert isinstance(data_element_group, DataElementGroup)
+    data_element = data_element_group.data_elements[0]  # D_0065
+    example_code = Code(name="Beispielcode", description=None, value="X")
+    object.__setattr__(data_element, "codes", (*data_element.codes, example_code))
+    return mig
+
+
+def test_interned_models_are_equal_and_share_their_sub_trees() -> None:
+    interner = ModelInterner()
+    ahb = interner.intern(AhbReader(_ahb_path).read())
+    mig = interner.intern(MigReader(_mig_path).read())
+    assert ahb == AhbReader(_ahb_path).read()
+    assert mig == MigReader(_mig_path).read()
+    first_anwendungsfall, second_anwendungsfall = ahb.anwendungsfaelle[:2]
+    assert first_anwendungsfall.elements[0] == second_anwendungsfall.elements[0]
+    assert first_anwendungsfall.elements[0] is second_anwendungsfall.elements[0]  # e.g. both UNH segments
+
+    # a second read of the same file shares everything with the first one
+    assert interner.intern(AhbReader(_ahb_path, streaming=True).read()) is ahb
+    anwendungsfall = AhbReader(_ahb_path).get_anwendungsfall("25001")
+    assert anwendungsfall is not None
+    assert interner.intern(anwendungsfall) is first_anwendungsfall
+
+
+def test_sanitized_ahb_can_be_interned() -> None:
+    """sanitize_ahb disables the hash of the models it modifies; that must not stop the interning"""
+    mig = MigReader(_mig_path).read()
+    ahb = AhbReader(_ahb_path).read()
+    sanitize_ahb(mig, ahb)
+    expected = AhbReader(_ahb_path).read()
+    sanitize_ahb(mig, expected)
+    interner = ModelInterner()
+    assert interner.intern(ahb) == expected
+    assert len(interner) > 0
+    interner.clear()
+    assert len(interner) == 0
+
+
+def test_read_sanitize_and_read_again_with_the_same_interner() -> None:
+    interner = ModelInterner()
+    mig = MigReader(_mig_path).read()
+    ahb = AhbReader(_ahb_path).read()
+    sanitize_ahb(mig, ahb)
+    interner.intern(mig)
+    sanitized_ahb = interner.intern(ahb)
+    unsanitized_ahb = AhbReader(_ahb_path).read()
+    assert unsanitized_ahb != sanitized_ahb
+    reread_ahb = interner.intern(AhbReader(_ahb_path).read())
+    assert reread_ahb is not sanitized_ahb
+    assert reread_ahb == unsanitized_ahb  # no sanitized fragments mixed in
+
+
+def test_models_modified_after_interning_are_not_handed_out_anymore() -> None:
+    """the wrong order (intern, then sanitize) must at least not spoil later reads"""
+    interner = ModelInterner()
+    mig = MigReader(_mig_path).read()
+    ahb = interner.intern(AhbReader(_ahb_path).read())
+    sanitize_ahb(mig, ahb)
+    reread_ahb = interner.intern(AhbReader(_ahb_path).read())
+    assert reread_ahb is not ahb
+    assert reread_ahb == AhbReader(_ahb_path).read()
+
+
+def test_sanitizing_a_mig_does_not_change_other_interned_migs() -> None:
+    interner = ModelInterner()
+    other_mig = interner.intern(_read_mig_with_example_code())
+    mig = _read_mig_with_example_code()
+    sanitize_ahb(mig, AhbReader(_ahb_path).read())
+    mig = interner.intern(mig)
+    assert other_mig == _read_mig_with_example_code()
+    assert mig != other_mig  # the example code is gone
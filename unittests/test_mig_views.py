@@ -5,24 +5,38 @@ Tests for MIG hierarchy and diff views
 from collections.abc import Generator
 from datetime import date
 from pathlib import Path
+from typing import Any
 
 import pytest
 import sqlalchemy.exc
 from efoli import EdifactFormatVersion
+from sqlalchemy import text
 from sqlmodel import Session, SQLModel, create_engine, select
 from syrupy.assertion import SnapshotAssertion
 
+from fundamend import MessageImplementationGuide as PydanticMessageImplementationGuide
 from fundamend import MigReader
 from fundamend.sqlmodels import MessageImplementationGuide as SqlMessageImplementationGuide
 from fundamend.sqlmodels import (
+    MigCode,
+    MigDataElement,
+    MigDataElementGroup,
     MigDiffLine,
     MigHierarchyMaterialized,
+    MigSegment,
+    MigSegmentGroup,
     create_db_and_populate_with_mig_view,
     create_mig_diff_view,
     create_mig_view,
 )
+from fundamend.sqlmodels.mig_bulk_insert import bulk_insert_mig_rows, mig_to_rows
 
-from .conftest import cached_mig_db, is_private_submodule_checked_out, private_submodule_root
+from .conftest import (
+    apply_throwaway_sqlite_pragmas,
+    cached_mig_db,
+    is_private_submodule_checked_out,
+    private_submodule_root,
+)
 
 
 @pytest.fixture()
@@ -328,3 +342,146 @@ def test_mig_diff_snapshot_iftsta(snapshot: SnapshotAssertion) -> None:
 
     raw_results = [r.model_dump(mode="json", exclude_none=True) for r in results]
     snapshot.assert_match(raw_results)
+
+
+# one format version per MIG; otherwise the '#n' counters of id_paths that occur in multiple MIGs are random
+_MIG_FILES_WITH_VALIDITY: list[tuple[Path, date, date | None]] = [
+    (
+        Path(__file__).parent / "example_files" / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml",
+        date(2023, 10, 1),
+        date(2024, 4, 3),
+    ),
+    (
+        Path(__file__).parent
+        / "example_files"
+        / "UTILTS_MIG_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+        date(2024, 4, 3),
+        date(2024, 10, 1),
+    ),
+    (
+        Path(__file__).parent / "example_files" / "UTILTS_MIG_1_1e_Fehlerkorrektur_20241018.xml",
+        date(2024, 10, 1),
+        None,
+    ),
+]
+
+
+def _materialized_table(session: Session) -> tuple[list[tuple[Any, ...]], list[tuple[Any, ...]]]:
+    """the columns (with their declared types) and all rows but the random id of mig_hierarchy_materialized"""
+    columns = [tuple(row) for row in session.execute(text("PRAGMA table_info(mig_hierarchy_materialized)")).all()]
+    column_names = ", ".join(column[1] for column in columns if column[1] != "id")
+    rows = session.execute(text(f"SELECT {column_names} FROM mig_hierarchy_materialized ORDER BY rowid")).all()
+    return columns, [tuple(row) for row in rows]
+
+
+@pytest.mark.parametrize(
+    "mig_files",
+    [
+        pytest.param(_MIG_FILES_WITH_VALIDITY, id="example files"),
+        pytest.param(None, id="private submodule"),
+    ],
+)
+def test_python_materializer_yields_the_same_rows_as_the_sql_script(
+    mig_files: list[tuple[Path, date, date | None]] | None, tmp_path: Path
+) -> None:
+    if mig_files is None:
+        if not is_private_submodule_checked_out():
+            pytest.skip("Skipping test because of missing private submodule")
+        mig_files = [
+            (p, date(2024, 10, 1), date(2025, 6, 6)) for p in (private_submodule_root / "FV2410").rglob("**/*MIG*.xml")
+        ] + [(p, date(2025, 6, 6), None) for p in (private_submodule_root / "FV2504").rglob("**/*MIG*.xml")]
+    migs_as_rows = [
+        mig_to_rows(MigReader(path).read(), gueltig_von, gueltig_bis) for path, gueltig_von, gueltig_bis in mig_files
+    ]
+    engine = create_engine(f"sqlite:///{tmp_path / 'migs.sqlite'}")
+    apply_throwaway_sqlite_pragmas(engine)
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as connection:
+        for mig_rows in migs_as_rows:
+            bulk_insert_mig_rows(connection, mig_rows)
+        connection.commit()
+    with Session(bind=engine) as session:
+        create_mig_view(session)
+        sql_columns, sql_rows = _materialized_table(session)
+        create_mig_view(session, migs_as_rows)
+        python_columns, python_rows = _materialized_table(session)
+        indexes = session.execute(
+            text("SELECT name FROM sqlite_master WHERE tbl_name = 'mig_hierarchy_materialized' AND type = 'index'")
+        ).all()
+    engine.dispose()
+    assert len(sql_rows) > 1000
+    assert python_columns == sql_columns
+    assert python_rows == sql_rows  # row for row, in the same order, with the same id_paths (incl. '#n' counters)
+    assert len(indexes) > 30
+
+
+def _canonical_raw_table_rows(sqlite_path: Path) -> dict[str, list[tuple[Any, ...]]]:
+    """all rows of all raw MIG tables without the (random) primary and foreign keys, sorted"""
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    result: dict[str, list[tuple[Any, ...]]] = {}
+    with engine.connect() as connection:
+        for model_class in [
+            SqlMessageImplementationGuide,
+            MigSegmentGroup,
+            MigSegment,
+            MigDataElementGroup,
+            MigDataElement,
+            MigCode,
+        ]:
+            table = model_class.__table__  # type: ignore[attr-defined]
+            columns = [c for c in table.columns if not c.foreign_keys and not c.primary_key]
+            rows = connection.execute(sqlalchemy.select(*columns)).all()
+            result[table.name] = sorted((tuple(row) for row in rows), key=repr)
+    engine.dispose()
+    return result
+
+
+def _materialized_rows_without_ids(sqlite_path: Path) -> list[tuple[Any, ...]]:
+    """the rows of mig_hierarchy_materialized without the (random) ids and primary keys in a reproducible order"""
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        rows = session.execute(
+            text(
+                "SELECT depth, position, path, id_path, type, sort_path, versionsnummer, gueltig_von, line_name, "
+                "line_status_std, line_status_specification FROM mig_hierarchy_materialized "
+                "ORDER BY gueltig_von, sort_path"
+            )
+        ).all()
+    engine.dispose()
+    return [tuple(row) for row in rows]
+
+
+def test_create_db_and_populate_with_mig_view_using_python_materializer() -> None:
+    orm_sqlite_path = create_db_and_populate_with_mig_view(mig_files=_MIG_FILES_WITH_VALIDITY)
+    python_sqlite_path = create_db_and_populate_with_mig_view(
+        mig_files=_MIG_FILES_WITH_VALIDITY, use_python_materializer=True
+    )
+    orm_raw_tables = _canonical_raw_table_rows(orm_sqlite_path)
+    assert orm_raw_tables["migcode"]
+    assert _canonical_raw_table_rows(python_sqlite_path) == orm_raw_tables
+    # the foreign keys are not part of the comparison above, but the structure is: we read the MIGs back
+    models_by_path: dict[Path, list[PydanticMessageImplementationGuide]] = {}
+    for sqlite_path in [orm_sqlite_path, python_sqlite_path]:
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        with Session(bind=engine) as session:
+            sql_migs = session.exec(
+                select(SqlMessageImplementationGuide).order_by(SqlMessageImplementationGuide.gueltig_von)  # type: ignore[arg-type]
+            ).all()
+            models_by_path[sqlite_path] = [sql_mig.to_model() for sql_mig in sql_migs]
+        engine.dispose()
+    assert models_by_path[python_sqlite_path] == models_by_path[orm_sqlite_path]
+    assert _materialized_rows_without_ids(python_sqlite_path) == _materialized_rows_without_ids(orm_sqlite_path)
+
+
+def test_create_db_and_populate_with_mig_view_using_python_materializer_without_raw_tables() -> None:
+    orm_sqlite_path = create_db_and_populate_with_mig_view(mig_files=_MIG_FILES_WITH_VALIDITY, drop_raw_tables=True)
+    python_sqlite_path = create_db_and_populate_with_mig_view(
+        mig_files=_MIG_FILES_WITH_VALIDITY, drop_raw_tables=True, use_python_materializer=True
+    )
+    engine = create_engine(f"sqlite:///{python_sqlite_path}")
+    table_names = set(sqlalchemy.inspect(engine).get_table_names())
+    engine.dispose()
+    assert MigHierarchyMaterialized.__tablename__ in table_names
+    assert SqlMessageImplementationGuide.__tablename__ not in table_names
+    assert MigCode.__tablename__ not in table_names
+    assert _materialized_rows_without_ids(python_sqlite_path) == _materialized_rows_without_ids(orm_sqlite_path)
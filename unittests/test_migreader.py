@@ -1,3 +1,4 @@
+import asyncio
 from datetime import date
 from pathlib import Path
 
@@ -5,7 +6,7 @@ import pytest
 from syrupy.assertion import SnapshotAssertion
 
 from fundamend.models.messageimplementationguide import MessageImplementationGuide
-from fundamend.reader import MigReader
+from fundamend.reader import MigReader, read_mig_async
 
 
 @pytest.mark.parametrize(
@@ -118,3 +119,42 @@ def test_mig_hashable(mig_xml_file_path: Path) -> None:
     assert isinstance(hash_code, int)
     hash_collection = set()
     hash_collection.add(mig)
+
+
+def test_read_mig_async_yields_the_same_result() -> None:
+    mig_xml_file_path = Path(__file__).parent / "example_files" / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml"
+    assert asyncio.run(read_mig_async(mig_xml_file_path)) == MigReader(mig_xml_file_path).read()
+
+
+@pytest.mark.parametrize(
+    "mig_xml_file_path",
+    [
+        pytest.param(
+            Path(__file__).parent / "example_files" / "UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml",
+            id="UTILTS_MIG_1.1c_Lesefassung_2023_12_12.xml",
+        ),
+        pytest.param(
+            Path(__file__).parent
+            / "example_files"
+            / "UTILTS_MIG_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+            id="UTILTS_MIG_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+        ),
+    ],
+)
+def test_metadata_only_mode_does_not_parse_the_entire_file(
+    mig_xml_file_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    eager_reader = MigReader(mig_xml_file_path)
+    expected = eager_reader.read()
+
+    def _must_not_be_called(*_: object) -> None:
+        raise AssertionError("The entire XML should not have been parsed")
+
+    with monkeypatch.context() as patch:
+        patch.setattr("fundamend.reader.migreader.parse_xml", _must_not_be_called)
+        metadata_reader = MigReader(mig_xml_file_path, metadata_only=True)
+        assert metadata_reader.get_publishing_date() == expected.veroeffentlichungsdatum
+        assert metadata_reader.get_author() == expected.autor
+        assert metadata_reader.get_version() == expected.versionsnummer
+        assert metadata_reader.get_format() == expected.format
+    assert metadata_reader.read() == expected
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, create_engine
+
+from fundamend import AhbReader, MigReader
+from fundamend.models.anwendungshandbuch import Code, DataElement, Segment
+
+from .conftest import cached_ahb_db, cached_mig_db, example_files_root
+
+
+def _id_paths_and_digests(sqlite_path: Path, query: str) -> dict[str, dict[str, str]]:
+    """returns the digest per id_path per pruefidentifikator/format"""
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    result: dict[str, dict[str, str]] = {}
+    with Session(bind=engine) as session:
+        for key, id_path, digest in session.execute(text(query)).all():
+            result.setdefault(key, {})[id_path] = digest
+    engine.dispose()
+    return result
+
+
+@pytest.mark.parametrize("ahb_file_name", [p.name for p in sorted(example_files_root.glob("*AHB*.xml"))])
+def test_ahb_path_index_has_the_same_id_paths_as_the_materialized_view(ahb_file_name: str) -> None:
+    ahb_path = example_files_root / ahb_file_name
+    expected = _id_paths_and_digests(
+        cached_ahb_db([ahb_path]),
+        "SELECT pruefidentifikator, id_path, digest FROM ahb_hierarchy_materialized WHERE id_path IS NOT NULL",
+    )
+    anwendungsfaelle = [awf for awf in AhbReader(ahb_path).read().anwendungsfaelle if not awf.is_outdated]
+    assert {awf.pruefidentifikator for awf in anwendungsfaelle} == set(expected)
+    for anwendungsfall in anwendungsfaelle:
+        actual = {id_path: node.digest for id_path, node in anwendungsfall.path_index.by_id_path.items()}
+        assert actual == expected[anwendungsfall.pruefidentifikator]
+
+
+@pytest.mark.parametrize("mig_file_name", [p.name for p in sorted(example_files_root.glob("*MIG*.xml"))])
+def test_mig_path_index_has_the_same_id_paths_as_the_materialized_view(mig_file_name: str) -> None:
+    mig_path = example_files_root / mig_file_name
+    expected = _id_paths_and_digests(
+        cached_mig_db([mig_path]),
+        "SELECT format, id_path, digest FROM mig_hierarchy_materialized WHERE id_path IS NOT NULL",
+    )
+    mig = MigReader(mig_path).read()
+    actual = {id_path: node.digest for id_path, node in mig.path_index.by_id_path.items()}
+    assert actual == expected[mig.format]
+
+
+def test_path_index_lookups() -> None:
+    ahb = AhbReader(example_files_root / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml").read()
+    anwendungsfall = ahb.anwendungsfaelle[0]
+    index = anwendungsfall.path_index
+    assert anwendungsfall.path_index is index  # cached
+
+    bgm = index.by_id_path["BGM>"]
+    assert isinstance(bgm, Segment)
+    assert index.by_segment_number[bgm.number] is bgm
+    document_name_code = index.by_id_path["BGM>C_C002>D_1001>"]
+    assert isinstance(document_name_code, DataElement)
+    (code,) = document_name_code.codes
+    assert code.value is not None
+    assert index.by_code_key[("BGM", "D_1001", code.value)] == (code,)
+    assert isinstance(index.by_id_path[f"BGM>C_C002>D_1001>{code.value}>"], Code)
+
+    modified = anwendungsfall.model_copy(update={"elements": anwendungsfall.elements[1:]})
+    assert "UNH>" in index.by_id_path
+    assert "UNH>" not in modified.path_index.by_id_path  # not the cached index of the original
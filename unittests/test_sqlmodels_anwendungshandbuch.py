@@ -2,11 +2,15 @@
 we try to fill a database using kohlrahbi[sqlmodels] and the data from the machine-readable AHB submodule
 """
 
-from collections.abc import Generator
+import json
+import re
+from collections.abc import Generator, Sequence
 from datetime import date
 from pathlib import Path
+from typing import Any
 
 import pytest
+import sqlalchemy
 from efoli import EdifactFormatVersion
 from pydantic import RootModel
 from sqlalchemy import func, text
@@ -18,6 +22,21 @@ from fundamend.models.anwendungshandbuch import Anwendungshandbuch as PydanticAn
 from fundamend.models.kommunikationsrichtung import Kommunikationsrichtung
 from fundamend.sqlmodels import AhbHierarchyMaterialized, create_ahb_view, create_db_and_populate_with_ahb_view
 from fundamend.sqlmodels import Anwendungshandbuch as SqlAnwendungshandbuch
+from fundamend.sqlmodels.ahb_bulk_insert import bulk_insert_ahb_rows
+from fundamend.sqlmodels.ahbview import _read_and_convert_ahb_to_rows, add_or_replace_ahb
+from fundamend.sqlmodels.anwendungshandbuch import (
+    Anwendungsfall,
+    Bedingung,
+    Code,
+    DataElement,
+    DataElementGroup,
+    Paket,
+    Segment,
+    SegmentGroup,
+    UbBedingung,
+)
+from fundamend.sqlmodels.expression_view import AhbExpression, create_and_fill_ahb_expression_table
+from fundamend.sqlmodels.internals import _execute_bare_sql
 
 from .conftest import apply_throwaway_sqlite_pragmas, cached_ahb_db, is_private_submodule_checked_out
 
@@ -123,6 +142,30 @@ def test_sqlmodels_all_kommunikationsrichtungen_from_submodule() -> None:
                 assert sql_awf.kommunikationsrichtungen is None or not any(sql_awf.kommunikationsrichtungen)
 
 
+_GUID_COLUMNS = [
+    "anwendungsfall_pk",
+    "anwendungshandbuch_primary_key",
+    "current_id",
+    "dataelement_id",
+    "code_id",
+    "id",
+    "root_id",
+    "dataelementgroup_id",
+    "source_id",
+    "parent_id",
+    "segmentgroup_anwendungsfall_primary_key",
+]  # there's no point to compare those
+
+
+def _dump_without_guids(rows: Sequence[AhbHierarchyMaterialized]) -> list[dict[str, Any]]:
+    raw_results = [r.model_dump(mode="json") for r in rows]
+    for raw_result in raw_results:
+        for guid_column in _GUID_COLUMNS:
+            if guid_column in raw_result:
+                del raw_result[guid_column]
+    return raw_results
+
+
 @pytest.mark.snapshot
 @pytest.mark.parametrize("drop_raw_tables", [True, False])
 def test_create_db_and_populate_with_ahb_view(drop_raw_tables: bool, snapshot: SnapshotAssertion) -> None:
@@ -137,26 +180,279 @@ def test_create_db_and_populate_with_ahb_view(drop_raw_tables: bool, snapshot: S
             .order_by(AhbHierarchyMaterialized.sort_path)
         )
         results = session.exec(stmt).all()
-    raw_results = [r.model_dump(mode="json") for r in results]
-    for raw_result in raw_results:
-        for guid_column in [
-            "anwendungsfall_pk",
-            "anwendungshandbuch_primary_key",
-            "current_id",
-            "dataelement_id",
-            "code_id",
-            "id",
-            "root_id",
-            "dataelementgroup_id",
-            "source_id",
-            "parent_id",
-            "segmentgroup_anwendungsfall_primary_key",
-        ]:  # there's no point to compare those
-            if guid_column in raw_result:
-                del raw_result[guid_column]
+    raw_results = _dump_without_guids(results)
     snapshot.assert_match(raw_results)
 
 
+_AHB_FILES_WITH_VALIDITY: list[tuple[Path, date, date | None]] = [
+    (
+        Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+        date(2023, 10, 1),
+        date(2024, 4, 1),
+    ),
+    (
+        Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02.xml",
+        date(2024, 4, 1),
+        None,
+    ),
+]
+
+
+def _canonical_materialized_rows(sqlite_path: Path) -> list[dict[str, Any]]:
+    """the rows of the ahb_hierarchy_materialized table without GUIDs in a reproducible order"""
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        rows = _dump_without_guids(session.exec(select(AhbHierarchyMaterialized)).all())
+    engine.dispose()
+    # rows with the same id_path get a '#n' suffix in order of their (random) GUIDs; that's not reproducible anyway
+    for row in rows:
+        row["id_path"] = re.sub(r"#\d+$", "", row["id_path"])
+    return sorted(rows, key=lambda row: json.dumps(row, sort_keys=True, default=str))
+
+
+def test_create_db_and_populate_with_ahb_view_in_process_pool() -> None:
+    results_by_max_workers = {
+        max_workers: _canonical_materialized_rows(
+            create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY, max_workers=max_workers)
+        )
+        for max_workers in [1, 2]
+    }
+    assert any(results_by_max_workers[1])
+    assert results_by_max_workers[2] == results_by_max_workers[1]
+
+
+def _canonical_raw_table_rows(sqlite_path: Path) -> dict[str, list[tuple[Any, ...]]]:
+    """all rows of all raw AHB tables without the (random) primary and foreign keys, sorted"""
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    result: dict[str, list[tuple[Any, ...]]] = {}
+    with engine.connect() as connection:
+        for model_class in [
+            SqlAnwendungshandbuch,
+            Anwendungsfall,
+            SegmentGroup,
+            Segment,
+            DataElementGroup,
+            DataElement,
+            Code,
+            Bedingung,
+            UbBedingung,
+            Paket,
+        ]:
+            table = model_class.__table__  # type: ignore[attr-defined]
+            columns = [c for c in table.columns if not c.foreign_keys and not c.primary_key]
+            rows = connection.execute(sqlalchemy.select(*columns)).all()
+            result[table.name] = sorted((tuple(row) for row in rows), key=repr)
+    engine.dispose()
+    return result
+
+
+def test_create_db_and_populate_with_ahb_view_using_bulk_insert() -> None:
+    orm_sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY)
+    bulk_sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY, use_bulk_insert=True)
+    orm_raw_tables = _canonical_raw_table_rows(orm_sqlite_path)
+    assert orm_raw_tables["code"]
+    assert _canonical_raw_table_rows(bulk_sqlite_path) == orm_raw_tables
+    # the foreign keys are not part of the comparison above, but the structure is: we read the AHBs back
+    models_by_path: dict[Path, list[PydanticAnwendunghandbuch]] = {}
+    for sqlite_path in [orm_sqlite_path, bulk_sqlite_path]:
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        with Session(bind=engine) as session:
+            sql_ahbs = session.exec(select(SqlAnwendungshandbuch).order_by(SqlAnwendungshandbuch.versionsnummer)).all()
+            models_by_path[sqlite_path] = [sql_ahb.to_model() for sql_ahb in sql_ahbs]
+        engine.dispose()
+    assert models_by_path[bulk_sqlite_path] == models_by_path[orm_sqlite_path]
+    assert _canonical_materialized_rows(bulk_sqlite_path) == _canonical_materialized_rows(orm_sqlite_path)
+
+
+def _materialized_table(session: Session) -> tuple[list[tuple[Any, ...]], list[tuple[Any, ...]]]:
+    """the columns (with their declared types) and all rows but the random id of ahb_hierarchy_materialized"""
+    columns = [tuple(row) for row in session.execute(text("PRAGMA table_info(ahb_hierarchy_materialized)")).all()]
+    column_names = ", ".join(column[1] for column in columns if column[1] != "id")
+    rows = session.execute(text(f"SELECT {column_names} FROM ahb_hierarchy_materialized ORDER BY rowid")).all()
+    return columns, [tuple(row) for row in rows]
+
+
+def _private_submodule_files_with_validity() -> list[tuple[Path, date, date | None]]:
+    if not is_private_submodule_checked_out():
+        pytest.skip("Skipping test because of missing private submodule")
+    private_submodule_root = Path(__file__).parent.parent / "xml-migs-and-ahbs"
+    return [
+        (p, date(2024, 10, 1), date(2025, 6, 6)) for p in (private_submodule_root / "FV2410").rglob("**/*AHB*.xml")
+    ] + [(p, date(2025, 6, 6), None) for p in (private_submodule_root / "FV2504").rglob("**/*AHB*.xml")]
+
+
+@pytest.mark.parametrize(
+    "ahb_files",
+    [
+        pytest.param(
+            # one format version per AHB; otherwise the '#n' counters of id_paths that occur in multiple AHBs are random
+            [
+                (
+                    Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1c_Lesefassung_2023_12_12_ZPbXedn.xml",
+                    date(2023, 10, 1),
+                    date(2024, 4, 3),
+                ),
+                (
+                    Path(__file__).parent
+                    / "example_files"
+                    / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+                    date(2024, 4, 3),
+                    date(2024, 10, 1),
+                ),
+                (
+                    Path(__file__).parent / "example_files" / "UTILTS_AHB_1_0_Fehlerkorrektur_20250218.xml",
+                    date(2024, 10, 1),
+                    None,
+                ),
+            ],
+            id="example files",
+        ),
+        pytest.param(None, id="private submodule"),
+    ],
+)
+def test_python_materializer_yields_the_same_rows_as_the_sql_script(
+    ahb_files: list[tuple[Path, date, date | None]] | None, tmp_path: Path
+) -> None:
+    if ahb_files is None:
+        ahb_files = _private_submodule_files_with_validity()
+    ahbs_as_rows = [_read_and_convert_ahb_to_rows(ahb_file) for ahb_file in ahb_files]
+    engine = create_engine(f"sqlite:///{tmp_path / 'ahbs.sqlite'}")
+    apply_throwaway_sqlite_pragmas(engine)
+    SQLModel.metadata.create_all(engine)
+    with engine.connect() as connection:
+        for ahb_rows in ahbs_as_rows:
+            bulk_insert_ahb_rows(connection, ahb_rows)
+        connection.commit()
+    with Session(bind=engine) as session:
+        create_ahb_view(session)
+        sql_columns, sql_rows = _materialized_table(session)
+        create_ahb_view(session, ahbs_as_rows)
+        python_columns, python_rows = _materialized_table(session)
+        indexes = session.execute(
+            text("SELECT name FROM sqlite_master WHERE tbl_name = 'ahb_hierarchy_materialized' AND type = 'index'")
+        ).all()
+    engine.dispose()
+    assert len(sql_rows) > 1000
+    assert python_columns == sql_columns
+    assert python_rows == sql_rows  # row for row, in the same order, with the same id_paths (incl. '#n' counters)
+    assert len(indexes) > 50
+
+
+def test_create_db_and_populate_with_ahb_view_using_python_materializer() -> None:
+    sql_sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY)
+    python_sqlite_path = create_db_and_populate_with_ahb_view(
+        ahb_files=_AHB_FILES_WITH_VALIDITY, use_python_materializer=True
+    )
+    assert _canonical_raw_table_rows(python_sqlite_path) == _canonical_raw_table_rows(sql_sqlite_path)
+    assert _canonical_materialized_rows(python_sqlite_path) == _canonical_materialized_rows(sql_sqlite_path)
+
+
+def test_create_db_and_populate_with_ahb_view_without_writing_raw_tables() -> None:
+    sql_sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY, drop_raw_tables=True)
+    python_sqlite_path = create_db_and_populate_with_ahb_view(
+        ahb_files=_AHB_FILES_WITH_VALIDITY, drop_raw_tables=True, use_python_materializer=True
+    )
+    assert _canonical_materialized_rows(python_sqlite_path) == _canonical_materialized_rows(sql_sqlite_path)
+    for sqlite_path in [sql_sqlite_path, python_sqlite_path]:
+        engine = create_engine(f"sqlite:///{sqlite_path}")
+        table_names = set(sqlalchemy.inspect(engine).get_table_names())
+        with engine.connect() as connection:
+            number_of_bedingungen = connection.execute(text("SELECT COUNT(*) FROM bedingung")).scalar_one()
+            number_of_free_pages = connection.execute(text("PRAGMA freelist_count")).scalar_one()
+        engine.dispose()
+        assert AhbHierarchyMaterialized.__tablename__ in table_names
+        assert not table_names & {Code.__tablename__, Segment.__tablename__, SqlAnwendungshandbuch.__tablename__}
+        assert number_of_bedingungen > 0
+        assert number_of_free_pages == 0  # the pages of the dropped tables are not kept (VACUUM)
+
+
+def _canonical_expressions(sqlite_path: Path) -> list[tuple[Any, ...]]:
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        rows = session.exec(
+            select(
+                AhbExpression.edifact_format_version,
+                AhbExpression.format,
+                AhbExpression.expression,
+                AhbExpression.node_texts,
+            )
+        ).all()
+    engine.dispose()
+    return sorted(tuple(row) for row in rows)
+
+
+def _create_db_with_expressions(ahb_files: list[tuple[Path, date, date | None]]) -> Path:
+    sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=ahb_files)
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        create_and_fill_ahb_expression_table(session)
+    engine.dispose()
+    return sqlite_path
+
+
+@pytest.mark.parametrize(
+    "initial_ahb_files, added_ahb_file, expected_ahb_files",
+    [
+        pytest.param(
+            _AHB_FILES_WITH_VALIDITY[:1],
+            _AHB_FILES_WITH_VALIDITY[1],
+            _AHB_FILES_WITH_VALIDITY,
+            id="add",
+        ),
+        pytest.param(
+            _AHB_FILES_WITH_VALIDITY,
+            (
+                Path(__file__).parent
+                / "example_files"
+                / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+                date(2024, 4, 1),
+                None,
+            ),
+            [
+                _AHB_FILES_WITH_VALIDITY[0],
+                (
+                    Path(__file__).parent
+                    / "example_files"
+                    / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02_with_Uebertragungsdatei.xml",
+                    date(2024, 4, 1),
+                    None,
+                ),
+            ],
+            id="replace",
+        ),
+    ],
+)
+def test_add_or_replace_ahb_yields_the_same_db_as_a_rebuild(
+    initial_ahb_files: list[tuple[Path, date, date | None]],
+    added_ahb_file: tuple[Path, date, date | None],
+    expected_ahb_files: list[tuple[Path, date, date | None]],
+) -> None:
+    incrementally_updated_sqlite_path = _create_db_with_expressions(initial_ahb_files)
+    added_primary_key = add_or_replace_ahb(incrementally_updated_sqlite_path, added_ahb_file)
+    rebuilt_sqlite_path = _create_db_with_expressions(expected_ahb_files)
+    assert _canonical_raw_table_rows(incrementally_updated_sqlite_path) == _canonical_raw_table_rows(
+        rebuilt_sqlite_path
+    )
+    assert _canonical_materialized_rows(incrementally_updated_sqlite_path) == _canonical_materialized_rows(
+        rebuilt_sqlite_path
+    )
+    assert _canonical_expressions(incrementally_updated_sqlite_path) == _canonical_expressions(rebuilt_sqlite_path)
+    engine = create_engine(f"sqlite:///{incrementally_updated_sqlite_path}")
+    with Session(bind=engine) as session:
+        assert session.get(SqlAnwendungshandbuch, added_primary_key) is not None
+        materialized_ahb_primary_keys = session.exec(
+            select(AhbHierarchyMaterialized.anwendungshandbuch_primary_key).distinct()
+        ).all()
+        assert set(materialized_ahb_primary_keys) <= set(session.exec(select(SqlAnwendungshandbuch.primary_key)).all())
+    engine.dispose()
+
+
+def test_add_or_replace_ahb_requires_the_raw_tables() -> None:
+    sqlite_path = create_db_and_populate_with_ahb_view(ahb_files=_AHB_FILES_WITH_VALIDITY[:1], drop_raw_tables=True)
+    with pytest.raises(ValueError):
+        add_or_replace_ahb(sqlite_path, _AHB_FILES_WITH_VALIDITY[1])
+
+
 @pytest.mark.parametrize("drop_raw_tables", [True, False])
 def test_create_db_and_populate_with_ahb_view_with_duplicates(drop_raw_tables: bool) -> None:
     ahb_paths = [
@@ -378,3 +674,22 @@ def test_id_path_stable_across_versions_utilmd() -> None:
             f"Only {shared_count}/{old_count} ({overlap_ratio:.0%}) id_paths shared between "
             f"FV2510 and FV2604 for UTILMD/44001. Semantic id_paths should be stable across versions."
         )
+
+
+def test_unique_fallback_binds_the_parameters_too(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """if a UNIQUE statement violates the uniqueness, it's retried without UNIQUE - with the same parameters"""
+    sql_file = tmp_path / "unique.sql"
+    sql_file.write_text("SELECT :value AS unique_value WHERE ' UNIQUE ' IS NOT NULL;", encoding="utf-8")
+    bound_parameters: list[Any] = []
+    original_execute = Session.execute
+
+    def _execute(self: Session, statement: Any, params: Any = None, **kwargs: Any) -> Any:
+        bound_parameters.append(params)
+        if len(bound_parameters) == 1:
+            raise sqlalchemy.exc.IntegrityError(str(statement), params, Exception("UNIQUE constraint failed"))
+        return original_execute(self, statement, params, **kwargs)
+
+    monkeypatch.setattr(Session, "execute", _execute)
+    with Session(bind=create_engine("sqlite://")) as session:
+        _execute_bare_sql(session, sql_file, parameters={"value": 1})
+    assert bound_parameters == [{"value": 1}, {"value": 1}]
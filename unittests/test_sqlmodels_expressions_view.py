@@ -1,11 +1,20 @@
+import asyncio
+import threading
 from datetime import date
 from pathlib import Path
+from typing import Any
 
 import pytest
 from sqlmodel import Session, col, create_engine, select
 from syrupy.assertion import SnapshotAssertion
 
-from fundamend.sqlmodels.expression_view import AhbExpression, create_and_fill_ahb_expression_table
+from fundamend.sqlmodels import expression_view
+from fundamend.sqlmodels.expression_cache import ExpressionCache
+from fundamend.sqlmodels.expression_view import (
+    AhbExpression,
+    create_and_fill_ahb_expression_table,
+    create_and_fill_ahb_expression_table_async,
+)
 
 from .conftest import cached_ahb_db, is_private_submodule_checked_out
 
@@ -61,3 +70,87 @@ def test_create_expressions_table_from_submodule_with_validity(snapshot: Snapsho
             if guid_column in raw_result:
                 del raw_result[guid_column]
     snapshot.assert_match(raw_results)
+
+
+def _create_expressions(use_async: bool = False, **kwargs: Any) -> list[dict[str, Any]]:
+    ahb_paths = [
+        (
+            Path(__file__).parent / "example_files" / "UTILTS_AHB_1.1d_Konsultationsfassung_2024_04_02.xml",
+            date(2023, 10, 1),
+            date(2024, 4, 3),
+        )
+    ]
+    sqlite_path = cached_ahb_db(ahb_paths, drop_raw_tables=True)
+    engine = create_engine(f"sqlite:///{sqlite_path}")
+    with Session(bind=engine) as session:
+        if use_async:
+            asyncio.run(create_and_fill_ahb_expression_table_async(session, **kwargs))
+        else:
+            create_and_fill_ahb_expression_table(session, **kwargs)
+        results = session.exec(select(AhbExpression).order_by(AhbExpression.expression)).all()
+        raw_results = [r.model_dump(mode="json", exclude={"id", "anwendungshandbuch_primary_key"}) for r in results]
+    engine.dispose()
+    return raw_results
+
+
+@pytest.mark.parametrize("use_cpu_intensive_validity_check", [False, True])
+def test_expressions_evaluated_in_process_pool_are_the_same(use_cpu_intensive_validity_check: bool) -> None:
+    serial = _create_expressions(use_cpu_intensive_validity_check=use_cpu_intensive_validity_check)
+    pooled = _create_expressions(use_cpu_intensive_validity_check=use_cpu_intensive_validity_check, max_workers=2)
+    assert pooled == serial
+    assert any(r["node_texts"] for r in serial)
+
+
+@pytest.mark.parametrize("use_cpu_intensive_validity_check", [False, True])
+def test_cached_expressions_are_not_evaluated_again(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_cpu_intensive_validity_check: bool
+) -> None:
+    expression_cache = ExpressionCache(tmp_path / "expressions.sqlite")
+    expected = _create_expressions(use_cpu_intensive_validity_check=use_cpu_intensive_validity_check)
+    cold = _create_expressions(
+        use_cpu_intensive_validity_check=use_cpu_intensive_validity_check, expression_cache=expression_cache
+    )
+    assert cold == expected
+
+    def _must_not_be_called(_: Any) -> None:
+        raise AssertionError("The expressions should have been taken from the cache")
+
+    monkeypatch.setattr(expression_view, "_evaluate_expressions", _must_not_be_called)
+    warm = _create_expressions(
+        use_cpu_intensive_validity_check=use_cpu_intensive_validity_check, expression_cache=expression_cache
+    )
+    assert warm == expected
+
+
+def test_broken_expression_cache_is_ignored(tmp_path: Path) -> None:
+    cache_path = tmp_path / "expressions.sqlite"
+    cache_path.write_bytes(b"this is not a sqlite file")
+    assert _create_expressions(expression_cache=ExpressionCache(cache_path)) == _create_expressions()
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_expressions_created_asynchronously_are_the_same(max_workers: int) -> None:
+    assert _create_expressions(use_async=True, max_workers=max_workers) == _create_expressions()
+
+
+def test_async_expression_evaluation_does_not_run_in_the_event_loop(monkeypatch: pytest.MonkeyPatch) -> None:
+    expected = _create_expressions()
+    evaluate_expressions = expression_view._evaluate_expressions  # pylint:disable=protected-access
+    evaluating_threads: set[int] = set()
+
+    def _evaluate_expressions_and_record_the_thread(job: Any) -> Any:
+        evaluating_threads.add(threading.get_ident())
+        return evaluate_expressions(job)
+
+    monkeypatch.setattr(expression_view, "_evaluate_expressions", _evaluate_expressions_and_record_the_thread)
+    assert _create_expressions(use_async=True) == expected
+    assert evaluating_threads
+    assert threading.get_ident() not in evaluating_threads  # asyncio.run runs the event loop in this thread
+
+
+def test_create_expressions_table_inside_a_running_event_loop() -> None:
+    async def _create_inside_event_loop() -> list[dict[str, Any]]:
+        # the synchronous function must not fail just because there's a running event loop already
+        return _create_expressions()
+
+    assert asyncio.run(_create_inside_event_loop()) == _create_expressions()
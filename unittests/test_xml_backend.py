@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import pytest
+
+from fundamend.reader import AhbReader, MigReader, xml_backend
+from fundamend.reader.xml_backend import is_lxml_available
+
+from .conftest import example_files_root
+
+_ahb_files = sorted(example_files_root.glob("*_AHB_*.xml"))
+_mig_files = sorted(example_files_root.glob("*_MIG_*.xml"))
+
+requires_lxml = pytest.mark.skipif(not is_lxml_available(), reason="lxml is not installed")
+
+
+@requires_lxml
+@pytest.mark.parametrize("ahb_xml_file_path", [pytest.param(p, id=p.name) for p in _ahb_files])
+def test_lxml_and_stdlib_yield_identical_ahbs(ahb_xml_file_path: Path) -> None:
+    stdlib_ahb = AhbReader(ahb_xml_file_path, parser_backend="stdlib").read()
+    lxml_ahb = AhbReader(ahb_xml_file_path, parser_backend="lxml").read()
+    assert lxml_ahb == stdlib_ahb
+    assert lxml_ahb.model_dump_json() == stdlib_ahb.model_dump_json()
+    lxml_streamed_ahb = AhbReader(ahb_xml_file_path, streaming=True, parser_backend="lxml").read()
+    assert lxml_streamed_ahb == stdlib_ahb
+
+
+@requires_lxml
+@pytest.mark.parametrize("mig_xml_file_path", [pytest.param(p, id=p.name) for p in _mig_files])
+def test_lxml_and_stdlib_yield_identical_migs(mig_xml_file_path: Path) -> None:
+    stdlib_mig = MigReader(mig_xml_file_path, parser_backend="stdlib").read()
+    lxml_mig = MigReader(mig_xml_file_path, parser_backend="lxml").read()
+    assert lxml_mig == stdlib_mig
+    assert lxml_mig.model_dump_json() == stdlib_mig.model_dump_json()
+
+
+def test_explicit_lxml_backend_without_lxml_raises(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(xml_backend, "lxml_etree", None)
+    with pytest.raises(ImportError):
+        MigReader(_mig_files[0], parser_backend="lxml")
+    # "auto" silently falls back to the standard library
+    assert MigReader(_mig_files[0], parser_backend="auto").read() == MigReader(_mig_files[0]).read()